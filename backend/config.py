@@ -21,6 +21,69 @@ class Config:
     # Server Configuration
     HOST = os.getenv("HOST", "0.0.0.0")
     PORT = int(os.getenv("PORT", "8000"))
+    
+    # Prediction micro-batching
+    BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+    BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "2"))
+    
+    # Inference executor ("thread" or "process")
+    INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+    INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+    INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "1024"))
+    
+    # Largest batch scored with the flattened tree evaluator (0 disables it)
+    COMPILED_TREES_MAX_ROWS = int(os.getenv("COMPILED_TREES_MAX_ROWS", "512"))
+    
+    # Seconds between checks of data/ for new model artifacts (0 disables hot reload)
+    MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "30"))
+    # auto: data/model_bundle.lh410 when present, else the best_model_*.pkl pickles
+    MODEL_FORMAT = os.getenv("MODEL_FORMAT", "auto")
+    
+    # Prediction cache (size 0 disables it). Alarms with a machine history
+    # almost never repeat their features, so it is off by default unless
+    # MACHINE_STATE_ENABLED=0
+    PREDICTION_CACHE_SIZE = int(os.getenv(
+        "PREDICTION_CACHE_SIZE", "10000" if os.getenv("MACHINE_STATE_ENABLED", "1") == "0" else "0"
+    ))
+    PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+    
+    # Early-exit cascade: component models only run when the overall
+    # failure probability reaches the threshold
+    CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "0") == "1"
+    CASCADE_THRESHOLD = float(os.getenv("CASCADE_THRESHOLD", "0.05"))
+    
+    # Bulk scoring: /api/predict/batch answers inline up to BATCH_SYNC_MAX_ALARMS,
+    # /api/predict/batch/jobs accepts up to BATCH_MAX_ALARMS
+    BATCH_SYNC_MAX_ALARMS = int(os.getenv("BATCH_SYNC_MAX_ALARMS", "1000"))
+    BATCH_MAX_ALARMS = int(os.getenv("BATCH_MAX_ALARMS", "50000"))
+    BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "1024"))
+    # Longest a chunk waits for executor capacity before its alarms fail
+    BATCH_RETRY_TIMEOUT = float(os.getenv("BATCH_RETRY_TIMEOUT", "30"))
+    # Latest results a batch job keeps in memory; older pages come from MongoDB
+    BATCH_JOB_RESULT_WINDOW = int(os.getenv("BATCH_JOB_RESULT_WINDOW", "1000"))
+    
+    # Per-machine alarm history kept in memory for the history features; each
+    # process keeps its own, so it is only correct with a single worker
+    MACHINE_STATE_ENABLED = os.getenv("MACHINE_STATE_ENABLED", "1") != "0"
+    STATE_MAX_MACHINES = int(os.getenv("STATE_MAX_MACHINES", "10000"))
+    STATE_SNAPSHOT_PATH = os.getenv(
+        "STATE_SNAPSHOT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "state", "machine_state.snap")
+    )
+    STATE_SNAPSHOT_INTERVAL = float(os.getenv("STATE_SNAPSHOT_INTERVAL", "300"))
+    
+    # NDJSON alarm streams (/api/alarm/stream)
+    STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "256"))
+    STREAM_BATCH_WINDOW_MS = float(os.getenv("STREAM_BATCH_WINDOW_MS", "50"))
+    STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "1024"))
+    STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", "65536"))
+    
+    # Shadow evaluation: fraction of live alarms also scored in the background
+    # with the alternate models in all_models_*.pkl (0 disables it)
+    SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0"))
+    SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "1024"))
+    SHADOW_BATCH_SIZE = int(os.getenv("SHADOW_BATCH_SIZE", "64"))
+    # Comma-separated candidate names (e.g. "xgboost,svm"); empty means all
+    SHADOW_MODELS = os.getenv("SHADOW_MODELS", "")
 
 # Global config instance
 config = Config()
\ No newline at end of file
@@ -0,0 +1,201 @@
+import asyncio
+import inspect
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from config import config
+from core.executor import inference_executor, InferenceQueueFull
+from core.metrics import metrics
+
+BATCH_SIZE = metrics.histogram(
+    "lh410_batch_size", "Alarms per micro-batch sent to the executor",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+)
+BATCH_QUEUE_WAIT_SECONDS = metrics.histogram(
+    "lh410_batch_queue_wait_seconds", "Time an alarm waits in the micro-batcher before dispatch"
+)
+BATCH_REJECTED = metrics.counter(
+    "lh410_batch_rejected_total", "Alarms rejected because the micro-batcher queue was full"
+)
+
+
+class RunningStats:
+    """Count/sum/max plus a window of recent samples for percentiles"""
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def summary(self) -> Dict[str, float]:
+        recent = sorted(self.recent)
+
+        def percentile(q):
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(q * len(recent)))]
+
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+        }
+
+
+class MicroBatcher:
+    """Groups concurrent prediction requests into small batches.
+
+    Callers await submit(); a single worker task collects requests until the
+    batch is full or the window since the first request has elapsed, scores
+    the group with one predict_batch call and resolves each caller's future.
+    predict_batch may be a plain function or a coroutine function; batches are
+    dispatched as separate tasks so several can be scored at once. At most
+    max_queue alarms wait for a batch; further submissions are rejected with
+    InferenceQueueFull.
+    """
+
+    def __init__(self, predict_batch: Callable[[List[Dict[str, Any]]], Any],
+                 max_batch_size: int = 64, max_wait_ms: float = 2.0, max_queue: int = 1024):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue = max_queue
+        self.rejected = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight = set()
+        self.batch_sizes = RunningStats()
+        self.queue_wait_ms = RunningStats()
+
+    def _ensure_started(self):
+        if self._worker is None or self._worker.done():
+            if self._worker is not None and not self._worker.cancelled() and self._worker.exception():
+                logging.warning(f"Prediction batcher stopped: {self._worker.exception()}")
+            # Nothing will collect the old queue any more
+            self._fail_pending("Prediction batcher restarted")
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    def _fail_pending(self, reason: str):
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            # Futures of a closed event loop have no one left waiting on them
+            if not future.done() and not future.get_loop().is_closed():
+                future.set_exception(RuntimeError(reason))
+
+    async def submit(self, alarm_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue one alarm for scoring and wait for its prediction"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((alarm_data, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            BATCH_REJECTED.inc()
+            raise InferenceQueueFull(f"Prediction batcher queue is full (limit {self.max_queue})")
+        return await future
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            dispatched_at = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                waited = dispatched_at - enqueued_at
+                self.queue_wait_ms.add(waited * 1000)
+                BATCH_QUEUE_WAIT_SECONDS.observe(waited)
+            self.batch_sizes.add(len(batch))
+            BATCH_SIZE.observe(len(batch))
+
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch: list):
+        try:
+            results = self.predict_batch([alarm_data for alarm_data, _, _ in batch])
+            if inspect.isawaitable(results):
+                results = await results
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            logging.warning(f"Batch prediction failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            # Only reached with unresolved futures when the task is cancelled
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("Prediction batcher stopped"))
+
+    async def stop(self):
+        """Cancel the worker and fail any requests still waiting"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for task in list(self._in_flight):
+            task.cancel()
+        self._fail_pending("Prediction batcher stopped")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'max_queue': self.max_queue,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'rejected': self.rejected,
+            'batches_in_flight': len(self._in_flight),
+            'batch_size': self.batch_sizes.summary(),
+            'queue_wait_ms': self.queue_wait_ms.summary(),
+        }
+
+
+# Shared batcher in front of the predictor
+batcher = MicroBatcher(
+    inference_executor.predict_batch,
+    # A batch larger than the executor's queue limit could never be scored
+    max_batch_size=min(config.BATCH_MAX_SIZE, inference_executor.max_queue),
+    max_wait_ms=config.BATCH_WINDOW_MS,
+    max_queue=config.INFERENCE_MAX_QUEUE
+)
+
+
+def _batcher_metrics():
+    """Queue depth and in-flight batches of the shared batcher, read at scrape time"""
+    stats = batcher.stats()
+    for name, field, help_text in (('lh410_batch_queue_depth', 'queue_depth', 'Alarms waiting in the micro-batcher'),
+                                   ('lh410_batches_in_flight', 'batches_in_flight', 'Micro-batches being scored')):
+        yield name, "gauge", help_text, [(name, {}, stats[field])]
+
+metrics.register_collector(_batcher_metrics)
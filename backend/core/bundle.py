@@ -0,0 +1,119 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from core.columnar import ColumnarFileError, read_columns, write_columns
+from core.trees import FlatEnsemble
+
+# Columnar file (see core/columnar.py) tagged with this magic and version
+BUNDLE_MAGIC = b"LH410MDL"
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_FILENAME = "model_bundle.lh410"
+
+# FlatEnsemble node arrays stored as columns, and scalars stored in the header
+_TREE_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'missing_left', 'roots')
+_TREE_PARAMS = ('max_depth', 'kind', 'strict', 'base_margin', 'n_features')
+
+
+class BundleError(Exception):
+    """Raised when a model bundle is corrupt, incomplete or of another format version"""
+    pass
+
+
+class BundledScaler:
+    """RobustScaler parameters; transform() matches sklearn's RobustScaler"""
+
+    def __init__(self, center: Optional[np.ndarray], scale: Optional[np.ndarray],
+                 feature_names: Optional[List[str]] = None):
+        self.center_ = center
+        self.scale_ = scale
+        self.feature_names_in_ = np.array(feature_names, dtype=object) if feature_names else None
+        self.n_features_in_ = len(center if center is not None else scale)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        X = np.array(X, dtype=np.float64)
+        if self.center_ is not None:
+            X -= self.center_
+        if self.scale_ is not None:
+            X /= self.scale_
+        return X
+
+
+class ModelBundle:
+    """Everything needed to serve one deployment, as read from a bundle file"""
+
+    def __init__(self, models: Dict[str, FlatEnsemble], feature_names: Dict[str, List[str]],
+                 scaler: Optional[BundledScaler], encoders: Dict[str, List[str]],
+                 metadata: Dict[str, Any], checksum: str):
+        self.models = models
+        self.feature_names = feature_names
+        self.scaler = scaler
+        self.encoders = encoders
+        self.metadata = metadata
+        self.checksum = checksum
+
+
+def write_bundle(path: Path, models: Dict[str, FlatEnsemble], feature_names: Dict[str, List[str]],
+                 scaler=None, encoders: Optional[Dict[str, List[str]]] = None,
+                 metadata: Optional[Dict[str, Any]] = None) -> int:
+    """Write compiled models and their preprocessing parameters; returns the file size.
+
+    scaler is any object with RobustScaler's center_/scale_ attributes.
+    """
+    columns, model_specs = {}, {}
+    for failure_type, ensemble in models.items():
+        for name in _TREE_ARRAYS:
+            columns[f"{failure_type}/{name}"] = getattr(ensemble, name)
+        model_specs[failure_type] = {
+            **{name: getattr(ensemble, name) for name in _TREE_PARAMS},
+            'feature_names': [str(name) for name in feature_names[failure_type]],
+        }
+
+    scaler_spec = None
+    if scaler is not None:
+        names = getattr(scaler, 'feature_names_in_', None)
+        scaler_spec = {'feature_names': [str(n) for n in names] if names is not None else []}
+        for name in ('center_', 'scale_'):
+            value = getattr(scaler, name, None)
+            scaler_spec[name.rstrip('_')] = value is not None
+            if value is not None:
+                columns[f"scaler/{name.rstrip('_')}"] = np.asarray(value, dtype=np.float64)
+
+    header = {
+        **(metadata or {}),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'models': model_specs,
+        'scaler': scaler_spec,
+        'encoders': {name: [str(c) for c in classes] for name, classes in (encoders or {}).items()},
+    }
+    return write_columns(path, BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, columns, header)
+
+
+def read_bundle(path: Path, use_mmap: bool = True) -> ModelBundle:
+    """Load a bundle with NumPy only; the tree arrays are memory-mapped by default"""
+    try:
+        columns, metadata, checksum = read_columns(path, BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, use_mmap=use_mmap)
+    except ColumnarFileError as e:
+        raise BundleError(f"Invalid model bundle {path}: {e}") from e
+
+    try:
+        models, feature_names = {}, {}
+        for failure_type, spec in metadata['models'].items():
+            arrays = [columns[f"{failure_type}/{name}"] for name in _TREE_ARRAYS]
+            models[failure_type] = FlatEnsemble(*arrays, **{name: spec[name] for name in _TREE_PARAMS})
+            feature_names[failure_type] = list(spec['feature_names'])
+
+        scaler = None
+        scaler_spec = metadata.get('scaler')
+        if scaler_spec is not None:
+            scaler = BundledScaler(
+                columns['scaler/center'] if scaler_spec['center'] else None,
+                columns['scaler/scale'] if scaler_spec['scale'] else None,
+                scaler_spec['feature_names'],
+            )
+    except KeyError as e:
+        raise BundleError(f"Model bundle {path} is missing {e}") from e
+
+    return ModelBundle(models, feature_names, scaler, metadata.get('encoders', {}), metadata, checksum)
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+# File layout: magic, format version, header length, JSON header, column data
+# (each column 8-byte aligned), then the SHA-256 of everything before it
+_PREFIX = struct.Struct("<8sII")
+CHECKSUM_SIZE = 32
+
+
+class ColumnarFileError(Exception):
+    """Raised when a columnar file is corrupt or has an unexpected type or version"""
+    pass
+
+
+def _pad(n: int) -> int:
+    return -n % 8
+
+
+def write_columns(path: Path, magic: bytes, version: int,
+                  columns: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> int:
+    """Write columns atomically (temp file + rename); returns the file size.
+
+    The temp file has a unique name in the target directory, so concurrent
+    writers never write into each other's file; the last rename wins.
+    """
+    specs, offset = [], 0
+    for name, array in columns.items():
+        array = np.ascontiguousarray(array)
+        specs.append({'name': name, 'dtype': array.dtype.str, 'shape': list(array.shape),
+                      'offset': offset, 'nbytes': array.nbytes})
+        offset += array.nbytes + _pad(array.nbytes)
+
+    header = json.dumps({**metadata, 'columns': specs}).encode()
+    header += b" " * _pad(_PREFIX.size + len(header))
+
+    digest = hashlib.sha256()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False) as f:
+        tmp_path = Path(f.name)
+        try:
+            def write(data: bytes):
+                digest.update(data)
+                f.write(data)
+
+            write(_PREFIX.pack(magic, version, len(header)))
+            write(header)
+            for array in columns.values():
+                data = np.ascontiguousarray(array).tobytes()
+                write(data + b"\0" * _pad(len(data)))
+            f.write(digest.digest())
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            tmp_path.unlink(missing_ok=True)
+            raise
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return path.stat().st_size
+
+
+def read_columns(path: Path, magic: bytes, version: int,
+                 use_mmap: bool = False) -> Tuple[Dict[str, np.ndarray], Dict[str, Any], str]:
+    """Read and verify a columnar file.
+
+    Returns the columns, the header metadata and the file's SHA-256 hex
+    digest. With use_mmap the columns are read-only views of a memory map
+    instead of copies of the file. Raises ColumnarFileError if the file
+    cannot be trusted.
+    """
+    with open(path, "rb") as f:
+        if use_mmap:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        else:
+            data = f.read()
+    if len(data) < _PREFIX.size + CHECKSUM_SIZE:
+        raise ColumnarFileError("File is truncated")
+    view = memoryview(data)
+    file_magic, file_version, header_size = _PREFIX.unpack_from(view)
+    if file_magic != magic:
+        raise ColumnarFileError(f"Unexpected file type {file_magic!r}, expected {magic!r}")
+    if file_version != version:
+        raise ColumnarFileError(f"Unsupported format version {file_version}")
+    checksum = bytes(view[-CHECKSUM_SIZE:])
+    if hashlib.sha256(view[:-CHECKSUM_SIZE]).digest() != checksum:
+        raise ColumnarFileError("File checksum mismatch")
+
+    metadata = json.loads(bytes(view[_PREFIX.size:_PREFIX.size + header_size]))
+    body = view[_PREFIX.size + header_size:len(data) - CHECKSUM_SIZE]
+    columns = {}
+    for spec in metadata.pop('columns'):
+        array = np.frombuffer(body[spec['offset']:spec['offset'] + spec['nbytes']], dtype=np.dtype(spec['dtype']))
+        columns[spec['name']] = array.reshape(spec['shape'])
+    return columns, metadata, checksum.hex()
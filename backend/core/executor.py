@@ -0,0 +1,133 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from config import config
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference executor already holds its maximum queue depth"""
+    pass
+
+
+def _load_worker_models():
+    """Process pool initializer: load the models once per worker.
+
+    Workers do not watch the artifacts; the parent's registry does, and every
+    batch carries the model version the parent is serving.
+    """
+    from core.model import predictor
+    predictor.registry.ensure_loaded()
+    logging.info(f"Inference worker ready with {len(predictor.models)} models ({predictor.model_version})")
+
+
+# Cache generation a worker process last cleared its prediction cache for
+_worker_cache_generation = 0
+# Model version the parent last asked this worker process to serve
+_worker_model_version = None
+
+
+def _predict_in_worker(alarms: List[Dict[str, Any]], cache_generation: int = 0,
+                       model_version: str = None) -> List[Dict[str, Any]]:
+    global _worker_cache_generation, _worker_model_version
+    from core.model import predictor
+    if cache_generation != _worker_cache_generation:
+        predictor.cache.clear()
+        _worker_cache_generation = cache_generation
+    if model_version is not None and model_version != _worker_model_version:
+        # The parent swapped models: reload once per version it announces
+        if model_version != predictor.model_version:
+            try:
+                predictor.registry.load()
+            except Exception as e:
+                logging.error(f"Worker model reload failed, keeping version {predictor.model_version}: {e}")
+        _worker_model_version = model_version
+    return predictor.predict_failure_batch(alarms)
+
+
+class InferenceExecutor:
+    """Runs model inference off the event loop.
+
+    In thread mode the shared predictor scores in a thread pool (sklearn tree
+    traversal and XGBoost release the GIL while predicting). In process mode
+    every worker process preloads its own models once and reloads them when
+    the parent's registry reports a new version. Either way, at most
+    max_queue alarms may be waiting or running at once; further requests,
+    including a single batch larger than max_queue, are rejected with
+    InferenceQueueFull instead of piling up.
+    """
+
+    def __init__(self, mode: str = "thread", workers: int = 2, max_queue: int = 1024):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown inference executor mode '{mode}'")
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.rejected = 0
+        self._cache_generation = 0
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_load_worker_models)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        return self._pool
+
+    async def predict_batch(self, alarms: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Score a batch of alarms in the pool without blocking the event loop"""
+        if self.pending + len(alarms) > self.max_queue:
+            self.rejected += len(alarms)
+            raise InferenceQueueFull(
+                f"Inference queue is full ({self.pending} alarms pending, limit {self.max_queue})"
+            )
+
+        from core.model import predictor
+        if self.mode == "process":
+            fn = functools.partial(_predict_in_worker, cache_generation=self._cache_generation,
+                                   model_version=predictor.model_version)
+        else:
+            fn = predictor.predict_failure_batch
+
+        self.pending += len(alarms)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_pool(), fn, alarms)
+        finally:
+            self.pending -= len(alarms)
+
+    def clear_caches(self):
+        """Empty the prediction cache wherever this executor scores.
+
+        Worker processes each hold their own cache; they clear it before
+        their next batch.
+        """
+        from core.model import predictor
+        predictor.cache.clear()
+        if self.mode == "process":
+            self._cache_generation += 1
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'pending': self.pending,
+            'rejected': self.rejected,
+        }
+
+
+# Shared executor for all prediction routes
+inference_executor = InferenceExecutor(
+    mode=config.INFERENCE_EXECUTOR,
+    workers=config.INFERENCE_WORKERS,
+    max_queue=config.INFERENCE_MAX_QUEUE
+)
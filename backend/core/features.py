@@ -0,0 +1,195 @@
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Any, Sequence
+
+from core.windows import COMPONENTS
+from utils.string_cache import UniqueStringCache, factorize_strings
+
+# Raw numeric fields carried through from the alarm payload
+RAW_NUMERIC_FIELDS = ['spn', 'fmi', 'count', 'hours']
+
+# Substring checks applied to the lower-cased alarm_type
+ALARM_TYPE_KEYWORDS = {
+    'is_temperature_alarm': 'temp',
+    'is_pressure_alarm': 'pressure',
+    'is_filter_alarm': 'filter',
+    'is_sensor_alarm': 'sensor',
+    'is_electrical_alarm': 'electrical',
+    'is_safety_alarm': 'safety',
+    'is_maintenance_alarm': 'maintenance',
+    'is_critical_alarm': 'critical',
+}
+
+COMPONENT_MAPPING = {'engine': 0, 'brake': 1, 'transmission': 2, 'electrical': 3}
+SEVERITY_MAPPING = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+LOCATION_MAPPING = {'front': 0, 'rear': 1, 'left': 2, 'right': 3}
+
+ROLLING_BASE_FEATURES = [
+    'alarms_last_1h', 'alarms_last_6h', 'alarms_last_24h',
+    'engine_alarms_24h', 'brake_alarms_24h', 'transmission_alarms_24h',
+    'sensor_alarms_24h', 'electrical_alarms_24h'
+]
+
+# Per-machine alarm history; when an alarm carries a 'history' dict (filled by
+# core.state.MachineStateStore) these values and the rolling statistics below
+# replace the simplified defaults
+HISTORY_FEATURES = (
+    ['time_since_last_alarm', 'alarms_last_1h', 'alarms_last_6h', 'alarms_last_24h']
+    + [f'{component}_alarms_24h' for component in COMPONENTS]
+)
+
+INTERACTION_PAIRS = [
+    ('engine', 'brake'), ('engine', 'transmission'), ('engine', 'electrical'),
+    ('brake', 'transmission'), ('brake', 'electrical'), ('transmission', 'electrical')
+]
+
+ROLLING_FEATURES = [f'{col}_rolling_{stat}' for col in ROLLING_BASE_FEATURES for stat in ('mean', 'std')]
+
+# Columns computed from a machine's alarm history when an alarm carries one;
+# they change with every alarm, so predictions that read them are not cached
+HISTORY_COLUMNS = HISTORY_FEATURES + [f'{a}_{b}_interaction' for a, b in INTERACTION_PAIRS] + ROLLING_FEATURES
+
+# Column layout of the feature matrix; mirrors the column order produced by
+# OptimizedPredictor.preprocess_new_data for a validated alarm
+FEATURE_COLUMNS: List[str] = (
+    RAW_NUMERIC_FIELDS
+    + ['hour_of_day', 'day_of_week', 'month', 'is_weekend', 'is_night_shift']
+    + list(ALARM_TYPE_KEYWORDS)
+    + ['component_category_encoded', 'severity_level_encoded', 'Location_encoded']
+    + HISTORY_FEATURES
+    + [f'{a}_{b}_interaction' for a, b in INTERACTION_PAIRS]
+    + ROLLING_FEATURES
+)
+
+FEATURE_INDEX: Dict[str, int] = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+
+ALARM_TYPE_COLUMNS = np.array([FEATURE_INDEX[feature] for feature in ALARM_TYPE_KEYWORDS])
+
+# The matrix carries one extra column that is always zero; model features the
+# builder does not produce are gathered from it
+ZERO_COLUMN = len(FEATURE_COLUMNS)
+MATRIX_WIDTH = len(FEATURE_COLUMNS) + 1
+
+
+def parse_timestamp(value: Any) -> datetime:
+    """Parse an alarm timestamp, defaulting to now when it is missing"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return datetime.utcnow()
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        # Fall back to pandas for the less common formats it understands
+        import pandas as pd
+        return pd.to_datetime(value).to_pydatetime()
+
+
+def _alarm_type_flags(alarm_type: str) -> np.ndarray:
+    """ALARM_TYPE_KEYWORDS flags for one alarm_type string"""
+    alarm_type = alarm_type.lower()
+    return np.array([keyword in alarm_type for keyword in ALARM_TYPE_KEYWORDS.values()], dtype=np.float32)
+
+
+# alarm_type values repeat heavily; each distinct string is parsed once
+alarm_type_flags = UniqueStringCache(_alarm_type_flags)
+
+
+def _or_zero(value: Any) -> Any:
+    return 0 if value is None else value
+
+
+def _lower_strings(alarms: Sequence[Dict[str, Any]], field: str) -> np.ndarray:
+    return np.array([str(alarm.get(field, '')).lower() for alarm in alarms], dtype=str)
+
+
+def _encode(values: np.ndarray, mapping: Dict[str, int], default: int) -> np.ndarray:
+    encoded = np.full(len(values), default, dtype=np.float32)
+    for key, code in mapping.items():
+        encoded[values == key] = code
+    return encoded
+
+
+def _apply_history(X: np.ndarray, alarms: Sequence[Dict[str, Any]], names: Sequence[str]):
+    """Overwrite columns with the values alarms carry in their 'history' dict"""
+    for i, alarm in enumerate(alarms):
+        history = alarm.get('history')
+        if history:
+            for name in names:
+                if name in history:
+                    X[i, FEATURE_INDEX[name]] = history[name]
+
+
+def build_feature_matrix(alarms: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """Build the float32 feature matrix for a batch of alarms, one row per alarm.
+
+    Produces the same feature values as OptimizedPredictor.preprocess_new_data
+    without going through a pandas DataFrame, so a single alarm and a batch of
+    thousands share one code path. Columns follow FEATURE_COLUMNS, plus the
+    trailing ZERO_COLUMN.
+    """
+    n = len(alarms)
+    X = np.zeros((n, MATRIX_WIDTH), dtype=np.float32)
+    if n == 0:
+        return X
+
+    def col(name):
+        return FEATURE_INDEX[name]
+
+    # Raw numeric fields (missing values behave like the zero-filled model frame)
+    for field in RAW_NUMERIC_FIELDS:
+        X[:, col(field)] = [_or_zero(alarm.get(field)) for alarm in alarms]
+
+    # Temporal features
+    timestamps = [parse_timestamp(alarm.get('timestamp')) for alarm in alarms]
+    hour = np.array([ts.hour for ts in timestamps], dtype=np.float32)
+    weekday = np.array([ts.weekday() for ts in timestamps], dtype=np.float32)
+    X[:, col('hour_of_day')] = hour
+    X[:, col('day_of_week')] = weekday
+    X[:, col('month')] = [ts.month for ts in timestamps]
+    X[:, col('is_weekend')] = weekday >= 5
+    X[:, col('is_night_shift')] = (hour >= 22) | (hour <= 6)
+
+    # Binary features for alarm types, parsed once per distinct alarm_type
+    codes, alarm_types = factorize_strings(str(alarm.get('alarm_type', '')) for alarm in alarms)
+    X[:, ALARM_TYPE_COLUMNS] = np.stack(alarm_type_flags.get_many(alarm_types))[codes]
+
+    # Categorical encodings
+    components = _lower_strings(alarms, 'component')
+    X[:, col('component_category_encoded')] = _encode(components, COMPONENT_MAPPING, 0)
+    X[:, col('severity_level_encoded')] = _encode(_lower_strings(alarms, 'severity'), SEVERITY_MAPPING, 1)
+    X[:, col('Location_encoded')] = _encode(_lower_strings(alarms, 'location'), LOCATION_MAPPING, 0)
+
+    # Alarm history features (simplified defaults for alarms without history)
+    counts = np.array([_or_zero(alarm.get('count', 1)) for alarm in alarms], dtype=np.float32)
+    X[:, col('time_since_last_alarm')] = 60
+    X[:, col('alarms_last_1h')] = 1
+    X[:, col('alarms_last_6h')] = counts
+    X[:, col('alarms_last_24h')] = counts
+
+    # Component-specific alarm counts
+    for component in COMPONENTS:
+        X[:, col(f'{component}_alarms_24h')] = components == component
+
+    # Real alarm history from the online state store, where available
+    _apply_history(X, alarms, HISTORY_FEATURES)
+
+    # Interaction features
+    for a, b in INTERACTION_PAIRS:
+        X[:, col(f'{a}_{b}_interaction')] = X[:, col(f'{a}_alarms_24h')] * X[:, col(f'{b}_alarms_24h')]
+
+    # Rolling statistics (simplified); std columns stay zero
+    for feature in ROLLING_BASE_FEATURES:
+        X[:, col(f'{feature}_rolling_mean')] = X[:, col(feature)]
+    _apply_history(X, alarms, ROLLING_FEATURES)
+
+    return X
+
+
+def compile_feature_plan(feature_names: Sequence[str]) -> np.ndarray:
+    """Compile a model's expected feature names into a column gather index.
+
+    Scoring a model is then a single fancy-index into the shared feature
+    matrix: X[:, plan]. Features the builder does not know map to ZERO_COLUMN.
+    """
+    return np.array([FEATURE_INDEX.get(name, ZERO_COLUMN) for name in feature_names], dtype=np.intp)
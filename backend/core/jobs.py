@@ -0,0 +1,217 @@
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from pydantic import ValidationError
+
+import db.mongodb as mongodb
+from config import config
+from core.executor import inference_executor, InferenceQueueFull
+from core.metrics import STAGE_ERRORS, stage_timer
+from core.shadow import shadow_scorer
+from core.state import machine_state
+from db.models import AlarmLogIn
+from utils.preprocessing import validate_alarm_data
+
+
+def alarm_error_result(index: int, raw: Any, error: str) -> Dict[str, Any]:
+    return {
+        "index": index,
+        "alarm_id": raw.get("id", "unknown") if isinstance(raw, dict) else "unknown",
+        "error": error,
+        "predictions": {},
+        "overall_risk": {"probability": 0, "risk_level": "error"}
+    }
+
+
+async def _predict_with_retry(alarms: List[Dict[str, Any]], timeout: float = None) -> List[Dict[str, Any]]:
+    """Bulk chunks wait for executor capacity instead of failing the batch.
+
+    Gives up with InferenceQueueFull once timeout seconds (BATCH_RETRY_TIMEOUT
+    by default) have passed without a free slot.
+    """
+    timeout = config.BATCH_RETRY_TIMEOUT if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    while True:
+        try:
+            return await inference_executor.predict_batch(alarms)
+        except InferenceQueueFull as e:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise InferenceQueueFull(f"{e}; gave up after waiting {timeout:g} s") from e
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.5)
+
+
+async def score_alarm_chunks(raw_alarms: List[Any], chunk_size: int = None,
+                             batch_job_id: Optional[str] = None,
+                             route: str = "batch") -> AsyncIterator[List[Dict[str, Any]]]:
+    """Validate, score and persist alarms chunk by chunk.
+
+    Each chunk is validated item by item (invalid alarms get an error result
+    instead of failing the request), scored with one executor call and
+    written to the logs and predictions collections with insert_many.
+    A chunk that cannot get executor capacity within BATCH_RETRY_TIMEOUT
+    gets an error result for each of its alarms and nothing is stored.
+    Yields each chunk's results in input order. Stage timings are recorded
+    under route.
+    """
+    # A chunk larger than the executor's queue limit could never be scored
+    chunk_size = min(chunk_size or config.BATCH_CHUNK_SIZE, inference_executor.max_queue)
+    for start in range(0, len(raw_alarms), chunk_size):
+        chunk = raw_alarms[start:start + chunk_size]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(chunk)
+        valid = []
+        with stage_timer(route, "validate"):
+            for offset, raw in enumerate(chunk):
+                index = start + offset
+                try:
+                    alarm_log = AlarmLogIn(**raw).model_dump()
+                    alarm_data = validate_alarm_data(dict(alarm_log))
+                    valid.append((offset, alarm_log, alarm_data))
+                except (ValidationError, ValueError, TypeError) as e:
+                    results[offset] = alarm_error_result(index, raw, str(e))
+            machine_state.annotate_many([alarm_data for _, _, alarm_data in valid])
+        if len(valid) < len(chunk):
+            STAGE_ERRORS.inc(len(chunk) - len(valid), route=route, stage="validate")
+
+        predicted_at = datetime.utcnow().isoformat()
+        try:
+            with stage_timer(route, "inference"):
+                predictions = await _predict_with_retry([alarm_data for _, _, alarm_data in valid]) if valid else []
+        except InferenceQueueFull as e:
+            for offset, _, _ in valid:
+                results[offset] = alarm_error_result(start + offset, chunk[offset], str(e))
+            yield results
+            continue
+        committed_at = machine_state.commit([alarm_data for (_, _, alarm_data), prediction_result
+                                             in zip(valid, predictions) if "error" not in prediction_result])
+        shadow_scorer.offer([alarm_data for _, _, alarm_data in valid], predictions)
+
+        log_docs, prediction_docs = [], []
+        for (offset, alarm_log, _), prediction_result in zip(valid, predictions):
+            raw = chunk[offset]
+            prediction_result["predicted_at"] = predicted_at
+            prediction_result["index"] = start + offset
+            prediction_result["alarm_id"] = raw.get("id", "unknown")
+            results[offset] = prediction_result
+
+            alarm_log["timestamp"] = alarm_log.get("timestamp") or predicted_at
+            if batch_job_id:
+                alarm_log["batch_job_id"] = batch_job_id
+            if "error" not in prediction_result:
+                alarm_log["committed_at"] = committed_at
+            log_docs.append(alarm_log)
+            prediction_docs.append({**prediction_result, "alarm_log": dict(alarm_log)})
+
+        with stage_timer(route, "store"):
+            await mongodb.safe_insert_many(mongodb.logs_collection, log_docs)
+            await mongodb.safe_insert_many(mongodb.predictions_collection, prediction_docs)
+        yield results
+
+
+class BatchJob:
+    """Progress of one background job.
+
+    Only the latest result_window results are held in memory; every scored
+    prediction is also in MongoDB tagged with the job id.
+    """
+
+    def __init__(self, total: int, result_window: int = 1000):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.total = total
+        self.processed = 0
+        self.errors = 0
+        self.results: "deque[Dict[str, Any]]" = deque(maxlen=result_window)
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow().isoformat()
+        self.finished_at: Optional[str] = None
+        self.finished_monotonic: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def add_results(self, results: List[Dict[str, Any]]):
+        self.results.extend(results)
+        self.processed += len(results)
+        self.errors += sum(1 for result in results if "error" in result)
+
+    def result_page(self, offset: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Results offset..offset+limit from memory, or None if some are no longer held"""
+        first_held = self.processed - len(self.results)
+        if offset < first_held:
+            return None
+        start = offset - first_held
+        return list(itertools.islice(self.results, start, start + limit))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "errors": self.errors,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class BatchJobStore:
+    """In-memory registry of background batch jobs.
+
+    Finished jobs are kept for retention_seconds and at most max_jobs are
+    held; their predictions also stay in MongoDB tagged with the job id.
+    """
+
+    def __init__(self, max_jobs: int = 100, retention_seconds: float = 3600, result_window: int = 1000):
+        self.max_jobs = max_jobs
+        self.retention = retention_seconds
+        self.result_window = result_window
+        self._jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+
+    def _prune(self):
+        now = time.monotonic()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_monotonic is not None and now - job.finished_monotonic > self.retention:
+                del self._jobs[job_id]
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_monotonic is not None]
+        while len(self._jobs) >= self.max_jobs and finished:
+            del self._jobs[finished.pop(0)]
+
+    def submit(self, raw_alarms: List[Any]) -> BatchJob:
+        self._prune()
+        job = BatchJob(len(raw_alarms), self.result_window)
+        self._jobs[job.id] = job
+        job.task = asyncio.get_running_loop().create_task(self._run(job, raw_alarms))
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        return self._jobs.get(job_id)
+
+    async def _run(self, job: BatchJob, raw_alarms: List[Any]):
+        job.status = "running"
+        try:
+            async for results in score_alarm_chunks(raw_alarms, batch_job_id=job.id, route="batch_job"):
+                job.add_results(results)
+            job.status = "completed"
+        except Exception as e:
+            logging.exception(f"Batch job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.utcnow().isoformat()
+            job.finished_monotonic = time.monotonic()
+
+    async def stop(self):
+        for job in self._jobs.values():
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+
+
+batch_jobs = BatchJobStore(result_window=config.BATCH_JOB_RESULT_WINDOW)
@@ -1,9 +1,12 @@
 import os
-import groq
+import threading
+import time
 import logging
 from datetime import datetime
 from dotenv import load_dotenv
 
+from core.metrics import metrics
+
 load_dotenv()
 
 # Configure logging
@@ -11,17 +14,34 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 groq_api_key = os.getenv("GROQ_API_KEY")
 
-# Initialize Groq client with API key
-if groq_api_key:
-    try:
-        client = groq.Groq(api_key=groq_api_key)
-        logging.info("Successfully initialized Groq client.")
-    except Exception as e:
-        logging.error(f"Failed to initialize Groq client: {e}")
-        client = None  # Disable client if initialization fails
-else:
-    logging.warning("GROQ_API_KEY not found in environment.")
-    client = None  # Disable client if API key is missing
+# Groq client, created by get_client() on first use (or during app startup)
+client = None
+_client_initialized = False
+_client_lock = threading.Lock()
+
+def get_client():
+    """Import groq and create the client once; None if it cannot be created"""
+    global client, _client_initialized
+    with _client_lock:
+        if _client_initialized:
+            return client
+        _client_initialized = True
+        # Initialize Groq client with API key
+        if groq_api_key:
+            try:
+                import groq
+                client = groq.Groq(api_key=groq_api_key)
+                logging.info("Successfully initialized Groq client.")
+            except Exception as e:
+                logging.error(f"Failed to initialize Groq client: {e}")
+                client = None  # Disable client if initialization fails
+        else:
+            logging.warning("GROQ_API_KEY not found in environment.")
+            client = None  # Disable client if API key is missing
+        return client
+
+LLM_SECONDS = metrics.histogram("lh410_llm_seconds", "Groq chat completion latency")
+LLM_ERRORS = metrics.counter("lh410_llm_errors_total", "Groq chat completions that failed")
 
 PROMPT_TEMPLATE = """
 You are a technical assistant. Based on this failure prediction:
@@ -37,6 +57,7 @@ Give a clear explanation and actionable recommendation for a field engineer.
 """
 
 async def get_llm_explanation(prediction: dict, alarm: dict):
+    client = get_client()
     if not client:
         logging.warning("Groq client is not initialized. Returning empty explanation and recommendation.")
         return {
@@ -54,15 +75,19 @@ async def get_llm_explanation(prediction: dict, alarm: dict):
         fmi=alarm["fmi"],
         count=alarm["count"]
     )
+    started = time.perf_counter()
     try:
         logging.info(f"Sending prompt to Groq API: {prompt}")
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a predictive maintenance assistant."},
-                {"role": "user", "content": prompt}
-            ]
-        )
+        try:
+            response = client.chat.completions.create(
+                model="llama-3.3-70b-versatile",
+                messages=[
+                    {"role": "system", "content": "You are a predictive maintenance assistant."},
+                    {"role": "user", "content": prompt}
+                ]
+            )
+        finally:
+            LLM_SECONDS.observe(time.perf_counter() - started)
         content = response.choices[0].message.content
         logging.info(f"Received response from Groq API: {content}")
         # Simple split: explanation vs recommendation
@@ -73,6 +98,7 @@ async def get_llm_explanation(prediction: dict, alarm: dict):
             "generated_at": datetime.utcnow()
         }
     except Exception as e:
+        LLM_ERRORS.inc()
         logging.exception(f"Groq API call failed: {e}")
         return {
             "explanation": f"LLM API call failed: {e}",
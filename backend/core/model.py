@@ -1,44 +1,72 @@
 import os
-import joblib
 import numpy as np
-import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 import warnings
 
+from core.features import build_feature_matrix
+from core.registry import ModelRegistry, ModelSet
+from core.cache import PredictionCache
+from core.metrics import metrics, stage_timer
+from config import config
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+
+# Synthetic alarm used to warm up a freshly loaded model set
+WARMUP_ALARM = {
+    "alarm_type": "engine_temperature_high", "component": "engine", "severity": "high",
+    "location": "front", "spn": 110, "fmi": 3, "count": 5, "hours": 1250.5,
+    "timestamp": "2024-01-01T12:00:00"
+}
+
 class OptimizedPredictor:
-    def __init__(self):
-        self.models = {}
-        self.feature_names = {}
-        self.scaler = None
-        self.load_models()
+    def __init__(self, data_dir: Path = DATA_DIR, lazy: bool = False):
+        """With lazy=True the models are loaded by load_models() or on first use"""
+        self.registry = ModelRegistry(data_dir, warmup=self._warm_up)
+        self.cache = PredictionCache(config.PREDICTION_CACHE_SIZE, config.PREDICTION_CACHE_TTL)
+        if not lazy:
+            self.load_models()
     
     def load_models(self):
         """Load all optimized models and their associated files"""
-        data_dir = Path(__file__).parent.parent.parent / "data"
-        
-        # Load robust scaler
-        scaler_path = data_dir / "robust_scaler.pkl"
-        if scaler_path.exists():
-            self.scaler = joblib.load(scaler_path)
-        
-        # Load models for each failure type
-        failure_types = ['failure_occurred', 'engine_failure', 'brake_failure', 'transmission_failure']
-        
-        for failure_type in failure_types:
-            model_path = data_dir / f"best_model_{failure_type}.pkl"
-            feature_names_path = data_dir / f"feature_names_{failure_type}.pkl"
-            
-            if model_path.exists() and feature_names_path.exists():
-                self.models[failure_type] = joblib.load(model_path)
-                self.feature_names[failure_type] = joblib.load(feature_names_path)
-                print(f"✓ Loaded model for {failure_type}")
-            else:
-                print(f"⚠ Model files not found for {failure_type}")
-    
-    def preprocess_new_data(self, alarm_data: Dict[str, Any]) -> pd.DataFrame:
+        self.registry.load()
+    
+    # The active model set; swapped atomically by the registry on reload.
+    # Loads the models on first use, which blocks: only call it from scoring
+    # code running off the event loop
+    @property
+    def model_set(self) -> ModelSet:
+        return self.registry.current or self.registry.ensure_loaded()
+    
+    # Version of the active models, None until they are loaded; never loads them
+    @property
+    def model_version(self) -> Optional[str]:
+        return self.registry.version
+    
+    @property
+    def models(self) -> Dict[str, Any]:
+        return self.model_set.models
+    
+    @property
+    def feature_names(self) -> Dict[str, List[str]]:
+        return self.model_set.feature_names
+    
+    @property
+    def scaler(self):
+        return self.model_set.scaler
+    
+    def _warm_up(self, model_set: ModelSet):
+        """Score a synthetic alarm through every path of a new model set"""
+        features = build_feature_matrix([WARMUP_ALARM] * 2)
+        self.score_matrix(features, model_set)
+        self.score_matrix(features, model_set, use_compiled=False)
+    
+    def preprocess_new_data(self, alarm_data: Dict[str, Any]) -> "pd.DataFrame":
         """Preprocess new alarm data using the same pipeline as training"""
+        # Reference path only; serving never needs pandas
+        import pandas as pd
+
         # Convert to DataFrame
         df = pd.DataFrame([alarm_data])
         
@@ -116,61 +144,163 @@ class OptimizedPredictor:
     
     def predict_failure(self, alarm_data: Dict[str, Any]) -> Dict[str, Any]:
         """Predict failure probabilities for all failure types"""
+        return self.predict_failure_batch([alarm_data])[0]
+    
+    def predict_failure_batch(self, alarms: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Predict failure probabilities for a batch of alarms.
+        
+        Builds one feature matrix for the whole batch and makes a single
+        predict_proba call per model. Results are returned in input order.
+        """
         warnings.filterwarnings("ignore")
+        # Pin the model set so a concurrent reload cannot mix versions
+        model_set = self.model_set
         try:
-            # Preprocess the data
-            features_df = self.preprocess_new_data(alarm_data)
-            
-            # Ensure we have the right features for each model
-            predictions = {}
-            
-            for failure_type, model in self.models.items():
-                if failure_type in self.feature_names:
-                    # Get the expected feature names for this model
-                    expected_features = self.feature_names[failure_type]
-                    
-                    # Create a DataFrame with the expected features
-                    model_features = pd.DataFrame(0, index=[0], columns=expected_features)
-                    
-                    # Fill in the features we have
-                    for feature in expected_features:
-                        if feature in features_df.columns:
-                            model_features[feature] = features_df[feature].iloc[0]
-                    
-                    # Make prediction
-                    if hasattr(model, 'predict_proba'):
-                        prob = model.predict_proba(model_features)[0, 1]
-                    else:
-                        prob = model.predict(model_features)[0]
-                    
-                    predictions[failure_type] = {
-                        'probability': float(prob),
-                        'risk_level': self._get_risk_level(prob)
-                    }
-            
-            # Calculate overall risk
-            overall_prob = predictions.get('failure_occurred', {}).get('probability', 0)
+            # Build the shared feature matrix without an intermediate DataFrame
+            with stage_timer("model", "features"):
+                features = build_feature_matrix(alarms)
+            with stage_timer("model", "score"):
+                probabilities = self._score_with_cache(features, model_set, alarms)
+        except Exception as e:
+            if len(alarms) == 1:
+                return [self._error_result(alarms[0], e, model_set.version)]
+            # Score alarms one by one so a single bad alarm does not fail the batch
+            return [self.predict_failure(alarm_data) for alarm_data in alarms]
+        
+        return [
+            self._format_result(alarm_data, probabilities[i], model_set.version)
+            for i, alarm_data in enumerate(alarms)
+        ]
+    
+    def _score_with_cache(self, features: np.ndarray, model_set: ModelSet,
+                          alarms: List[Dict[str, Any]] = None) -> List[Dict[str, float]]:
+        """Per-row model probabilities, scoring only rows not already cached.
+        
+        Alarms that carry a machine history are only cached when no model
+        reads the history features: time since the last alarm, window counts
+        and rolling statistics change with every alarm, so keys that include
+        them almost never repeat. That is why the cache is off by default
+        while the machine history is on.
+        """
+        if not self.cache.enabled:
+            return self._score_rows(features, model_set)
+        cacheable = np.ones(len(features), dtype=bool)
+        if model_set.reads_history and alarms is not None:
+            cacheable &= np.array([not alarm_data.get('history') for alarm_data in alarms], dtype=bool)
+        if not cacheable.any():
+            self.cache.bypass(len(features))
+            return self._score_rows(features, model_set)
+        
+        rows: List[Dict[str, float]] = [None] * len(features)
+        # Key on the values the models actually read
+        inputs = features[:, model_set.input_columns]
+        keys = {i: PredictionCache.key_for(inputs[i]) for i in np.flatnonzero(cacheable).tolist()}
+        for i, key in keys.items():
+            rows[i] = self.cache.get(key, model_set.version)
+        if len(keys) < len(features):
+            self.cache.bypass(len(features) - len(keys))
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            for i, row in zip(missing, self._score_rows(features[missing], model_set)):
+                rows[i] = row
+                if i in keys:
+                    self.cache.put(keys[i], model_set.version, row)
+        return rows
+    
+    def _score_rows(self, features: np.ndarray, model_set: ModelSet) -> List[Dict[str, float]]:
+        scores = self.score_matrix(features, model_set)
+        return [{t: float(probs[j]) for t, probs in scores.items()} for j in range(len(features))]
+    
+    def score_matrix(self, features: np.ndarray, model_set: ModelSet = None,
+                     use_compiled: bool = True, cascade: bool = None) -> Dict[str, np.ndarray]:
+        """Score a feature matrix with every model, one call per model.
+        
+        In cascade mode the overall failure_occurred model runs first and the
+        component models only score rows whose overall probability reaches
+        CASCADE_THRESHOLD; skipped rows get NaN.
+        """
+        model_set = model_set or self.model_set
+        cascade = config.CASCADE_ENABLED if cascade is None else cascade
+        gated = cascade and 'failure_occurred' in model_set.models
+        
+        order = list(model_set.models)
+        if gated:
+            order.sort(key=lambda failure_type: failure_type != 'failure_occurred')
+        
+        probabilities = {}
+        run_rows = None
+        for failure_type in order:
+            if failure_type not in model_set.feature_plans:
+                continue
+            # Gather this model's columns in its expected order
+            model_features = features[:, model_set.feature_plans[failure_type]]
             
-            return {
-                'predictions': predictions,
-                'overall_risk': {
-                    'probability': float(overall_prob),
-                    'risk_level': self._get_risk_level(overall_prob),
-                    'hours_to_failure': self._estimate_hours_to_failure(overall_prob)
-                },
-                'component': alarm_data.get('component', 'unknown'),
-                'timestamp': datetime.utcnow().isoformat()
-            }
+            if not gated or failure_type == 'failure_occurred':
+                probabilities[failure_type] = self._predict_model(model_set, failure_type, model_features, use_compiled)
+                continue
             
-        except Exception as e:
-            return {
-                'error': f'Prediction failed: {str(e)}',
-                'predictions': {},
-                'overall_risk': {'probability': 0, 'risk_level': 'unknown'},
-                'component': alarm_data.get('component', 'unknown'),
-                'timestamp': datetime.utcnow().isoformat()
+            if run_rows is None:
+                run_rows = np.flatnonzero(probabilities['failure_occurred'] >= config.CASCADE_THRESHOLD)
+            probs = np.full(len(features), np.nan)
+            if len(run_rows):
+                probs[run_rows] = self._predict_model(model_set, failure_type, model_features[run_rows], use_compiled)
+            probabilities[failure_type] = probs
+        return probabilities
+    
+    def _predict_model(self, model_set: ModelSet, failure_type: str, model_features: np.ndarray,
+                       use_compiled: bool = True) -> np.ndarray:
+        model = model_set.models[failure_type]
+        # The flattened evaluator wins on small batches; large ones
+        # are faster through the model's own compiled traversal
+        compiled = model_set.compiled_models.get(failure_type) if use_compiled else None
+        if compiled is not None and len(model_features) <= config.COMPILED_TREES_MAX_ROWS:
+            return compiled.predict_proba(model_features)[:, 1]
+        elif hasattr(model, 'predict_proba'):
+            return model.predict_proba(model_features)[:, 1]
+        else:
+            return model.predict(model_features)
+    
+    def _format_result(self, alarm_data: Dict[str, Any], probabilities: Dict[str, float],
+                       model_version: str = None) -> Dict[str, Any]:
+        """Assemble the prediction response for one alarm"""
+        predictions = {
+            failure_type: self._skipped_prediction() if np.isnan(prob) else {
+                'probability': float(prob),
+                'risk_level': self._get_risk_level(prob)
             }
+            for failure_type, prob in probabilities.items()
+        }
+        
+        # Calculate overall risk
+        overall_prob = predictions.get('failure_occurred', {}).get('probability', 0)
+        
+        return {
+            'predictions': predictions,
+            'overall_risk': {
+                'probability': float(overall_prob),
+                'risk_level': self._get_risk_level(overall_prob),
+                'hours_to_failure': self._estimate_hours_to_failure(overall_prob)
+            },
+            'component': alarm_data.get('component', 'unknown'),
+            'timestamp': datetime.utcnow().isoformat(),
+            'model_version': model_version
+        }
+    
+    def _error_result(self, alarm_data: Dict[str, Any], error: Exception,
+                      model_version: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            'error': f'Prediction failed: {str(error)}',
+            'predictions': {},
+            'overall_risk': {'probability': 0, 'risk_level': 'unknown'},
+            'component': alarm_data.get('component', 'unknown'),
+            'timestamp': datetime.utcnow().isoformat(),
+            'model_version': model_version
+        }
 
+    def _skipped_prediction(self) -> Dict[str, Any]:
+        """Placeholder for a component model the cascade did not run"""
+        return {'probability': None, 'risk_level': 'skipped', 'skipped': True}
+    
     def _get_risk_level(self, probability: float) -> str:
         """Convert probability to risk level"""
         if probability >= 0.8:
@@ -195,5 +325,18 @@ class OptimizedPredictor:
         else:
             return max(0, 720 - probability * 720)  # Low: 0-576 hours
 
-# Initialize the predictor
-predictor = OptimizedPredictor()
\ No newline at end of file
+# Shared predictor; the app loads its models during startup
+predictor = OptimizedPredictor(lazy=True)
+
+def _cache_metrics():
+    """Prediction cache counters, read from the cache at scrape time"""
+    stats = predictor.cache.stats()
+    for field, help_text in (('hits', 'Prediction cache hits'), ('misses', 'Prediction cache misses'),
+                             ('evictions', 'Prediction cache evictions'),
+                             ('bypassed', 'Predictions scored without the cache')):
+        name = f"lh410_prediction_cache_{field}_total"
+        yield name, "counter", help_text, [(name, {}, stats[field])]
+    yield "lh410_prediction_cache_size", "gauge", "Cached predictions", \
+        [("lh410_prediction_cache_size", {}, stats['size'])]
+
+metrics.register_collector(_cache_metrics)
\ No newline at end of file
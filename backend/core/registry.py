@@ -0,0 +1,229 @@
+import hashlib
+import io
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import config
+from core.bundle import BUNDLE_FILENAME, read_bundle
+from core.features import FEATURE_INDEX, HISTORY_COLUMNS, compile_feature_plan
+from core.trees import compile_ensemble
+
+FAILURE_TYPES = ['failure_occurred', 'engine_failure', 'brake_failure', 'transmission_failure']
+
+
+class ModelSet:
+    """One immutable, versioned set of loaded models.
+
+    The version is a hash of the artifact bytes that were actually loaded, so
+    every response can name exactly which models produced it.
+    """
+
+    def __init__(self, models, feature_names, scaler, version: str,
+                 encoders: Optional[Dict[str, List[str]]] = None, model_format: str = "pickle"):
+        self.models = models
+        self.feature_names = feature_names
+        self.scaler = scaler
+        self.version = version
+        self.encoders = encoders or {}
+        self.model_format = model_format
+        self.feature_plans = {
+            failure_type: compile_feature_plan(names) for failure_type, names in feature_names.items()
+        }
+        # Feature matrix columns read by at least one model
+        self.input_columns = np.unique(np.concatenate(
+            list(self.feature_plans.values()) or [np.empty(0, dtype=np.intp)]
+        ))
+        # Whether any model reads a feature taken from the machine's alarm history
+        self.reads_history = bool(np.isin([FEATURE_INDEX[name] for name in HISTORY_COLUMNS], self.input_columns).any())
+        self.compiled_models = {}
+        for failure_type, model in models.items():
+            try:
+                self.compiled_models[failure_type] = compile_ensemble(model)
+            except ValueError as e:
+                print(f"⚠ Using {type(model).__name__} directly for {failure_type}: {e}")
+
+    @staticmethod
+    def artifact_paths(data_dir: Path) -> Dict[str, Tuple[Path, Path]]:
+        return {
+            failure_type: (data_dir / f"best_model_{failure_type}.pkl",
+                           data_dir / f"feature_names_{failure_type}.pkl")
+            for failure_type in FAILURE_TYPES
+        }
+
+    @staticmethod
+    def resolve_format(data_dir: Path, model_format: str = None) -> str:
+        """'bundle' or 'pickle'; 'auto' uses the bundle when data_dir has one"""
+        model_format = model_format or config.MODEL_FORMAT
+        if model_format == "auto":
+            return "bundle" if (data_dir / BUNDLE_FILENAME).exists() else "pickle"
+        if model_format not in ("bundle", "pickle"):
+            raise ValueError(f"Unknown model format '{model_format}'")
+        return model_format
+
+    @classmethod
+    def signature(cls, data_dir: Path) -> tuple:
+        """Cheap change detector: (name, mtime, size) of every artifact"""
+        entries = []
+        paths = [p for pair in cls.artifact_paths(data_dir).values() for p in pair]
+        for path in paths + [data_dir / "robust_scaler.pkl", data_dir / BUNDLE_FILENAME]:
+            if path.exists():
+                stat = path.stat()
+                entries.append((path.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(entries)
+
+    @classmethod
+    def load(cls, data_dir: Path, model_format: str = None) -> "ModelSet":
+        """Load the model bundle or the pickled models, per MODEL_FORMAT"""
+        if cls.resolve_format(data_dir, model_format) == "bundle":
+            return cls.load_bundle(data_dir / BUNDLE_FILENAME)
+        return cls.load_pickles(data_dir)
+
+    @classmethod
+    def load_bundle(cls, path: Path) -> "ModelSet":
+        """Load a bundle written by data/export_model_bundle.py; needs NumPy only"""
+        bundle = read_bundle(path)
+        stale = [p.name for p in path.parent.glob("best_model_*.pkl") if p.stat().st_mtime > path.stat().st_mtime]
+        if stale:
+            logging.warning(f"{', '.join(sorted(stale))} newer than {path.name}; re-run export_model_bundle.py")
+        for failure_type in bundle.models:
+            print(f"✓ Loaded model for {failure_type} from {path.name}")
+        return cls(bundle.models, bundle.feature_names, bundle.scaler, bundle.checksum[:12],
+                   encoders=bundle.encoders, model_format="bundle")
+
+    @classmethod
+    def load_pickles(cls, data_dir: Path) -> "ModelSet":
+        """Load all optimized models and their associated files"""
+        # Imported here so bundle deployments never load joblib, sklearn or xgboost
+        import joblib
+
+        digest = hashlib.sha256()
+
+        def read(path: Path) -> Any:
+            data = path.read_bytes()
+            digest.update(path.name.encode())
+            digest.update(data)
+            return joblib.load(io.BytesIO(data))
+
+        # Load robust scaler
+        scaler_path = data_dir / "robust_scaler.pkl"
+        scaler = read(scaler_path) if scaler_path.exists() else None
+
+        # Load models for each failure type
+        models, feature_names = {}, {}
+        for failure_type, (model_path, feature_names_path) in cls.artifact_paths(data_dir).items():
+            if model_path.exists() and feature_names_path.exists():
+                models[failure_type] = read(model_path)
+                feature_names[failure_type] = read(feature_names_path)
+                print(f"✓ Loaded model for {failure_type}")
+            else:
+                print(f"⚠ Model files not found for {failure_type}")
+
+        return cls(models, feature_names, scaler, digest.hexdigest()[:12])
+
+
+class ModelRegistry:
+    """Holds the active ModelSet and hot-swaps it when the artifacts change.
+
+    A background thread polls the artifact files in data_dir. When they change
+    (and have stopped changing between two polls, so half-written files are
+    not picked up), the new set is loaded and warmed up off to the side, then
+    swapped in with a single reference assignment. Requests that already
+    grabbed the previous set finish on it.
+    """
+
+    def __init__(self, data_dir: Path, warmup: Optional[Callable[[ModelSet], None]] = None):
+        self.data_dir = Path(data_dir)
+        self.warmup = warmup
+        self.current: Optional[ModelSet] = None
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._signature = None
+        self._failed_signature = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.current.version if self.current is not None else None
+
+    def load(self) -> ModelSet:
+        """Load the artifacts synchronously and make them active"""
+        with self._lock:
+            return self._load()
+
+    def ensure_loaded(self) -> ModelSet:
+        """The active set, loading it first if nothing has been loaded yet"""
+        with self._lock:
+            return self.current if self.current is not None else self._load()
+
+    def _load(self) -> ModelSet:
+        signature = ModelSet.signature(self.data_dir)
+        model_set = ModelSet.load(self.data_dir)
+        if self.warmup is not None and model_set.models:
+            self.warmup(model_set)
+        self.current = model_set
+        self._signature = signature
+        return model_set
+
+    def check_for_update(self) -> bool:
+        """Reload if the artifacts changed since the active set was loaded"""
+        signature = ModelSet.signature(self.data_dir)
+        if signature == self._signature or signature == self._failed_signature:
+            return False
+        if not signature:
+            return False
+
+        # Wait for writers to finish before loading
+        self._stop.wait(0.5)
+        if ModelSet.signature(self.data_dir) != signature:
+            return False
+
+        previous = self.version
+        try:
+            self.load()
+        except Exception as e:
+            self._failed_signature = signature
+            self.last_error = str(e)
+            logging.error(f"Model reload failed, keeping version {previous}: {e}")
+            return False
+
+        self.reloads += 1
+        self.last_error = None
+        logging.info(f"Swapped models {previous} -> {self.version}")
+        return True
+
+    def start_watching(self, interval: float):
+        """Poll for new artifacts every interval seconds in a daemon thread"""
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(interval):
+                try:
+                    self.check_for_update()
+                except Exception as e:
+                    logging.error(f"Model watcher error: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="model-registry", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'format': self.current.model_format if self.current is not None else None,
+            'reloads': self.reloads,
+            'watching': self._watcher is not None and self._watcher.is_alive(),
+            'last_error': self.last_error,
+        }
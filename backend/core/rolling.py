@@ -0,0 +1,81 @@
+import math
+from collections import deque
+from typing import Iterable, Tuple
+
+# Number of consecutive alarms the *_rolling_mean / *_rolling_std features cover
+ROLLING_WINDOW = 3
+
+
+class RollingWindowStats:
+    """Mean and sample standard deviation of the last `window` values.
+
+    Values enter and leave with Welford-style updates of the running mean and
+    sum of squared deviations, so push() is O(1) whatever the window size.
+    The live service keeps one per machine and feature. The offline pipeline
+    computes the same features with Series.rolling(window, min_periods=1)
+    mean()/std(), which this matches: the standard deviation of a single
+    value is NaN. Like pandas, a window of
+    identical values resets to an exact zero variance, which also clears any
+    rounding drift left behind by removals.
+    """
+
+    __slots__ = ('window', 'values', 'mean', 'm2', 'run_length')
+
+    def __init__(self, window: int = ROLLING_WINDOW):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.run_length = 0
+
+    def restore(self, values: Iterable[float], run_length: int):
+        """Reload saved window values into an empty window; the mean and variance are recomputed"""
+        for x in values:
+            self._add(float(x))
+        self.run_length = int(run_length)
+        if self.values and self.run_length >= len(self.values):
+            self.mean, self.m2 = self.values[-1], 0.0
+
+    def copy(self) -> "RollingWindowStats":
+        clone = RollingWindowStats(self.window)
+        clone.values = self.values.copy()
+        clone.mean, clone.m2, clone.run_length = self.mean, self.m2, self.run_length
+        return clone
+
+    @property
+    def count(self) -> int:
+        return len(self.values)
+
+    def _add(self, x: float):
+        self.values.append(x)
+        delta = x - self.mean
+        self.mean += delta / len(self.values)
+        self.m2 += delta * (x - self.mean)
+
+    def _remove(self):
+        y = self.values.popleft()
+        n = len(self.values)
+        if n == 0:
+            self.mean = self.m2 = 0.0
+            return
+        delta = y - self.mean
+        self.mean -= delta / n
+        self.m2 -= delta * (y - self.mean)
+
+    @property
+    def std(self) -> float:
+        n = len(self.values)
+        if n < 2:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.0) / (n - 1))
+
+    def push(self, x: float) -> Tuple[float, float]:
+        """Add a value, dropping the oldest once the window is full; returns (mean, std)"""
+        x = float(x)
+        self.run_length = self.run_length + 1 if self.values and self.values[-1] == x else 1
+        if len(self.values) == self.window:
+            self._remove()
+        self._add(x)
+        if self.run_length >= len(self.values):
+            self.mean, self.m2 = x, 0.0
+        return self.mean, self.std
@@ -0,0 +1,302 @@
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import config
+from core.batching import RunningStats
+from core.features import build_feature_matrix
+from core.trees import compile_ensemble
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+
+# Probability at which a model is taken to predict a failure
+DECISION_THRESHOLD = 0.5
+
+
+class CandidateStats:
+    """How one candidate model compares with the served model"""
+
+    def __init__(self):
+        self.rows = 0
+        self.decision_agreements = 0
+        self.risk_level_agreements = 0
+        self.abs_diff_total = 0.0
+        self.max_abs_diff = 0.0
+        self.errors = 0
+        self.latency_ms_per_row = RunningStats()
+
+    def add(self, served: np.ndarray, candidate: np.ndarray, risk_level, elapsed_ms: float):
+        diff = np.abs(candidate - served)
+        self.rows += len(served)
+        self.decision_agreements += int(np.sum((candidate >= DECISION_THRESHOLD) == (served >= DECISION_THRESHOLD)))
+        self.risk_level_agreements += sum(risk_level(a) == risk_level(b) for a, b in zip(served, candidate))
+        self.abs_diff_total += float(diff.sum())
+        self.max_abs_diff = max(self.max_abs_diff, float(diff.max()))
+        self.latency_ms_per_row.add(elapsed_ms / len(served))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'rows': self.rows,
+            'decision_agreement': self.decision_agreements / self.rows if self.rows else None,
+            'risk_level_agreement': self.risk_level_agreements / self.rows if self.rows else None,
+            'mean_abs_diff': self.abs_diff_total / self.rows if self.rows else None,
+            'max_abs_diff': self.max_abs_diff,
+            'errors': self.errors,
+            'latency_ms_per_row': self.latency_ms_per_row.summary(),
+        }
+
+
+class ShadowEvaluation:
+    """Candidate models and their running comparison with the served model.
+
+    Lives in the shadow process: candidates are loaded from all_models_*.pkl
+    on the first batch, and the served model comes from that process's own
+    predictor.
+    """
+
+    def __init__(self, data_dir: Path = DATA_DIR, candidates: Optional[List[str]] = None):
+        self.data_dir = Path(data_dir)
+        self.candidate_names = candidates or None
+        self.scored = 0
+        self.last_error: Optional[str] = None
+        self.served_version: Optional[str] = None
+        self.stats_by_model: Dict[str, Dict[str, CandidateStats]] = {}
+        self._candidates: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _load_candidates(self) -> Dict[str, Dict[str, Any]]:
+        import joblib
+
+        candidates = {}
+        for path in sorted(self.data_dir.glob("all_models_*.pkl")):
+            failure_type = path.stem[len("all_models_"):]
+            models = {
+                name: model for name, model in joblib.load(path).items()
+                if self.candidate_names is None or name in self.candidate_names
+            }
+            candidates[failure_type] = {}
+            for name, model in models.items():
+                try:
+                    compiled = compile_ensemble(model)
+                except ValueError:
+                    compiled = None
+                candidates[failure_type][name] = (model, compiled)
+        return candidates
+
+    @staticmethod
+    def _predict(model, compiled, X: np.ndarray) -> np.ndarray:
+        # Same choice of evaluator as the serving path
+        if compiled is not None and len(X) <= config.COMPILED_TREES_MAX_ROWS:
+            return compiled.predict_proba(X)[:, 1]
+        if hasattr(model, 'predict_proba'):
+            return model.predict_proba(X)[:, 1]
+        return np.asarray(model.predict(X), dtype=np.float64)
+
+    def score(self, alarms: List[Dict[str, Any]], results: List[Dict[str, Any]]):
+        """Score one batch of served alarms with every candidate and record the comparison"""
+        from core.model import predictor
+
+        if self._candidates is None:
+            self._candidates = self._load_candidates()
+        model_set = predictor.model_set
+        self.served_version = model_set.version
+        features = build_feature_matrix(alarms)
+
+        for failure_type, candidates in self._candidates.items():
+            plan = model_set.feature_plans.get(failure_type)
+            if plan is None:
+                continue
+            served = np.array([
+                np.nan if result['predictions'].get(failure_type, {}).get('probability') is None
+                else result['predictions'][failure_type]['probability']
+                for result in results
+            ], dtype=np.float64)
+            rows = ~np.isnan(served)
+            if not rows.any():
+                continue
+            X = features[rows][:, plan]
+            models = {**candidates, 'served': (model_set.models[failure_type],
+                                               model_set.compiled_models.get(failure_type))}
+            for name, (model, compiled) in models.items():
+                stats = self.stats_by_model.setdefault(failure_type, {}).setdefault(name, CandidateStats())
+                try:
+                    started = time.perf_counter()
+                    probabilities = self._predict(model, compiled, X)
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                except Exception as e:
+                    stats.errors += 1
+                    self.last_error = f"{failure_type}/{name}: {e}"
+                    continue
+                stats.add(served[rows], probabilities, predictor._get_risk_level, elapsed_ms)
+        self.scored += len(alarms)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'scored': self.scored,
+            'served_version': self.served_version,
+            'last_error': self.last_error,
+            'models': {
+                failure_type: {name: stats.summary() for name, stats in by_name.items()}
+                for failure_type, by_name in self.stats_by_model.items()
+            },
+        }
+
+
+def _publish(reports: "multiprocessing.Queue", report: Dict[str, Any]):
+    """Replace the report waiting in a one-slot queue with a newer one"""
+    try:
+        reports.get_nowait()
+    except queue.Empty:
+        pass
+    try:
+        reports.put_nowait(report)
+    except queue.Full:
+        pass
+
+
+def _shadow_process(data_dir: Path, candidates: Optional[List[str]], batch_size: int,
+                    alarms: "multiprocessing.Queue", reports: "multiprocessing.Queue", stop):
+    """Shadow process main loop: score queued alarms and publish the running report"""
+    try:
+        os.nice(19)
+    except (AttributeError, OSError):
+        pass
+    from core.model import predictor
+    predictor.registry.start_watching(config.MODEL_RELOAD_INTERVAL)
+
+    evaluation = ShadowEvaluation(data_dir, candidates)
+    while not stop.is_set():
+        try:
+            batch = [alarms.get(timeout=0.5)]
+        except queue.Empty:
+            continue
+        while len(batch) < batch_size:
+            try:
+                batch.append(alarms.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            evaluation.score([alarm_data for alarm_data, _ in batch], [result for _, result in batch])
+        except Exception as e:
+            evaluation.last_error = str(e)
+            logging.warning(f"Shadow scoring failed: {e}")
+        _publish(reports, evaluation.report())
+
+
+class ShadowScorer:
+    """Scores a sample of live alarms with the alternate models in all_models_*.pkl.
+
+    offer() is called after a prediction has been made; it samples alarms at
+    sample_rate and hands them to a bounded queue without waiting, dropping
+    them when the queue is full. A separate, reniced process loads the
+    candidates and its own copy of the served model, rebuilds the alarms'
+    features, scores them with every candidate (and, as a latency reference,
+    the served model) and records how often each candidate agrees with what
+    was served. Unpickling and scoring never hold this process's GIL; the
+    shadow process sends back its latest report after every batch.
+    """
+
+    def __init__(self, data_dir: Path = DATA_DIR, sample_rate: float = 0.0, queue_size: int = 1024,
+                 batch_size: int = 64, candidates: Optional[List[str]] = None):
+        self.data_dir = Path(data_dir)
+        self.sample_rate = sample_rate
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.candidate_names = candidates or None
+        self.sampled = 0
+        self.dropped = 0
+        # Spawned, not forked: the server has threads running by the time it starts
+        self._context = multiprocessing.get_context("spawn")
+        self._queue = self._context.Queue(maxsize=queue_size) if self.enabled else None
+        self._reports = self._context.Queue(maxsize=1) if self.enabled else None
+        self._report: Dict[str, Any] = ShadowEvaluation().report()
+        self._lock = threading.Lock()
+        self._stop = None
+        self._worker = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    @property
+    def scored(self) -> int:
+        return self._latest_report()['scored']
+
+    def offer(self, alarms: List[Dict[str, Any]], results: List[Dict[str, Any]]):
+        """Sample scored alarms for shadow evaluation; never blocks.
+
+        The queue pickles its items later, in a feeder thread, while callers
+        go on adding fields to the results; it gets copies of the dicts.
+        """
+        if not self.enabled or self._worker is None:
+            return
+        for alarm_data, result in zip(alarms, results):
+            if not result.get('predictions') or random.random() >= self.sample_rate:
+                continue
+            self.sampled += 1
+            try:
+                self._queue.put_nowait((dict(alarm_data), {'predictions': dict(result['predictions'])}))
+            except queue.Full:
+                self.dropped += 1
+
+    def start(self):
+        if not self.enabled or (self._worker is not None and self._worker.is_alive()):
+            return
+        self._stop = self._context.Event()
+        self._worker = self._context.Process(
+            target=_shadow_process, name="shadow-scoring", daemon=True,
+            args=(self.data_dir, self.candidate_names, self.batch_size, self._queue, self._reports, self._stop)
+        )
+        self._worker.start()
+
+    def stop(self):
+        if self._worker is None:
+            return
+        self._stop.set()
+        self._worker.join(timeout=5)
+        if self._worker.is_alive():
+            self._worker.terminate()
+            self._worker.join(timeout=1)
+        self._latest_report()
+        self._worker = None
+
+    def _latest_report(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._reports is None:
+                return self._report
+            try:
+                self._report = self._reports.get_nowait()
+            except queue.Empty:
+                pass
+            return self._report
+
+    def stats(self) -> Dict[str, Any]:
+        report = self._latest_report()
+        return {
+            'enabled': self.enabled,
+            'running': self._worker is not None and self._worker.is_alive(),
+            'sample_rate': self.sample_rate,
+            'sampled': self.sampled,
+            'scored': report['scored'],
+            'dropped': self.dropped,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'served_version': report['served_version'],
+            'last_error': report['last_error'],
+            'models': report['models'],
+        }
+
+
+# Shadow evaluation of the alternate models; off unless SHADOW_SAMPLE_RATE > 0
+shadow_scorer = ShadowScorer(
+    sample_rate=config.SHADOW_SAMPLE_RATE,
+    queue_size=config.SHADOW_QUEUE_SIZE,
+    batch_size=config.SHADOW_BATCH_SIZE,
+    candidates=[name.strip() for name in config.SHADOW_MODELS.split(",") if name.strip()],
+)
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+import db.mongodb as mongodb
+from config import config
+from core.columnar import ColumnarFileError, read_columns, write_columns
+from core.rolling import ROLLING_WINDOW
+from core.state import ALARM_WINDOWS, COMPONENT_WINDOW, MachineStateStore, machine_state
+
+# Columnar file (see core/columnar.py) tagged with this magic and version
+SNAPSHOT_MAGIC = b"LH410STA"
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Without a snapshot, replay this much of the log history (the longest window)
+REPLAY_HORIZON_SECONDS = COMPONENT_WINDOW
+
+# Logs read from MongoDB per replay query
+REPLAY_BATCH_SIZE = 5000
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, every process writes
+    fcntl = None
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is corrupt or was written with another layout"""
+    pass
+
+
+def _state_schema() -> Dict[str, Any]:
+    """Window settings a snapshot is only valid for"""
+    return {
+        'alarm_windows': ALARM_WINDOWS,
+        'component_window': COMPONENT_WINDOW,
+        'rolling_window': ROLLING_WINDOW,
+    }
+
+
+def write_snapshot(path: Path, columns: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> int:
+    """Write columns atomically (temp file + rename); returns the file size"""
+    return write_columns(path, SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, columns, metadata)
+
+
+def read_snapshot(path: Path) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Read and verify a snapshot; raises SnapshotError if it cannot be trusted"""
+    try:
+        columns, metadata, _ = read_columns(path, SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION)
+    except ColumnarFileError as e:
+        raise SnapshotError(f"Invalid machine state snapshot: {e}") from e
+    return columns, metadata
+
+
+class StateSnapshotter:
+    """Saves the machine state to disk and restores it on startup.
+
+    A snapshot is written every interval seconds and on shutdown. Startup
+    loads the latest snapshot and replays only the logs committed after it
+    was taken; without a usable snapshot the last REPLAY_HORIZON_SECONDS of logs
+    are replayed instead.
+
+    When several processes share the snapshot path, only the one holding the
+    exclusive lock on "<path>.lock" writes snapshots; the others restore and
+    replay but never save.
+    """
+
+    def __init__(self, store: MachineStateStore, path: Path, interval: float = 300):
+        self.store = store
+        self.path = Path(path)
+        self.interval = interval
+        self.saves = 0
+        self.last_saved_at: Optional[str] = None
+        self.last_size = 0
+        self.last_save_ms = 0.0
+        self.restored_machines = 0
+        self.replayed_logs = 0
+        self.last_error: Optional[str] = None
+        self.writer: Optional[bool] = None
+        self._lock_file = None
+        self._task: Optional[asyncio.Task] = None
+
+    def acquire_writer(self) -> bool:
+        """Try to become the only process that writes this snapshot path"""
+        if self.writer is not None:
+            return self.writer
+        if fcntl is None:
+            self.writer = True
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.path.with_name(self.path.name + ".lock"), "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            self.writer = False
+            logging.warning(f"Another process writes {self.path}; pid {os.getpid()} will not save snapshots")
+            return False
+        # Held (and the lock kept) for the life of the process
+        self._lock_file = lock_file
+        self.writer = True
+        return True
+
+    def release_writer(self):
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        self.writer = None
+
+    def save(self) -> Dict[str, Any]:
+        """Write a snapshot of the current state"""
+        started = time.perf_counter()
+        columns, created_ts = self.store.export_columns()
+        metadata = {
+            'created_at': datetime.fromtimestamp(created_ts, timezone.utc).isoformat(),
+            'created_ts': created_ts,
+            'machines': len(columns['machine_id']),
+            'schema': _state_schema(),
+        }
+        self.last_size = write_snapshot(self.path, columns, metadata)
+        self.last_save_ms = (time.perf_counter() - started) * 1000
+        self.last_saved_at = metadata['created_at']
+        self.saves += 1
+        return metadata
+
+    def restore(self) -> Optional[Dict[str, Any]]:
+        """Load the snapshot into the store; returns its metadata, or None if unusable"""
+        if not self.path.exists():
+            return None
+        try:
+            columns, metadata = read_snapshot(self.path)
+            if metadata.get('schema') != json.loads(json.dumps(_state_schema())):
+                raise SnapshotError("Snapshot was taken with different window settings")
+            self.store.import_columns(columns)
+        except (SnapshotError, KeyError, ValueError, OSError) as e:
+            self.last_error = str(e)
+            logging.warning(f"Ignoring machine state snapshot {self.path}: {e}")
+            return None
+        self.restored_machines = int(metadata['machines'])
+        logging.info(f"Restored {self.restored_machines} machines from snapshot taken {metadata['created_at']}")
+        return metadata
+
+    async def replay_logs(self, since_ts: Optional[float] = None) -> int:
+        """Feed alarm logs committed after since_ts (or the replay horizon) into the store.
+
+        Only logs tagged with committed_at, the time their alarm entered the
+        machine state, are replayed; logs of failed predictions carry no tag.
+        A snapshot's created_ts and committed_at are taken under the same
+        lock, so committed_at > since_ts selects exactly the alarms missing
+        from the snapshot. Logs are inserted after their commit, so the _id
+        range starting at since_ts's second covers them; they are read in _id
+        order, REPLAY_BATCH_SIZE at a time, each query resuming after the
+        last _id read.
+        """
+        start = since_ts if since_ts is not None else time.time() - REPLAY_HORIZON_SECONDS
+        start_second = int(math.floor(start))
+        id_filter = {"$gte": ObjectId.from_datetime(datetime.fromtimestamp(start_second, timezone.utc))}
+        committed_filter = {"$gt": since_ts} if since_ts is not None else {"$exists": True}
+
+        replayed = 0
+        while True:
+            logs = await mongodb.safe_find(
+                mongodb.logs_collection,
+                filter_dict={"_id": id_filter, "committed_at": committed_filter},
+                sort_list=[("_id", 1)],
+                limit_count=REPLAY_BATCH_SIZE
+            )
+            for log in logs:
+                try:
+                    self.store.observe(log)
+                    replayed += 1
+                except Exception as e:
+                    logging.warning(f"Skipping unreadable log {log.get('_id')} during replay: {e}")
+            if len(logs) < REPLAY_BATCH_SIZE:
+                break
+            id_filter = {"$gt": ObjectId(str(logs[-1]["_id"]))}
+        self.replayed_logs += replayed
+        return replayed
+
+    async def start(self):
+        """Restore the state, replay newer logs and start periodic snapshots"""
+        if not self.store.enabled:
+            return
+        self.acquire_writer()
+        metadata = await asyncio.to_thread(self.restore)
+        replayed = await self.replay_logs(metadata['created_ts'] if metadata else None)
+        logging.info(f"Replayed {replayed} alarm logs into the machine state")
+        if self.writer and self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.save)
+            except Exception as e:
+                self.last_error = str(e)
+                logging.error(f"Machine state snapshot failed: {e}")
+
+    async def stop(self):
+        """Stop periodic snapshots and write a final one"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if not self.writer:
+            return
+        try:
+            await asyncio.to_thread(self.save)
+        except Exception as e:
+            logging.error(f"Final machine state snapshot failed: {e}")
+        finally:
+            self.release_writer()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'path': str(self.path),
+            'interval_seconds': self.interval,
+            'writer': self.writer,
+            'saves': self.saves,
+            'last_saved_at': self.last_saved_at,
+            'last_size_bytes': self.last_size,
+            'last_save_ms': self.last_save_ms,
+            'restored_machines': self.restored_machines,
+            'replayed_logs': self.replayed_logs,
+            'last_error': self.last_error,
+        }
+
+
+# Snapshots of the shared machine state
+state_snapshots = StateSnapshotter(machine_state, config.STATE_SNAPSHOT_PATH, config.STATE_SNAPSHOT_INTERVAL)
@@ -0,0 +1,305 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import config
+from core.features import ROLLING_BASE_FEATURES, parse_timestamp
+from core.rolling import RollingWindowStats
+from core.windows import ALARM_WINDOWS, COMPONENT_WINDOW, COMPONENTS, DEFAULT_MACHINE_ID
+
+
+def epoch_seconds(value: Any) -> float:
+    """Alarm timestamp as POSIX seconds; naive timestamps are taken as UTC"""
+    ts = parse_timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class SlidingWindowCounter:
+    """Number of events in the window (t - width, t].
+
+    Event times are kept in a deque in arrival order; expired times are popped
+    from the left as the window advances, so each event is appended and
+    removed once and updates are amortized O(1).
+    """
+
+    __slots__ = ('width', 'times')
+
+    def __init__(self, width: float):
+        self.width = width
+        self.times = deque()
+
+    def add(self, t: float) -> int:
+        """Record an event at time t and return the count including it"""
+        self.times.append(t)
+        return self.count(t)
+
+    def count(self, t: float) -> int:
+        cutoff = t - self.width
+        times = self.times
+        while times and times[0] <= cutoff:
+            times.popleft()
+        return len(times)
+
+
+class WindowPreview:
+    """A live window plus events not yet recorded in it, counted without changing it.
+
+    Live times that have left the window are skipped with an index instead of
+    being popped; pending events go to a small window of their own. Times must
+    not decrease, so each count is amortized O(1).
+    """
+
+    __slots__ = ('times', 'expired', 'pending')
+
+    def __init__(self, window: SlidingWindowCounter):
+        self.times = window.times
+        self.expired = 0
+        self.pending = SlidingWindowCounter(window.width)
+
+    def _live(self, t: float) -> int:
+        cutoff = t - self.pending.width
+        times = self.times
+        while self.expired < len(times) and times[self.expired] <= cutoff:
+            self.expired += 1
+        return len(times) - self.expired
+
+    def add(self, t: float) -> int:
+        return self._live(t) + self.pending.add(t)
+
+    def count(self, t: float) -> int:
+        return self._live(t) + self.pending.count(t)
+
+
+class MachineState:
+    """Alarm history of one machine"""
+
+    __slots__ = ('last_seen', 'alarm_windows', 'component_windows', 'rolling')
+
+    def __init__(self):
+        self.last_seen: Optional[float] = None
+        self.alarm_windows = {name: SlidingWindowCounter(width) for name, width in ALARM_WINDOWS.items()}
+        self.component_windows = {component: SlidingWindowCounter(COMPONENT_WINDOW) for component in COMPONENTS}
+        self.rolling = {feature: RollingWindowStats() for feature in ROLLING_BASE_FEATURES}
+
+    def windows(self) -> List[Tuple[str, SlidingWindowCounter]]:
+        """Every sliding window with a stable name, for snapshots"""
+        return ([(f'alarms.{name}', window) for name, window in self.alarm_windows.items()]
+                + [(f'component.{name}', window) for name, window in self.component_windows.items()])
+
+    def observe(self, t: float, component: str) -> Dict[str, float]:
+        """Record an alarm and return the history features as of that alarm.
+
+        Counts include the alarm itself, like the training windows. An alarm
+        that arrives with an earlier timestamp than the last one seen is
+        counted at the last timestamp so the windows stay ordered.
+        """
+        if self.last_seen is not None and t < self.last_seen:
+            t = self.last_seen
+        history = {
+            'time_since_last_alarm': (t - self.last_seen) / 60 if self.last_seen is not None else 0.0
+        }
+        self.last_seen = t
+
+        for name, window in self.alarm_windows.items():
+            history[name] = window.add(t)
+        for name, window in self.component_windows.items():
+            if name == component:
+                history[f'{name}_alarms_24h'] = window.add(t)
+            else:
+                history[f'{name}_alarms_24h'] = window.count(t)
+
+        # Rolling statistics over this machine's last alarms; a single value
+        # has no std, which the training pipeline fills with 0
+        for feature, stats in self.rolling.items():
+            mean, std = stats.push(history[feature])
+            history[f'{feature}_rolling_mean'] = mean
+            history[f'{feature}_rolling_std'] = 0.0 if math.isnan(std) else std
+        return history
+
+
+class MachinePreview:
+    """A machine's history as it would be after more alarms, leaving the live state unchanged.
+
+    Only the rolling windows (a few values each) are copied; the sliding
+    windows are read in place through WindowPreview.
+    """
+
+    __slots__ = ('last_seen', 'alarm_windows', 'component_windows', 'rolling')
+
+    def __init__(self, state: Optional[MachineState]):
+        if state is None:
+            state = MachineState()
+        self.last_seen = state.last_seen
+        self.alarm_windows = {name: WindowPreview(window) for name, window in state.alarm_windows.items()}
+        self.component_windows = {name: WindowPreview(window) for name, window in state.component_windows.items()}
+        self.rolling = {feature: stats.copy() for feature, stats in state.rolling.items()}
+
+    observe = MachineState.observe
+
+
+class MachineStateStore:
+    """In-memory alarm history for every machine, keyed by machine_id.
+
+    observe() updates a machine's windows and returns its history features
+    without touching the database. Routes score an alarm before it enters the
+    history: annotate() attaches the features the alarm would get without
+    recording it, and commit() records the alarms whose prediction succeeded.
+    Requests for the same machine in flight at the same time do not see each
+    other's alarms. At most max_machines are held; the least recently seen
+    machine is dropped first. Safe to call from several threads.
+
+    commit() and export_columns() both report the time they ran at, taken
+    under the store lock, so every commit is either in an export or later
+    than it.
+
+    When disabled, annotate() attaches nothing and commit() records nothing,
+    so alarms are scored with the simplified history defaults.
+    """
+
+    def __init__(self, max_machines: int = 10000, enabled: bool = True):
+        self.max_machines = max_machines
+        self.enabled = enabled
+        self.observed = 0
+        self.evictions = 0
+        self._machines: "OrderedDict[str, MachineState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(alarm: Dict[str, Any]) -> Tuple[str, float, str]:
+        machine_id = str(alarm.get('machine_id') or DEFAULT_MACHINE_ID)
+        return machine_id, epoch_seconds(alarm.get('timestamp')), str(alarm.get('component', '')).lower()
+
+    def _observe(self, machine_id: str, t: float, component: str) -> Dict[str, float]:
+        state = self._machines.get(machine_id)
+        if state is None:
+            state = self._machines[machine_id] = MachineState()
+            while len(self._machines) > self.max_machines:
+                self._machines.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._machines.move_to_end(machine_id)
+        self.observed += 1
+        return state.observe(t, component)
+
+    def observe(self, alarm: Dict[str, Any]) -> Dict[str, float]:
+        key = self._key(alarm)
+        with self._lock:
+            return self._observe(*key)
+
+    def preview(self, alarms: List[Dict[str, Any]]) -> List[Dict[str, float]]:
+        """History features the alarms would get, in order, without recording them.
+
+        Later alarms of a machine count the earlier ones in the list. The live
+        windows are read in place, so the cost does not grow with a machine's
+        history; the store is left unchanged.
+        """
+        keys = [self._key(alarm) for alarm in alarms]
+        pending: Dict[str, MachinePreview] = {}
+        histories = []
+        with self._lock:
+            for machine_id, t, component in keys:
+                state = pending.get(machine_id)
+                if state is None:
+                    state = pending[machine_id] = MachinePreview(self._machines.get(machine_id))
+                histories.append(state.observe(t, component))
+        return histories
+
+    def annotate_many(self, alarms: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Attach each validated alarm's history for the feature builder, without recording it"""
+        if not self.enabled:
+            return alarms
+        for alarm_data, history in zip(alarms, self.preview(alarms)):
+            alarm_data['history'] = history
+        return alarms
+
+    def annotate(self, alarm_data: Dict[str, Any]) -> Dict[str, Any]:
+        return self.annotate_many([alarm_data])[0]
+
+    def commit(self, alarms: List[Dict[str, Any]]) -> float:
+        """Record scored alarms in their machines' history; returns the commit time (POSIX seconds)"""
+        if not self.enabled:
+            return time.time()
+        keys = [self._key(alarm) for alarm in alarms]
+        with self._lock:
+            for key in keys:
+                self._observe(*key)
+            return time.time()
+
+    def get(self, machine_id: str) -> Optional[MachineState]:
+        return self._machines.get(machine_id)
+
+    def export_columns(self) -> Tuple[Dict[str, np.ndarray], float]:
+        """Columnar copy of every machine's state, least recently seen first, and the time it was taken.
+
+        Each sliding window and rolling window becomes a lengths column plus
+        one flat column with all machines' values concatenated.
+        """
+        with self._lock:
+            exported_at = time.time()
+            machines = list(self._machines.items())
+            machine_windows = [state.windows() for _, state in machines]
+            columns = {
+                'machine_id': np.array([machine_id for machine_id, _ in machines], dtype=str),
+                'last_seen': np.array([np.nan if state.last_seen is None else state.last_seen
+                                       for _, state in machines], dtype=np.float64),
+            }
+            for index, (name, _) in enumerate(MachineState().windows()):
+                windows = [windows[index][1].times for windows in machine_windows]
+                columns[f'{name}.lengths'] = np.array([len(times) for times in windows], dtype=np.int32)
+                columns[f'{name}.times'] = np.array([t for times in windows for t in times], dtype=np.float64)
+            for feature in ROLLING_BASE_FEATURES:
+                rolling = [state.rolling[feature] for _, state in machines]
+                columns[f'rolling.{feature}.lengths'] = np.array([stats.count for stats in rolling], dtype=np.int32)
+                columns[f'rolling.{feature}.values'] = np.array([x for stats in rolling for x in stats.values],
+                                                                dtype=np.float64)
+                columns[f'rolling.{feature}.run_length'] = np.array([stats.run_length for stats in rolling],
+                                                                    dtype=np.int32)
+        return columns, exported_at
+
+    def import_columns(self, columns: Dict[str, np.ndarray]):
+        """Replace all machines with the state saved by export_columns()"""
+        machine_ids = [str(machine_id) for machine_id in columns['machine_id']]
+        states = [MachineState() for _ in machine_ids]
+        for state, last_seen in zip(states, columns['last_seen'].tolist()):
+            state.last_seen = None if math.isnan(last_seen) else last_seen
+
+        def split(lengths, values):
+            values = np.asarray(values).tolist()
+            offsets = np.concatenate([[0], np.cumsum(lengths)]).tolist()
+            return [values[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+        machine_windows = [state.windows() for state in states]
+        for index, (name, _) in enumerate(MachineState().windows()):
+            for windows, times in zip(machine_windows, split(columns[f'{name}.lengths'], columns[f'{name}.times'])):
+                windows[index][1].times.extend(times)
+        for feature in ROLLING_BASE_FEATURES:
+            values = split(columns[f'rolling.{feature}.lengths'], columns[f'rolling.{feature}.values'])
+            for state, window, run_length in zip(states, values, columns[f'rolling.{feature}.run_length'].tolist()):
+                state.rolling[feature].restore(window, run_length)
+
+        with self._lock:
+            self._machines = OrderedDict(zip(machine_ids, states))
+
+    def clear(self):
+        with self._lock:
+            self._machines.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'machines': len(self._machines),
+            'max_machines': self.max_machines,
+            'observed': self.observed,
+            'evictions': self.evictions,
+        }
+
+
+# Shared online history for all ingestion routes
+machine_state = MachineStateStore(config.STATE_MAX_MACHINES, enabled=config.MACHINE_STATE_ENABLED)
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Optional, Tuple
+
+from starlette.responses import StreamingResponse
+
+from config import config
+from core.jobs import alarm_error_result, score_alarm_chunks
+
+_END = object()
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse that leaves the request body to the endpoint.
+
+    The stock response listens for the client disconnecting by reading from
+    receive(), which would swallow request body chunks that the generator is
+    still consuming. Here the generator reads the body itself and sees the
+    disconnect as the end of the stream.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def read_ndjson(body: AsyncIterator[bytes],
+                      max_line_bytes: int = 65536) -> AsyncIterator[Tuple[int, Any, Optional[str]]]:
+    """Split a byte stream into JSON records.
+
+    Yields (index, record, error) for every non-blank line; record is None
+    and error is set when the line is not valid JSON or is longer than
+    max_line_bytes (the rest of such a line is skipped).
+    """
+    buffer = bytearray()
+    index = 0
+    oversized = False
+
+    def parse(line: bytes):
+        try:
+            return json.loads(line), None
+        except ValueError as e:
+            return None, f"Invalid JSON: {e}"
+
+    async for data in body:
+        buffer += data
+        start = 0
+        while True:
+            newline = buffer.find(b"\n", start)
+            if newline < 0:
+                break
+            line_start, start = start, newline + 1
+            if oversized:
+                # Rest of a line already reported as too long
+                oversized = False
+                continue
+            if newline - line_start > max_line_bytes:
+                yield index, None, f"Line exceeds {max_line_bytes} bytes"
+                index += 1
+                continue
+            line = bytes(buffer[line_start:newline]).strip()
+            if line:
+                yield (index, *parse(line))
+                index += 1
+        del buffer[:start]
+        if not oversized and len(buffer) > max_line_bytes:
+            yield index, None, f"Line exceeds {max_line_bytes} bytes"
+            index += 1
+            oversized = True
+        if oversized:
+            buffer.clear()
+
+    line = bytes(buffer).strip()
+    if line and not oversized:
+        yield (index, *parse(line))
+
+
+async def score_alarm_stream(body: AsyncIterator[bytes], batch_size: int = None,
+                             window_ms: float = None, queue_size: int = None) -> AsyncIterator[str]:
+    """Score an NDJSON stream of alarm logs in rolling batches.
+
+    A reader task parses the body into a bounded queue. Batches are cut when
+    batch_size records are waiting or window_ms after the first one arrived,
+    scored and stored like /api/predict/batch chunks, and written out as NDJSON
+    lines carrying the record's position in the stream as index. When scoring
+    falls behind, the queue fills up, the reader stops pulling from the body
+    and the server stops reading from the socket, which slows the sender down.
+    """
+    batch_size = batch_size or config.STREAM_BATCH_SIZE
+    max_wait = (window_ms if window_ms is not None else config.STREAM_BATCH_WINDOW_MS) / 1000.0
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or config.STREAM_QUEUE_SIZE)
+    loop = asyncio.get_running_loop()
+
+    async def pump():
+        try:
+            async for record in read_ndjson(body, config.STREAM_MAX_LINE_BYTES):
+                await queue.put(record)
+        finally:
+            await queue.put(_END)
+
+    reader = loop.create_task(pump())
+    try:
+        finished = False
+        while not finished:
+            first = await queue.get()
+            if first is _END:
+                break
+            batch = [first]
+            deadline = loop.time() + max_wait
+            while len(batch) < batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if record is _END:
+                    finished = True
+                    break
+                batch.append(record)
+
+            lines = [
+                json.dumps(alarm_error_result(index, None, error)) + "\n"
+                for index, _, error in batch if error is not None
+            ]
+            parsed = [(index, record) for index, record, error in batch if error is None]
+            if parsed:
+                async for results in score_alarm_chunks([record for _, record in parsed],
+                                                    chunk_size=len(parsed), route="stream"):
+                    for (index, _), result in zip(parsed, results):
+                        result["index"] = index
+                        lines.append(json.dumps(result, default=str) + "\n")
+            yield "".join(lines)
+    finally:
+        reader.cancel()
+        try:
+            await reader
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logging.info(f"Alarm stream ended: {e}")
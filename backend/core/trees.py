@@ -0,0 +1,198 @@
+import json
+import numpy as np
+from typing import Any, Dict, List
+
+
+class FlatEnsemble:
+    """A tree ensemble flattened into parallel NumPy node arrays.
+
+    All trees share one set of arrays (feature, threshold, left, right, value)
+    and roots holds each tree's first node. Leaves point to themselves, so a
+    batch can be traversed level by level with a fixed number of vectorized
+    steps: every row walks every tree at once.
+
+    kind is either 'mean_proba' (sklearn forests: leaf values are class-1
+    probabilities averaged over trees) or 'logistic_margin' (XGBoost: leaf
+    values are summed with the base margin and passed through a sigmoid).
+    """
+
+    def __init__(self, feature, threshold, left, right, value, missing_left, roots,
+                 max_depth: int, kind: str, strict: bool = False, base_margin: float = 0.0,
+                 n_features: int = 0):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.missing_left = np.ascontiguousarray(missing_left, dtype=bool)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.kind = kind
+        self.strict = strict
+        self.base_margin = float(base_margin)
+        self.n_features = int(n_features)
+        # children[2 * node + went_left] is the next node; built once here,
+        # including for ensembles read from a bundle, rather than per apply()
+        self.children = np.column_stack([self.right, self.left]).ravel()
+        self._root_nodes = self.roots.astype(np.intp)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Return the leaf index reached in every tree, shape (n_rows, n_trees)"""
+        # Trees are trained and evaluated on float32 inputs
+        X = np.asarray(X, dtype=np.float32)
+        n, width = X.shape
+        flat_x = X.astype(np.float64).ravel()
+        has_missing = bool(np.isnan(flat_x).any())
+
+        children = self.children
+        row_offsets = (np.arange(n, dtype=np.intp) * width)[:, None]
+        nodes = np.broadcast_to(self._root_nodes, (n, self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            x = flat_x[row_offsets + self.feature[nodes]]
+            threshold = self.threshold[nodes]
+            go_left = x < threshold if self.strict else x <= threshold
+            if has_missing:
+                go_left |= np.isnan(x) & self.missing_left[nodes]
+            nodes = children[2 * nodes + go_left]
+        return nodes
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities for a binary classifier, shape (n_rows, 2)"""
+        leaf_values = self.value[self.apply(X)]
+        if self.kind == 'mean_proba':
+            positive = leaf_values.mean(axis=1)
+        else:
+            margin = self.base_margin + leaf_values.astype(np.float32).sum(axis=1, dtype=np.float32)
+            positive = 1.0 / (1.0 + np.exp(-margin.astype(np.float64)))
+        return np.column_stack([1.0 - positive, positive])
+
+
+def _depth_of(left: np.ndarray, right: np.ndarray, root: int) -> int:
+    depth, frontier = 0, [root]
+    while True:
+        children = [c for n in frontier for c in (left[n], right[n]) if c != n]
+        if not children:
+            return depth
+        depth += 1
+        frontier = children
+
+
+def _compile_sklearn_forest(model) -> FlatEnsemble:
+    classes = list(getattr(model, 'classes_', []))
+    if len(classes) != 2:
+        raise ValueError(f"Only binary classifiers can be compiled, got classes {classes}")
+    estimators = getattr(model, 'estimators_', [model])
+
+    features, thresholds, lefts, rights, values, missing, roots = [], [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        own = np.arange(offset, offset + n)
+
+        counts = tree.value[:, 0, :].astype(np.float64)
+        totals = counts.sum(axis=1)
+        totals[totals == 0] = 1.0
+
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, own, tree.children_left + offset))
+        rights.append(np.where(is_leaf, own, tree.children_right + offset))
+        values.append(counts[:, 1] / totals)
+        missing.append(getattr(tree, 'missing_go_to_left', np.zeros(n, dtype=np.uint8)).astype(bool))
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n
+
+    return FlatEnsemble(
+        np.concatenate(features), np.concatenate(thresholds), np.concatenate(lefts),
+        np.concatenate(rights), np.concatenate(values), np.concatenate(missing), roots,
+        max_depth=max_depth, kind='mean_proba', n_features=model.n_features_in_
+    )
+
+
+def _xgboost_base_margin(booster) -> float:
+    params = json.loads(booster.save_config())['learner']['learner_model_param']
+    base_score = float(str(params['base_score']).strip('[]'))
+    return float(np.log(base_score / (1.0 - base_score)))
+
+
+def _compile_xgboost(model) -> FlatEnsemble:
+    booster = model.get_booster()
+    objective = json.loads(booster.save_config())['learner']['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Only binary:logistic boosters can be compiled, got {objective}")
+    feature_names = booster.feature_names
+
+    def feature_index(split: str) -> int:
+        if feature_names and split in feature_names:
+            return feature_names.index(split)
+        return int(split.lstrip('f'))
+
+    features, thresholds, lefts, rights, values, missing, roots = [], [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for dump in booster.get_dump(dump_format='json'):
+        nodes: Dict[int, Dict[str, Any]] = {}
+        stack = [json.loads(dump)]
+        while stack:
+            node = stack.pop()
+            nodes[node['nodeid']] = node
+            stack.extend(node.get('children', []))
+
+        n = max(nodes) + 1
+        feature = np.zeros(n, dtype=np.int32)
+        threshold = np.full(n, np.inf)
+        left = np.arange(offset, offset + n)
+        right = left.copy()
+        value = np.zeros(n)
+        missing_left = np.zeros(n, dtype=bool)
+        for node_id, node in nodes.items():
+            if 'leaf' in node:
+                value[node_id] = node['leaf']
+            else:
+                feature[node_id] = feature_index(node['split'])
+                threshold[node_id] = np.float32(node['split_condition'])
+                left[node_id] = node['yes'] + offset
+                right[node_id] = node['no'] + offset
+                missing_left[node_id] = node['missing'] == node['yes']
+
+        features.append(feature)
+        thresholds.append(threshold)
+        lefts.append(left)
+        rights.append(right)
+        values.append(value)
+        missing.append(missing_left)
+        roots.append(offset)
+        max_depth = max(max_depth, _depth_of(left - offset, right - offset, 0))
+        offset += n
+
+    return FlatEnsemble(
+        np.concatenate(features), np.concatenate(thresholds), np.concatenate(lefts),
+        np.concatenate(rights), np.concatenate(values), np.concatenate(missing), roots,
+        max_depth=max_depth, kind='logistic_margin', strict=True,
+        base_margin=_xgboost_base_margin(booster), n_features=booster.num_features()
+    )
+
+
+def compile_ensemble(model) -> FlatEnsemble:
+    """Flatten a fitted sklearn tree/forest classifier or XGBoost classifier.
+
+    Raises ValueError for models that cannot be compiled (e.g. SVMs or
+    multi-class models); callers should fall back to the model itself.
+    """
+    if isinstance(model, FlatEnsemble):
+        return model
+    if hasattr(model, 'get_booster'):
+        return _compile_xgboost(model)
+    if hasattr(model, 'tree_') or (hasattr(model, 'estimators_') and hasattr(model.estimators_[0], 'tree_')):
+        return _compile_sklearn_forest(model)
+    raise ValueError(f"Cannot compile model of type {type(model).__name__}")
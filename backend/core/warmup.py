@@ -0,0 +1,171 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from config import config
+from core.batching import MicroBatcher
+from core.features import build_feature_matrix
+from core.registry import ModelSet
+from core.state import MachineStateStore
+from db.models import PredictionOut
+from utils.preprocessing import validate_alarm_data
+
+# Timed calls per model and per pipeline stage after the first one
+WARMUP_ROUNDS = 20
+
+_ALARM_TYPES = ["engine_temperature_high", "brake_pressure_low", "transmission_filter_blocked",
+                "electrical_voltage_low", "safety_e-stop", "maintenance_due"]
+_COMPONENTS = ["engine", "brake", "transmission", "electrical", "sensor"]
+_SEVERITIES = ["low", "medium", "high", "critical"]
+
+
+def synthetic_alarms(n: int) -> List[Dict[str, Any]]:
+    """Validated alarms that differ in every model input, so none are cache hits.
+
+    Their history comes from a scratch state store; the shared machine state
+    never sees them.
+    """
+    history = MachineStateStore()
+    start = datetime(2024, 1, 1)
+    return history.annotate_many([validate_alarm_data({
+        "alarm_type": _ALARM_TYPES[i % len(_ALARM_TYPES)],
+        "component": _COMPONENTS[i % len(_COMPONENTS)],
+        "severity": _SEVERITIES[i % len(_SEVERITIES)],
+        "spn": 100 + i, "fmi": i % 32, "count": 1 + i % 5, "hours": 1000.0 + i,
+        "machine_id": "warmup",
+        "timestamp": (start + timedelta(hours=7 * i)).isoformat(),
+    }) for i in range(n)])
+
+
+def _latency(samples_ms: List[float]) -> Dict[str, float]:
+    return {
+        'first_ms': samples_ms[0],
+        'p50_ms': float(np.percentile(samples_ms[1:] or samples_ms, 50)),
+        'max_ms': max(samples_ms[1:] or samples_ms),
+    }
+
+
+def _time_calls(fn: Callable[[], Any], rounds: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(rounds + 1):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return _latency(samples)
+
+
+def measure_model_latency(model_set: ModelSet, rounds: int = WARMUP_ROUNDS) -> Dict[str, Dict[str, Any]]:
+    """Time every model on a single synthetic row, compiled and direct"""
+    features = build_feature_matrix(synthetic_alarms(1))
+    report = {}
+    for failure_type, model in model_set.models.items():
+        X = features[:, model_set.feature_plans[failure_type]]
+        compiled = model_set.compiled_models.get(failure_type)
+        direct = model.predict_proba if hasattr(model, 'predict_proba') else model.predict
+        report[failure_type] = {
+            'compiled': _time_calls(lambda: compiled.predict_proba(X), rounds) if compiled is not None else None,
+            'direct': _time_calls(lambda: direct(X), rounds),
+        }
+    return report
+
+
+class Readiness:
+    """Whether startup warm-up has finished, and what it measured"""
+
+    def __init__(self):
+        self.ready = False
+        self.status = "starting"
+        self.error: Optional[str] = None
+        self.model_version: Optional[str] = None
+        self.started_at: Optional[str] = None
+        self.duration_ms: Optional[float] = None
+        self.model_latency_ms: Dict[str, Any] = {}
+        self.pipeline_latency_ms: Dict[str, Any] = {}
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'ready': self.ready,
+            'status': self.status,
+            'error': self.error,
+            'model_version': self.model_version,
+            'started_at': self.started_at,
+            'duration_ms': self.duration_ms,
+            'model_latency_ms': self.model_latency_ms,
+            'pipeline_latency_ms': self.pipeline_latency_ms,
+        }
+
+
+async def run_warmup(readiness: Readiness, predictor, executor, batcher=None, rounds: int = WARMUP_ROUNDS):
+    """Push synthetic alarms through every model and the full request path.
+
+    Covers feature building, each model's compiled and direct scoring, the
+    inference executor with all of its workers busy, one full micro-batch
+    submitted alarm by alarm through batcher (a temporary MicroBatcher on
+    executor when none is given), response validation and JSON encoding.
+    Sets readiness.ready once everything has run; a failure leaves the
+    service not ready with the error recorded.
+    """
+    readiness.status = "warming"
+    readiness.started_at = datetime.utcnow().isoformat()
+    started = time.perf_counter()
+    try:
+        # Normally loaded during startup; if not, load off the event loop
+        model_set = await asyncio.to_thread(predictor.registry.ensure_loaded)
+        readiness.model_version = model_set.version
+        readiness.model_latency_ms = await asyncio.to_thread(measure_model_latency, model_set, rounds)
+
+        # A batch larger than the executor's queue limit could never be scored
+        batch_size = min(config.BATCH_MAX_SIZE, executor.max_queue)
+        alarms = synthetic_alarms(max(rounds + 1, batch_size, 2 * executor.workers))
+        single = []
+        for alarm in alarms[:rounds + 1]:
+            call_started = time.perf_counter()
+            result = (await executor.predict_batch([dict(alarm)]))[0]
+            json.dumps(PredictionOut(**{**result, 'predicted_at': readiness.started_at}).model_dump())
+            single.append((time.perf_counter() - call_started) * 1000)
+
+        # Start every worker thread or process
+        await asyncio.gather(*(executor.predict_batch([dict(alarm)]) for alarm in alarms[:2 * executor.workers]))
+
+        call_started = time.perf_counter()
+        await executor.predict_batch([dict(alarm) for alarm in alarms[:batch_size]])
+        batch_ms = (time.perf_counter() - call_started) * 1000
+
+        # The request path: concurrent submissions grouped by the micro-batcher
+        own_batcher = batcher is None
+        if own_batcher:
+            batcher = MicroBatcher(executor.predict_batch, batch_size, config.BATCH_WINDOW_MS, executor.max_queue)
+        try:
+            call_started = time.perf_counter()
+            await asyncio.gather(*(batcher.submit(dict(alarm)) for alarm in alarms[:batch_size]))
+            micro_batch_ms = (time.perf_counter() - call_started) * 1000
+        finally:
+            if own_batcher:
+                await batcher.stop()
+        readiness.pipeline_latency_ms = {
+            'single_alarm': _latency(single),
+            'batch': {'size': batch_size, 'ms': batch_ms},
+            'micro_batch': {'size': batch_size, 'ms': micro_batch_ms},
+        }
+
+        # Synthetic results should not occupy the prediction cache, in this
+        # process or in the inference processes
+        executor.clear_caches()
+        readiness.ready = True
+        readiness.status = "ready"
+    except Exception as e:
+        readiness.status = "failed"
+        readiness.error = str(e)
+        logging.exception(f"Startup warm-up failed: {e}")
+    finally:
+        readiness.duration_ms = (time.perf_counter() - started) * 1000
+    logging.info(f"Startup warm-up {readiness.status} in {readiness.duration_ms:.0f} ms")
+
+
+# Startup readiness shared by the app
+readiness = Readiness()
@@ -0,0 +1,17 @@
+# Alarm history definitions shared by the live service (core/state.py) and
+# the offline pipeline (data/preprocess_alarm_data.py). This module imports
+# nothing, so the data scripts can use it with only data/requirements.txt.
+
+# Machine of the alarms that carry no machine_id
+DEFAULT_MACHINE_ID = "default"
+
+# Sliding windows behind the alarm count features, in seconds
+ALARM_WINDOWS = {
+    'alarms_last_1h': 3600,
+    'alarms_last_6h': 6 * 3600,
+    'alarms_last_24h': 24 * 3600,
+}
+COMPONENT_WINDOW = 24 * 3600
+
+# Components with a {component}_alarms_24h count feature
+COMPONENTS = ['engine', 'brake', 'transmission', 'sensor', 'electrical']
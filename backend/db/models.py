@@ -12,10 +12,12 @@ class AlarmLogIn(BaseModel):
     severity: Optional[str] = "medium"
     location: Optional[str] = "front"
     timestamp: Optional[str] = None
+    machine_id: Optional[str] = Field(None, max_length=100)
 
 class FailurePrediction(BaseModel):
-    probability: float
+    probability: Optional[float] = None
     risk_level: str
+    skipped: bool = False
 
 class OverallRisk(BaseModel):
     probability: float
@@ -1,6 +1,5 @@
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+import time
 
 # Universal import block for local and deployment
 try:
@@ -8,8 +7,19 @@ try:
 except ImportError:
     from config import Config
 
+# Always the module the app and /metrics use: importing it as
+# backend.core.metrics would create a second registry that is never exported
+from core.metrics import metrics
+
 config = Config()
 
+MONGODB_SECONDS = metrics.histogram(
+    "lh410_mongodb_seconds", "MongoDB operation latency", ["operation", "collection"]
+)
+MONGODB_ERRORS = metrics.counter(
+    "lh410_mongodb_errors_total", "MongoDB operations that raised", ["operation", "collection"]
+)
+
 # MongoDB client and database
 client = None
 db = None
@@ -22,6 +32,9 @@ explanations_collection = None
 async def connect_to_mongodb():
     """Connect to MongoDB with error handling"""
     global client, db, logs_collection, predictions_collection, explanations_collection
+    # Imported here so the driver loads during startup, not at import time
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
     
     try:
         print(f"Connecting to MongoDB: {config.MONGODB_URI}")
@@ -65,6 +78,7 @@ async def ensure_indexes():
         await predictions_collection.create_index("component", background=True)
         await predictions_collection.create_index("predicted_at", background=True)
         await predictions_collection.create_index([("predicted_at", -1)], background=True)
+        await predictions_collection.create_index([("alarm_log.batch_job_id", 1), ("index", 1)], background=True)
         
         # Explanations collection indexes
         await explanations_collection.create_index("timestamp", background=True)
@@ -91,12 +105,36 @@ async def safe_insert_one(collection, document):
         print("⚠️  Database not connected, skipping insert")
         return None
     
+    started = time.perf_counter()
     try:
         result = await collection.insert_one(document)
         return result
     except Exception as e:
+        MONGODB_ERRORS.inc(operation="insert_one", collection=collection.name)
         print(f"⚠️  Failed to insert document: {e}")
         return None
+    finally:
+        MONGODB_SECONDS.observe(time.perf_counter() - started, operation="insert_one", collection=collection.name)
+
+async def safe_insert_many(collection, documents):
+    """Safely bulk insert documents into a collection"""
+    if collection is None:
+        print("⚠️  Database not connected, skipping insert")
+        return None
+    if not documents:
+        return None
+    
+    started = time.perf_counter()
+    try:
+        # Unordered so one bad document does not stop the rest
+        result = await collection.insert_many(documents, ordered=False)
+        return result
+    except Exception as e:
+        MONGODB_ERRORS.inc(operation="insert_many", collection=collection.name)
+        print(f"⚠️  Failed to insert documents: {e}")
+        return None
+    finally:
+        MONGODB_SECONDS.observe(time.perf_counter() - started, operation="insert_many", collection=collection.name)
 
 async def safe_find(collection, filter_dict=None, sort_list=None, limit_count=None):
     """Safely find documents in a collection"""
@@ -104,6 +142,7 @@ async def safe_find(collection, filter_dict=None, sort_list=None, limit_count=No
         print("⚠️  Database not connected, returning empty list")
         return []
     
+    started = time.perf_counter()
     try:
         cursor = collection.find(filter_dict or {})
         
@@ -128,5 +167,8 @@ async def safe_find(collection, filter_dict=None, sort_list=None, limit_count=No
         docs = await cursor.to_list(length=None)
         return [convert_objectid(doc) for doc in docs]
     except Exception as e:
+        MONGODB_ERRORS.inc(operation="find", collection=collection.name)
         print(f"⚠️  Failed to find documents: {e}")
-        return [] 
\ No newline at end of file
+        return []
+    finally:
+        MONGODB_SECONDS.observe(time.perf_counter() - started, operation="find", collection=collection.name) 
\ No newline at end of file
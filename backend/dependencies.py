@@ -0,0 +1,28 @@
+# Shared request dependencies. Routes import these from here rather than from
+# main, so importing a route module does not import the whole app.
+from fastapi import Depends
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+# Universal import block for local and deployment
+try:
+    from backend.config import Config
+except ImportError:
+    from config import Config
+
+config = Config()
+
+# API Key for authentication
+API_KEY = config.API_KEY
+
+# Rate limiter
+limiter = Limiter(key_func=get_remote_address)
+
+# TEMPORARY: Optional API Key Auth Dependency (disabled for testing)
+def api_key_auth(credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer(auto_error=False))):
+    # Skip authentication for testing
+    return True
+    # Uncomment below to re-enable authentication
+    # if not credentials or credentials != API_KEY:
+    #     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API Key")
@@ -0,0 +1,40 @@
+# Gunicorn settings for serving with several workers that share model memory.
+#
+#   gunicorn -c gunicorn.conf.py main:app
+#
+# With preload_app the master imports the app and loads the models once
+# before forking; workers then share those pages copy-on-write instead of
+# each unpickling their own copy.
+#
+# The per-machine alarm history lives in each worker's memory, so a worker
+# would only see the alarms it served; several workers need
+# MACHINE_STATE_ENABLED=0.
+import gc
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("PRELOAD_APP", "1") != "0"
+timeout = 120
+
+if workers > 1 and os.getenv("MACHINE_STATE_ENABLED", "1") != "0":
+    raise RuntimeError(
+        f"{workers} workers would each keep part of every machine's alarm history; "
+        "run one worker or set MACHINE_STATE_ENABLED=0"
+    )
+
+
+def when_ready(server):
+    # The app loads its models during startup, which runs in each worker; load
+    # them in the master instead so the workers inherit them
+    if preload_app:
+        from core.model import predictor
+        predictor.registry.ensure_loaded()
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the collector's reach; otherwise
+    # the first GC pass in each worker writes to every object header and
+    # un-shares the pages holding the models
+    gc.freeze()
@@ -5,16 +5,13 @@ if not os.path.exists('main.py') or not os.path.exists('config.py'):
 
 
 
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, APIRouter, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
+import asyncio
 import logging
 
-app = FastAPI(title="Sandvik LH410 Failure Predictor API")
-
 # Universal import block for local and deployment
 try:
     from backend.config import Config
@@ -35,47 +32,27 @@ if config.GROQ_API_KEY:
 else:
     logging.warning("GROQ_API_KEY is NOT present in backend/config.py")
 
-# CORS settings
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins for local development
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# API Key for authentication
-API_KEY = config.API_KEY
-
-# Rate limiter
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
-# TEMPORARY: Optional API Key Auth Dependency (disabled for testing)
-def api_key_auth(credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer(auto_error=False))):
-    # Skip authentication for testing
-    return True
-    # Uncomment below to re-enable authentication
-    # if not credentials or credentials != API_KEY:
-    #     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API Key")
-
-
-# Include routes
-from routes import predict, explain, logs
-app.include_router(predict.router)
-app.include_router(explain.router)
-app.include_router(logs.router)
+# Auth and rate limiting live in dependencies.py; re-exported for older imports
+from dependencies import API_KEY, api_key_auth, limiter
 
-# --- PATCH: Override /api/alarm to generate and store AI Insights automatically ---
-from fastapi import Request
+# Heavy subsystems (models, LLM client, MongoDB driver) are not loaded by these
+# imports; startup_event initializes them in parallel
+from routes import predict, explain, logs
 from routes.predict import router as predict_router
 try:
     from backend.core import llm
 except ImportError:
     import core.llm as llm
-from fastapi import APIRouter
+from core.batching import batcher
+from core.executor import inference_executor
+from core.model import predictor
+from core.jobs import batch_jobs
+from core.snapshot import state_snapshots
+from core.shadow import shadow_scorer
+from core.warmup import readiness, run_warmup
+from core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics
 
+# --- PATCH: Override /api/alarm to generate and store AI Insights automatically ---
 alarm_router = APIRouter()
 
 @alarm_router.post("/api/alarm")
@@ -105,23 +82,10 @@ async def alarm_predict(request: Request):
         print("Error in alarm_predict:", e)
         return {"status": "error", "detail": str(e)}
 
-app.include_router(alarm_router)
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize MongoDB connection on startup"""
-    await mongodb.connect_to_mongodb()
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Close MongoDB connection on shutdown"""
-    await mongodb.close_mongodb_connection()
-
-
 # Add /api/insights endpoint to accept POST requests from frontend
+service_router = APIRouter()
 
-from fastapi import Body
-@app.post("/api/insights")
+@service_router.post("/api/insights")
 async def receive_insights(insights: dict = Body(...)):
     """Store received AI insights in MongoDB"""
     try:
@@ -144,12 +108,12 @@ async def receive_insights(insights: dict = Body(...)):
     except Exception as e:
         print("Error storing AI insights:", e)
         return {"status": "error", "detail": str(e)}
-@app.get("/v1/models")
+@service_router.get("/v1/models")
 async def dummy_models():
     """Dummy endpoint to silence frontend 404 errors."""
     return {"models": []}
 
-@app.get("/api/insights")
+@service_router.get("/api/insights")
 async def get_insights():
     """Fetch all AI insights from MongoDB"""
     try:
@@ -173,6 +137,86 @@ async def get_insights():
         print("Error fetching AI insights:", e)
         return {"status": "error", "detail": str(e)}
 
-@app.get("/api/health")
+@service_router.get("/api/health")
 def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@service_router.get("/api/ready")
+def readiness_check():
+    """503 until startup warm-up has pushed synthetic alarms through every model"""
+    from fastapi.responses import JSONResponse
+    return JSONResponse(readiness.report(), status_code=200 if readiness.ready else 503)
+
+@service_router.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Stage latency histograms and error/cache counters in Prometheus text format"""
+    from fastapi.responses import Response
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+def create_app() -> FastAPI:
+    """Build the API app.
+
+    Nothing heavy happens here: the models, the Groq client and the MongoDB
+    driver are loaded concurrently by the startup handler. Serve with
+    `uvicorn main:app` or `uvicorn --factory main:create_app`.
+    """
+    app = FastAPI(title="Sandvik LH410 Failure Predictor API")
+
+    # CORS settings
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allow all origins for local development
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Rate limiter
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+    # Include routes
+    app.include_router(predict.router)
+    app.include_router(explain.router)
+    app.include_router(logs.router)
+    app.include_router(alarm_router)
+    app.include_router(service_router)
+
+    @app.on_event("startup")
+    async def startup_event():
+        """Connect to MongoDB, load the models and create the LLM client in parallel"""
+        async def connect_and_restore_state():
+            await mongodb.connect_to_mongodb()
+            # Log replay reads from MongoDB, so it waits for the connection
+            await state_snapshots.start()
+
+        await asyncio.gather(
+            connect_and_restore_state(),
+            # A preloading gunicorn master has already loaded them
+            asyncio.to_thread(predictor.registry.ensure_loaded),
+            asyncio.to_thread(llm.get_client),
+        )
+        predictor.registry.start_watching(config.MODEL_RELOAD_INTERVAL)
+        shadow_scorer.start()
+        # Warm up in the background; /api/ready reports when it is done
+        app.state.warmup_task = asyncio.create_task(run_warmup(readiness, predictor, inference_executor, batcher))
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        """Close MongoDB connection on shutdown"""
+        predictor.registry.stop_watching()
+        shadow_scorer.stop()
+        warmup_task = getattr(app.state, "warmup_task", None)
+        if warmup_task is not None and not warmup_task.done():
+            warmup_task.cancel()
+        await batcher.stop()
+        await batch_jobs.stop()
+        inference_executor.shutdown()
+        await state_snapshots.stop()
+        await mongodb.close_mongodb_connection()
+
+    return app
+
+
+app = create_app()
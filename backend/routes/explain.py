@@ -2,8 +2,9 @@ from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
 from db.models import AlarmLogIn, PredictionOut, ExplanationOut
 from core.llm import get_llm_explanation
+from core.metrics import stage_timer
 import db.mongodb as mongodb
-from main import api_key_auth, limiter
+from dependencies import api_key_auth, limiter
 from datetime import datetime
 import logging
 
@@ -20,18 +21,20 @@ async def explain_prediction(
     _=Depends(api_key_auth)
 ):
     # Compose dicts for LLM
-    alarm = explain_in.dict()
+    alarm = explain_in.model_dump()
     prediction = {
         "probability": explain_in.overall_risk.probability,
         "hours_to_failure": explain_in.overall_risk.hours_to_failure,
         "component": explain_in.component
     }
-    explanation = await get_llm_explanation(prediction, alarm)
-    await mongodb.safe_insert_one(mongodb.explanations_collection, {
-        **explanation, 
-        "alarm_log": alarm, 
-        "prediction": prediction
-    })
+    with stage_timer("explain", "llm"):
+        explanation = await get_llm_explanation(prediction, alarm)
+    with stage_timer("explain", "store"):
+        await mongodb.safe_insert_one(mongodb.explanations_collection, {
+            **explanation, 
+            "alarm_log": alarm, 
+            "prediction": prediction
+        })
     return explanation
 
 @router.get("/test_groq")
@@ -2,7 +2,7 @@
 from fastapi import APIRouter, Depends, Request, Body, HTTPException
 import db.mongodb as mongodb
 from db.models import AlarmLogIn, PredictionOut, ExplanationOut
-from main import api_key_auth, limiter
+from dependencies import api_key_auth, limiter
 from typing import List
 from fastapi.responses import JSONResponse
 
@@ -36,7 +36,12 @@ async def get_logs(request: Request, _=Depends(api_key_auth)):
 # POST /api/alarm: Accepts AlarmLogIn, stores log, triggers prediction, returns log and prediction
 
 from db.models import AlarmLogIn, PredictionOut
-from core.model import predictor
+from core.batching import batcher
+from core.executor import InferenceQueueFull
+from core.streaming import DuplexStreamingResponse, score_alarm_stream
+from core.state import machine_state
+from core.metrics import stage_timer
+from core.shadow import shadow_scorer
 from utils.preprocessing import validate_alarm_data
 from datetime import datetime
 from bson import ObjectId
@@ -53,23 +58,43 @@ def fix_mongo_ids(doc):
 async def post_alarm_log(alarm_log: AlarmLogIn, request: Request, _=Depends(api_key_auth)):
     try:
         # Validate and prepare features
-        alarm_data = validate_alarm_data(alarm_log.dict())
+        with stage_timer("alarm", "validate"):
+            alarm_data = machine_state.annotate(validate_alarm_data(alarm_log.model_dump()))
         # Make prediction
-        prediction_result = predictor.predict_failure(alarm_data)
+        with stage_timer("alarm", "inference"):
+            prediction_result = await batcher.submit(alarm_data)
+        committed_at = machine_state.commit([alarm_data]) if "error" not in prediction_result else None
+        shadow_scorer.offer([alarm_data], [prediction_result])
         prediction_result["predicted_at"] = datetime.utcnow().isoformat()
-        prediction_result["model_version"] = "optimized_v1"
         # Store log and prediction in database
-        alarm_log_dict = alarm_log.dict()
+        alarm_log_dict = alarm_log.model_dump()
         alarm_log_dict["timestamp"] = alarm_log_dict.get("timestamp") or datetime.utcnow().isoformat()
-        await mongodb.safe_insert_one(mongodb.logs_collection, alarm_log_dict)
-        await mongodb.safe_insert_one(mongodb.predictions_collection, {
-            **prediction_result,
-            "alarm_log": alarm_log_dict
-        })
+        if committed_at is not None:
+            # Marks the alarm as part of the machine history for snapshot replay
+            alarm_log_dict["committed_at"] = committed_at
+        with stage_timer("alarm", "store"):
+            await mongodb.safe_insert_one(mongodb.logs_collection, alarm_log_dict)
+            await mongodb.safe_insert_one(mongodb.predictions_collection, {
+                **prediction_result,
+                "alarm_log": alarm_log_dict
+            })
         return fix_mongo_ids({"log": alarm_log_dict, "prediction": prediction_result})
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to process alarm log: {e}")
 
+# POST /api/alarm/stream: Accepts NDJSON AlarmLogIn records, streams back NDJSON predictions
+@router.post("/alarm/stream")
+@limiter.limit("10/minute")
+async def stream_alarm_logs(request: Request, _=Depends(api_key_auth)):
+    """Score a long-lived NDJSON feed of alarm logs.
+    
+    Each input line is one AlarmLogIn record; each output line is its
+    prediction (or error) with the record's position in the stream as index.
+    """
+    return DuplexStreamingResponse(score_alarm_stream(request.stream()), media_type="application/x-ndjson")
+
 # GET /api/predictions: Return latest predictions
 @router.get("/predictions", response_model=list)
 @limiter.limit("10/minute")
@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi import APIRouter, Body, Depends, Request, HTTPException
+from fastapi.responses import StreamingResponse
 from db.models import AlarmLogIn, PredictionOut
 from utils.preprocessing import clean_and_prepare_features, validate_alarm_data
 from core.model import predictor
+from core.batching import batcher
+from core.executor import inference_executor, InferenceQueueFull
+from core.jobs import batch_jobs, score_alarm_chunks
+from core.state import machine_state
+from core.snapshot import state_snapshots
+from core.shadow import shadow_scorer
+from core.metrics import stage_timer
+from config import config
 import db.mongodb as mongodb
-from main import api_key_auth, limiter
+from dependencies import api_key_auth, limiter
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
+import json
 
 router = APIRouter(prefix="/api", tags=["predict"])
 
@@ -19,28 +29,37 @@ async def predict_failure(
     """Predict failure probabilities for all failure types"""
     try:
         # Validate and prepare features
-        alarm_data = validate_alarm_data(alarm_log.dict())
+        with stage_timer("predict", "validate"):
+            alarm_data = machine_state.annotate(validate_alarm_data(alarm_log.model_dump()))
         
-        # Make prediction using optimized models
-        prediction_result = predictor.predict_failure(alarm_data)
+        # Make prediction using optimized models, batched with concurrent requests
+        with stage_timer("predict", "inference"):
+            prediction_result = await batcher.submit(alarm_data)
+        committed_at = machine_state.commit([alarm_data]) if "error" not in prediction_result else None
+        shadow_scorer.offer([alarm_data], [prediction_result])
         
         # Add metadata
         prediction_result["predicted_at"] = datetime.utcnow().isoformat()
-        prediction_result["model_version"] = "optimized_v1"
         
         # Store log and prediction in database
-        alarm_log_dict = alarm_log.dict()
+        alarm_log_dict = alarm_log.model_dump()
         alarm_log_dict["timestamp"] = alarm_log_dict.get("timestamp") or datetime.utcnow().isoformat()
+        if committed_at is not None:
+            # Marks the alarm as part of the machine history for snapshot replay
+            alarm_log_dict["committed_at"] = committed_at
         
         # Store in database using safe operations
-        await mongodb.safe_insert_one(mongodb.logs_collection, alarm_log_dict)
-        await mongodb.safe_insert_one(mongodb.predictions_collection, {
-            **prediction_result, 
-            "alarm_log": alarm_log_dict
-        })
+        with stage_timer("predict", "store"):
+            await mongodb.safe_insert_one(mongodb.logs_collection, alarm_log_dict)
+            await mongodb.safe_insert_one(mongodb.predictions_collection, {
+                **prediction_result, 
+                "alarm_log": alarm_log_dict
+            })
         
         return prediction_result
         
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -50,8 +69,9 @@ async def predict_failure(
 async def health_check():
     """Health check endpoint for the prediction service"""
     try:
-        # Check if models are loaded
-        model_count = len(predictor.models)
+        # Check if models are loaded, without loading them from the event loop
+        model_set = predictor.registry.current
+        model_count = len(model_set.models) if model_set is not None else 0
         if model_count == 0:
             return {
                 "status": "unhealthy",
@@ -62,7 +82,14 @@ async def health_check():
         return {
             "status": "healthy",
             "models_loaded": model_count,
-            "model_types": list(predictor.models.keys()),
+            "model_types": list(model_set.models.keys()),
+            "model_registry": predictor.registry.stats(),
+            "prediction_cache": predictor.cache.stats(),
+            "machine_state": machine_state.stats(),
+            "state_snapshots": state_snapshots.stats(),
+            "batching": batcher.stats(),
+            "executor": inference_executor.stats(),
+            "shadow": shadow_scorer.stats(),
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
@@ -72,32 +99,40 @@ async def health_check():
             "timestamp": datetime.utcnow().isoformat()
         }
 
+@router.get("/predict/shadow")
+async def shadow_report():
+    """Agreement with the served model and per-row latency of each shadow candidate"""
+    return shadow_scorer.stats()
+
 @router.post("/predict/batch")
 @limiter.limit("2/minute")
 async def predict_failure_batch(
-    alarm_logs: list[AlarmLogIn],
     request: Request,
+    alarm_logs: List[Dict[str, Any]] = Body(...),
+    stream: bool = False,
     _=Depends(api_key_auth)
 ):
-    """Predict failure probabilities for multiple alarm logs"""
+    """Predict failure probabilities for multiple alarm logs.
+    
+    Alarms are validated, scored and stored in chunks. With stream=true the
+    results are sent back as NDJSON, one chunk at a time, as they complete.
+    """
+    if len(alarm_logs) > config.BATCH_SYNC_MAX_ALARMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {config.BATCH_SYNC_MAX_ALARMS} alarm logs per batch; use /api/predict/batch/jobs for larger batches"
+        )
+    
+    if stream:
+        async def ndjson():
+            async for results in score_alarm_chunks(alarm_logs):
+                yield "".join(json.dumps(result, default=str) + "\n" for result in results)
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    
     try:
-        if len(alarm_logs) > 10:
-            raise HTTPException(status_code=400, detail="Maximum 10 alarm logs per batch")
-        
         results = []
-        for alarm_log in alarm_logs:
-            try:
-                alarm_data = validate_alarm_data(alarm_log.dict())
-                prediction_result = predictor.predict_failure(alarm_data)
-                prediction_result["alarm_id"] = alarm_log.dict().get("id", "unknown")
-                results.append(prediction_result)
-            except Exception as e:
-                results.append({
-                    "alarm_id": alarm_log.dict().get("id", "unknown"),
-                    "error": str(e),
-                    "predictions": {},
-                    "overall_risk": {"probability": 0, "risk_level": "error"}
-                })
+        async for chunk_results in score_alarm_chunks(alarm_logs):
+            results.extend(chunk_results)
         
         return {
             "batch_results": results,
@@ -106,4 +141,51 @@ async def predict_failure_batch(
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
+
+@router.post("/predict/batch/jobs", status_code=202)
+@limiter.limit("2/minute")
+async def submit_batch_job(
+    request: Request,
+    alarm_logs: List[Dict[str, Any]] = Body(...),
+    _=Depends(api_key_auth)
+):
+    """Queue a large batch of alarm logs for background scoring"""
+    if len(alarm_logs) > config.BATCH_MAX_ALARMS:
+        raise HTTPException(status_code=400, detail=f"Maximum {config.BATCH_MAX_ALARMS} alarm logs per job")
+    job = batch_jobs.submit(alarm_logs)
+    return job.summary()
+
+@router.get("/predict/batch/jobs/{job_id}")
+async def get_batch_job(job_id: str, offset: int = 0, limit: int = 1000, _=Depends(api_key_auth)):
+    """Status of a batch job and a page of its results.
+    
+    Recent results are served from memory. Older pages, and jobs run by
+    another worker or before a restart, come from the stored predictions,
+    which hold no entries for alarms that failed.
+    """
+    offset, limit = max(0, offset), max(0, min(limit, 10000))
+    job = batch_jobs.get(job_id)
+    if job is not None:
+        page = job.result_page(offset, limit)
+        if page is not None:
+            return {**job.summary(), "offset": offset, "results": page}
+    
+    stored = await mongodb.safe_find(
+        mongodb.predictions_collection,
+        filter_dict={"alarm_log.batch_job_id": job_id, "index": {"$gte": offset}},
+        sort_list=[("index", 1)],
+        limit_count=limit
+    ) if limit else []
+    if job is not None:
+        return {**job.summary(), "offset": offset, "results": stored}
+    if not stored and not await mongodb.safe_find(
+        mongodb.predictions_collection, filter_dict={"alarm_log.batch_job_id": job_id}, limit_count=1
+    ):
+        raise HTTPException(status_code=404, detail=f"Batch job '{job_id}' not found")
+    return {
+        "job_id": job_id,
+        "status": "unknown",
+        "offset": offset,
+        "results": stored
+    }
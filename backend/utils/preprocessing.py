@@ -1,4 +1,3 @@
-import pandas as pd
 from typing import Dict, Any
 from datetime import datetime
 
@@ -14,7 +13,8 @@ def clean_and_prepare_features(alarm_log: dict) -> dict:
         "component": str(alarm_log.get("component", "")).strip(),
         "severity": str(alarm_log.get("severity", "medium")).strip(),
         "location": str(alarm_log.get("location", "front")).strip(),
-        "timestamp": alarm_log.get("timestamp", datetime.utcnow().isoformat())
+        "timestamp": alarm_log.get("timestamp", datetime.utcnow().isoformat()),
+        "machine_id": str(alarm_log.get("machine_id") or "default")
     }
     
     # Validate and clean data
@@ -55,6 +55,7 @@ def validate_alarm_data(alarm_data: Dict[str, Any]) -> Dict[str, Any]:
 
 def extract_temporal_features(timestamp_str: str) -> Dict[str, Any]:
     """Extract temporal features from timestamp"""
+    import pandas as pd
     try:
         timestamp = pd.to_datetime(timestamp_str)
         return {
@@ -0,0 +1,63 @@
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+
+def factorize_strings(values: Iterable[str]) -> Tuple[np.ndarray, List[str]]:
+    """Codes into the distinct values (in first-seen order) and the distinct values"""
+    index: Dict[str, int] = {}
+    codes = [index.setdefault(value, len(index)) for value in values]
+    return np.array(codes, dtype=np.intp), list(index)
+
+
+class UniqueStringCache:
+    """Memoizes a string parser over the distinct values it has seen.
+
+    Alarm strings repeat heavily (a few hundred distinct values across
+    millions of records), so parsing each distinct string once and looking
+    the result up afterwards replaces per-record work with a dict lookup.
+    Results are shared between callers and must not be mutated. When full,
+    the oldest entry is dropped.
+    """
+
+    def __init__(self, parse: Callable[[str], Any], max_size: int = 4096):
+        self.parse = parse
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, value: str) -> Any:
+        result = self._entries.get(value, self)
+        if result is not self:
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = self.parse(value)
+        if self.max_size > 0:
+            with self._lock:
+                if len(self._entries) >= self.max_size:
+                    del self._entries[next(iter(self._entries))]
+                self._entries[value] = result
+        return result
+
+    def get_many(self, values: Iterable[str]) -> List[Any]:
+        """Parse results for a sequence of values, one per value"""
+        get = self.get
+        return [get(value) for value in values]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
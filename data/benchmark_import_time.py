@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark backend cold-start time
+Times `import main` and model loading in fresh interpreters, summarizes a
+`python -X importtime` profile per top-level package, saves the results as
+JSON and compares them against a stored baseline.
+
+    python benchmark_import_time.py                   # run and compare
+    python benchmark_import_time.py --save-baseline   # run and store as the new baseline
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+DATA_DIR = Path(__file__).parent
+BACKEND_DIR = DATA_DIR.parent / "backend"
+DEFAULT_OUTPUT = DATA_DIR / "benchmark_import_time_results.json"
+DEFAULT_BASELINE = DATA_DIR / "benchmark_import_time_baseline.json"
+
+# Libraries the app should only load during startup, never on import
+HEAVY_MODULES = ['pandas', 'scipy', 'sklearn', 'xgboost', 'joblib', 'groq', 'motor']
+
+STAGES = ['import_main', 'load_models']
+
+# Import the app, then load the models the way the startup handler does
+TIMER = (
+    "import json, time\n"
+    "started = time.perf_counter()\n"
+    "import main\n"
+    "imported = time.perf_counter()\n"
+    "main.predictor.registry.ensure_loaded()\n"
+    "loaded = time.perf_counter()\n"
+    "print(json.dumps({'import_main': imported - started, 'load_models': loaded - imported}))\n"
+)
+
+def run_backend(code, importtime=False):
+    """Run code in a fresh interpreter from the backend directory"""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+                          env={**os.environ, 'MODEL_RELOAD_INTERVAL': '0'})
+
+def heavy_after_import():
+    """Heavy modules already imported once `import main` returns"""
+    code = f"import sys, main; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    return run_backend(code).stdout.split()
+
+def import_profile(top):
+    """Total -X importtime of `import main` and the top packages by summed self time"""
+    stderr = run_backend("import main", importtime=True).stderr
+    packages = defaultdict(lambda: {'self_ms': 0.0, 'modules': 0})
+    total_us = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package]['self_ms'] += int(self_us) / 1000
+        packages[package]['modules'] += 1
+        if not name[1:].startswith(" "):  # top-level import
+            total_us += int(cumulative_us)
+    ranked = sorted(packages.items(), key=lambda item: -item[1]['self_ms'])
+    return total_us / 1000, dict(ranked[:top])
+
+def compare(results, baseline, tolerance):
+    """Stages slower than the baseline by more than tolerance, and newly imported heavy modules"""
+    problems = []
+    for stage, current in results['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if previous is not None and current['p50_ms'] > previous['p50_ms'] * (1 + tolerance):
+            problems.append(f"{stage}: p50 {previous['p50_ms']:.0f} ms -> {current['p50_ms']:.0f} ms "
+                            f"({current['p50_ms'] / previous['p50_ms']:.2f}x)")
+    new_heavy = set(results['heavy_modules_on_import']) - set(baseline.get('heavy_modules_on_import', []))
+    if new_heavy:
+        problems.append(f"`import main` now imports {', '.join(sorted(new_heavy))}")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', type=Path, default=DEFAULT_OUTPUT, help='where to write the results JSON')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE, help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='also store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed p50 slowdown before a stage is flagged (default 0.25 = 25%%)')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to time')
+    parser.add_argument('--top', type=int, default=15, help='packages to keep from the import profile')
+    args = parser.parse_args()
+
+    print("🧊 COLD START BENCHMARK")
+    print("=" * 60)
+    timings = defaultdict(list)
+    for _ in range(args.runs):
+        sample = json.loads(run_backend(TIMER).stdout.strip().splitlines()[-1])
+        for stage in STAGES:
+            timings[stage].append(sample[stage] * 1000)
+
+    total_ms, packages = import_profile(args.top)
+    heavy = heavy_after_import()
+    results = {
+        'created_at': datetime.utcnow().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'model_format': os.getenv('MODEL_FORMAT', 'auto'),
+        },
+        'stages': {
+            stage: {
+                'runs': len(samples),
+                'p50_ms': float(np.percentile(samples, 50)),
+                'min_ms': float(min(samples)),
+                'max_ms': float(max(samples)),
+            } for stage, samples in timings.items()
+        },
+        'heavy_modules_on_import': heavy,
+        'importtime': {'total_ms': total_ms, 'packages': packages},
+    }
+
+    print(f"{'stage':<16}{'p50 ms':>10}{'min ms':>10}{'max ms':>10}")
+    for stage, summary in results['stages'].items():
+        print(f"{stage:<16}{summary['p50_ms']:>10.0f}{summary['min_ms']:>10.0f}{summary['max_ms']:>10.0f}")
+    print(f"\n-X importtime: {total_ms:.0f} ms for `import main`; slowest packages (self time):")
+    for package, summary in packages.items():
+        print(f"   {package:<28}{summary['self_ms']:>9.1f} ms{summary['modules']:>6} modules")
+    print(f"\nHeavy modules imported by `import main`: {', '.join(heavy) or 'none'}")
+
+    args.output.write_text(json.dumps(results, indent=2))
+    print(f"\n💾 Results saved to {args.output}")
+
+    exit_code = 0
+    if args.baseline.exists() and not args.save_baseline:
+        problems = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        if problems:
+            exit_code = 1
+            print(f"\n❌ {len(problems)} regression(s) against {args.baseline.name}:")
+            for problem in problems:
+                print(f"   {problem}")
+        else:
+            print(f"\n✅ No stage slower than {args.baseline.name} by more than {args.tolerance:.0%}")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2))
+        print(f"📌 Baseline saved to {args.baseline}")
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
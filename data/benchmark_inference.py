@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark the prediction hot path
+Times preprocessing, feature building, each model and end-to-end prediction
+at several batch sizes, saves the results as JSON and compares them against
+a stored baseline.
+
+    python benchmark_inference.py                     # run and compare
+    python benchmark_inference.py --save-baseline     # run and store as the new baseline
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import sklearn
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from core.features import build_feature_matrix
+from core.model import OptimizedPredictor
+from core.warmup import synthetic_alarms
+
+DATA_DIR = Path(__file__).parent
+BATCH_SIZES = [1, 10, 100, 10000]
+DEFAULT_OUTPUT = DATA_DIR / "benchmark_inference_results.json"
+DEFAULT_BASELINE = DATA_DIR / "benchmark_inference_baseline.json"
+
+def time_calls(fn, min_time, min_repeats=3):
+    """Seconds per call, repeating until min_time has passed and min_repeats were made"""
+    fn()  # not timed: first-call setup
+    timings = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time or len(timings) < min_repeats:
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return np.array(timings)
+
+def summarize(timings, rows):
+    return {
+        'rows': rows,
+        'calls': len(timings),
+        'p50_ms': float(np.percentile(timings, 50) * 1000),
+        'p95_ms': float(np.percentile(timings, 95) * 1000),
+        'p99_ms': float(np.percentile(timings, 99) * 1000),
+        'rows_per_s': float(rows / timings.mean()),
+    }
+
+def build_cases(predictor, alarms, max_legacy_rows):
+    """(stage, batch size, callable) for every measurement"""
+    model_set = predictor.model_set
+    # The pandas reference path predates per-machine history
+    stateless = [{k: v for k, v in alarm.items() if k != 'history'} for alarm in alarms]
+    cases = []
+    for batch_size in BATCH_SIZES:
+        batch = alarms[:batch_size]
+        features = build_feature_matrix(batch)
+
+        if batch_size <= max_legacy_rows:
+            cases.append(('preprocess_new_data', batch_size,
+                          lambda batch=stateless[:batch_size]: [predictor.preprocess_new_data(dict(a)) for a in batch]))
+        cases.append(('build_feature_matrix', batch_size, lambda batch=batch: build_feature_matrix(batch)))
+
+        for failure_type in model_set.models:
+            plan = model_set.feature_plans[failure_type]
+            cases.append((f'model.{failure_type}', batch_size,
+                          lambda failure_type=failure_type, plan=plan, features=features:
+                          predictor._predict_model(model_set, failure_type, features[:, plan])))
+
+        if batch_size == 1:
+            cases.append(('predict_failure', 1, lambda alarm=batch[0]: predictor.predict_failure(dict(alarm))))
+        else:
+            cases.append(('predict_failure_batch', batch_size,
+                          lambda batch=batch: predictor.predict_failure_batch([dict(a) for a in batch])))
+    return cases
+
+def compare(results, baseline, tolerance):
+    """Stages whose p50 latency grew by more than tolerance over the baseline"""
+    regressions = []
+    for stage, sizes in results['benchmarks'].items():
+        for batch_size, current in sizes.items():
+            previous = baseline.get('benchmarks', {}).get(stage, {}).get(batch_size)
+            if previous is None:
+                continue
+            ratio = current['p50_ms'] / previous['p50_ms']
+            if ratio > 1 + tolerance:
+                regressions.append((stage, batch_size, previous['p50_ms'], current['p50_ms'], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', type=Path, default=DEFAULT_OUTPUT, help='where to write the results JSON')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE, help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='also store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed p50 slowdown before a stage is flagged (default 0.25 = 25%%)')
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds to spend on each measurement')
+    parser.add_argument('--max-legacy-rows', type=int, default=100,
+                        help='largest batch timed through the per-alarm pandas preprocessing')
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    # Cached predictions would turn repeated calls into lookups
+    predictor = OptimizedPredictor()
+    predictor.cache.max_size = 0
+    alarms = synthetic_alarms(max(BATCH_SIZES))
+
+    print("🏁 INFERENCE BENCHMARK")
+    print("=" * 86)
+    print(f"{'stage':<34}{'batch':>7}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'rows/s':>12}")
+    results = {
+        'created_at': datetime.utcnow().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'model_version': predictor.model_version,
+        },
+        'benchmarks': {},
+    }
+    for stage, batch_size, fn in build_cases(predictor, alarms, args.max_legacy_rows):
+        summary = summarize(time_calls(fn, args.min_time), batch_size)
+        results['benchmarks'].setdefault(stage, {})[str(batch_size)] = summary
+        print(f"{stage:<34}{batch_size:>7}{summary['p50_ms']:>11.3f}{summary['p95_ms']:>11.3f}"
+              f"{summary['p99_ms']:>11.3f}{summary['rows_per_s']:>12.0f}")
+
+    args.output.write_text(json.dumps(results, indent=2))
+    print(f"\n💾 Results saved to {args.output}")
+
+    exit_code = 0
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            exit_code = 1
+            print(f"\n❌ {len(regressions)} regression(s) against {args.baseline.name}:")
+            for stage, batch_size, before, after, ratio in regressions:
+                print(f"   {stage} @ {batch_size}: p50 {before:.3f} ms -> {after:.3f} ms ({ratio:.2f}x)")
+        else:
+            print(f"\n✅ No stage slower than {args.baseline.name} by more than {args.tolerance:.0%}")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2))
+        print(f"📌 Baseline saved to {args.baseline}")
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark the flattened tree evaluator against predict_proba
+Times both scoring paths for every best_model_* at several batch sizes
+"""
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from core.trees import compile_ensemble
+from test_tree_evaluator import load_evaluation_rows, FAILURE_TYPES, DATA_DIR
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+
+def time_call(fn, X, min_time=0.2):
+    """Median seconds per call, repeating until min_time has passed"""
+    timings = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time or len(timings) < 5:
+        t0 = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - t0)
+    return float(np.median(timings))
+
+def main():
+    warnings.filterwarnings("ignore")
+    X = load_evaluation_rows(extra_rows=max(BATCH_SIZES))
+
+    print("🏁 TREE EVALUATOR BENCHMARK")
+    print("=" * 72)
+    print(f"{'model':<22}{'batch':>7}{'predict_proba ms':>18}{'compiled ms':>14}{'speedup':>10}")
+    for failure_type in FAILURE_TYPES:
+        model = joblib.load(DATA_DIR / f'best_model_{failure_type}.pkl')
+        compiled = compile_ensemble(model)
+        for batch_size in BATCH_SIZES:
+            rows = X[:batch_size]
+            baseline = time_call(model.predict_proba, rows)
+            flat = time_call(compiled.predict_proba, rows)
+            print(f"{failure_type:<22}{batch_size:>7}{baseline * 1000:>18.3f}{flat * 1000:>14.3f}{baseline / flat:>9.1f}x")
+
+        max_diff = np.abs(model.predict_proba(X) - compiled.predict_proba(X)).max()
+        print(f"{'':<22}max |Δp| = {max_diff:.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Export the pickled models to a single model bundle
+Compiles every best_model_*.pkl into flattened tree arrays and writes them,
+with the feature names, robust scaler parameters and label encoder classes,
+to model_bundle.lh410. The bundle loads with NumPy only; with MODEL_FORMAT=auto
+(the default) the backend serves from it whenever it exists.
+
+    python export_model_bundle.py                 # writes data/model_bundle.lh410
+    python export_model_bundle.py --output /srv/lh410/model_bundle.lh410
+"""
+import argparse
+import platform
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+import sklearn
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from core.bundle import BUNDLE_FILENAME, read_bundle, write_bundle
+from core.registry import ModelSet
+
+DATA_DIR = Path(__file__).parent
+
+def library_versions():
+    versions = {'python': platform.python_version(), 'numpy': np.__version__, 'sklearn': sklearn.__version__}
+    try:
+        import xgboost
+        versions['xgboost'] = xgboost.__version__
+    except ImportError:
+        pass
+    return versions
+
+def export_bundle(data_dir: Path, output: Path) -> int:
+    """Compile the pickled model set in data_dir and write it to output; returns the file size"""
+    model_set = ModelSet.load(data_dir, model_format="pickle")
+    if not model_set.models:
+        raise SystemExit(f"❌ No best_model_*.pkl files found in {data_dir}")
+    missing = set(model_set.models) - set(model_set.compiled_models)
+    if missing:
+        raise SystemExit(f"❌ Cannot flatten {', '.join(sorted(missing))}; only tree ensembles can be bundled")
+
+    encoders_path = data_dir / "label_encoders.pkl"
+    encoders = joblib.load(encoders_path) if encoders_path.exists() else {}
+    metadata = {
+        'source_version': model_set.version,
+        'source_models': {t: type(m).__name__ for t, m in model_set.models.items()},
+        'exported_with': library_versions(),
+    }
+    return write_bundle(
+        output, model_set.compiled_models, model_set.feature_names, model_set.scaler,
+        {name: list(encoder.classes_) for name, encoder in encoders.items()}, metadata
+    )
+
+def verify_bundle(data_dir: Path, output: Path, rows: int = 2000):
+    """Largest probability difference between the bundle and the pickled models on random inputs"""
+    model_set = ModelSet.load(data_dir, model_format="pickle")
+    bundle = read_bundle(output)
+    rng = np.random.default_rng(0)
+    worst = 0.0
+    for failure_type, model in model_set.models.items():
+        X = rng.normal(0, 3, size=(rows, len(model_set.feature_names[failure_type]))).astype(np.float32)
+        expected = model.predict_proba(X)[:, 1]
+        actual = bundle.models[failure_type].predict_proba(X)[:, 1]
+        worst = max(worst, float(np.abs(expected - actual).max()))
+    return worst
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR, help='directory with the pickled models')
+    parser.add_argument('--output', type=Path, help=f'bundle path (default <data-dir>/{BUNDLE_FILENAME})')
+    args = parser.parse_args()
+    output = args.output or args.data_dir / BUNDLE_FILENAME
+
+    warnings.filterwarnings("ignore")
+    print("📦 EXPORTING MODEL BUNDLE")
+    print("=" * 50)
+    size = export_bundle(args.data_dir, output)
+    print(f"💾 Wrote {output} ({size / 1024:.0f} KB)")
+
+    started = time.perf_counter()
+    ModelSet.load_bundle(output)
+    print(f"⏱️  Bundle loads in {(time.perf_counter() - started) * 1000:.1f} ms")
+    difference = verify_bundle(args.data_dir, output)
+    print(f"✅ Largest probability difference from the pickled models: {difference:.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -1,104 +1,534 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from pathlib import Path
+import csv
+import io
+import pickle
 import re
+import tempfile
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.model_selection import train_test_split
 import joblib
+import os
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+# Alarm count windows and string factorization are shared with the live
+# service; core.windows and utils.string_cache need nothing beyond NumPy, so
+# this needs none of the backend's dependencies
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from core.windows import ALARM_WINDOWS, COMPONENT_WINDOW, COMPONENTS, DEFAULT_MACHINE_ID
+from utils.string_cache import factorize_strings
+
+# Optional column naming the machine each alarm came from
+MACHINE_ID_COLUMN = 'machine_id'
+
+# Alarm export format; Date and Time are parsed together afterwards
+ALARM_DTYPES = {
+    'Date': str, 'Time': str, 'Description': str,
+    'Count': 'float64', 'Code': 'float64',
+    'Location': 'category', MACHINE_ID_COLUMN: str,
+}
+DATETIME_FORMAT = '%d/%m/%Y %H:%M:%S'
+# Bytes of CSV parsed per chunk (rounded up to a whole line)
+CHUNK_BYTES = 64 * 1024 * 1024
+
+# Descriptions that mark the start of a failure window
+CRITICAL_ALARMS = [
+    'fire detected', 'e-stop activated', 'emergency stop',
+    'engine failure', 'transmission failure', 'brake failure'
+]
+
+class CsvChunkReader:
+    """Streams a CSV in chunks of whole lines, parsed by pandas' C engine.
+    
+    Lines with more fields than the header (in the alarm exports, a comma
+    inside Description) are written unchanged to quarantine_path instead of
+    failing the read; shorter lines are padded with NaN as usual. The
+    quarantine file is only created once a bad line is found. Field counts
+    are computed over each chunk's bytes with NumPy; only lines containing a
+    quote character go through the csv module. A quoted field may span
+    several lines: a record only ends at a newline preceded by an even number
+    of quotes, and a record left open at the end of a block is carried over
+    to the next one. An unterminated quote at the end of the file is
+    quarantined with the rest of the file. Columns are read with dtype (all
+    strings by default); in a chunk where a numeric column holds text, that
+    column is read as text and its unparseable values become NaN.
+    """
+    
+    def __init__(self, path, chunk_bytes=CHUNK_BYTES, quarantine_path=None, dtype=str):
+        self.path = Path(path)
+        self.chunk_bytes = chunk_bytes
+        self.quarantine_path = Path(quarantine_path) if quarantine_path else None
+        self.dtype = dtype
+        self.rows = 0
+        self.bad_lines = 0
+        self._quarantine = None
+    
+    @staticmethod
+    def _record_ends(data):
+        """Positions of the newlines that end a record, i.e. are outside quotes"""
+        newlines = np.flatnonzero(data == ord('\n'))
+        quotes = np.flatnonzero(data == ord('"'))
+        if not len(quotes):
+            return newlines
+        return newlines[np.searchsorted(quotes, newlines) % 2 == 0]
+    
+    def _field_counts(self, data, starts, ends):
+        """Fields per line, from the commas outside quotes"""
+        def per_line(char):
+            # Line of every occurrence of char, counted per line
+            return np.bincount(np.searchsorted(ends, np.flatnonzero(data == ord(char))), minlength=len(ends))
+        
+        counts = per_line(',') + 1
+        for line in np.flatnonzero(per_line('"')):
+            text = data[starts[line]:ends[line]].tobytes().decode('utf-8', errors='replace')
+            counts[line] = len(next(csv.reader(io.StringIO(text)), []))
+        return counts
+    
+    def _split(self, block, n_columns):
+        """Good and bad records of a block that ends with a complete record"""
+        data = np.frombuffer(block, dtype=np.uint8)
+        ends = self._record_ends(data)
+        starts = np.concatenate([[0], ends[:-1] + 1])
+        bad = self._field_counts(data, starts, ends) > n_columns
+        if not bad.any():
+            return block, b''
+        in_bad_line = np.repeat(bad, ends - starts + 1)
+        return data[~in_bad_line].tobytes(), data[in_bad_line].tobytes()
+    
+    def _parse(self, records, columns):
+        """DataFrame of good records, with the column dtypes"""
+        def read(dtype):
+            return pd.read_csv(io.BytesIO(records), engine='c', header=None, names=columns, dtype=dtype)
+        
+        try:
+            return read(self.dtype)
+        except ValueError:
+            if not isinstance(self.dtype, dict):
+                raise
+        numeric = [col for col, dtype in self.dtype.items()
+                   if col in columns and pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(dtype))]
+        chunk = read({**self.dtype, **{col: str for col in numeric}})
+        for col in numeric:
+            chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype(self.dtype[col])
+        return chunk
+    
+    def _set_aside(self, header, records, count):
+        """Write bad records to the quarantine file, creating it on first use"""
+        self.bad_lines += count
+        if not self.quarantine_path:
+            return
+        if self._quarantine is None:
+            self._quarantine = open(self.quarantine_path, 'wb')
+            self._quarantine.write(header)
+        self._quarantine.write(records)
+    
+    def __iter__(self):
+        self._quarantine = None
+        try:
+            with open(self.path, 'rb') as f:
+                header = f.readline()
+                columns = [col.strip() for col in next(csv.reader([header.decode('utf-8-sig')]))]
+                pending = b''
+                while True:
+                    block = f.read(self.chunk_bytes)
+                    if block:
+                        block = pending + block + f.readline()
+                    elif pending:
+                        # The file ended inside a quoted field
+                        self._set_aside(header, pending, 1)
+                        break
+                    else:
+                        break
+                    if not block.endswith(b'\n'):
+                        block += b'\n'
+                    
+                    # Carry a record still open at the end of the block over to the next one
+                    ends = self._record_ends(np.frombuffer(block, dtype=np.uint8))
+                    complete = int(ends[-1]) + 1 if len(ends) else 0
+                    block, pending = block[:complete], block[complete:]
+                    if not block:
+                        continue
+                    
+                    good, bad = self._split(block, len(columns))
+                    if bad:
+                        self._set_aside(header, bad, len(self._record_ends(np.frombuffer(bad, dtype=np.uint8))))
+                    if not good.strip():
+                        continue
+                    chunk = self._parse(good, columns)
+                    self.rows += len(chunk)
+                    if len(chunk):
+                        yield chunk
+        finally:
+            if self._quarantine is not None:
+                self._quarantine.close()
+                self._quarantine = None
+
+# Description keyword rules. Categories are checked in order and the first
+# rule with a matching keyword wins; alarm-type flags are independent.
+COMPONENT_KEYWORDS = [
+    ('engine', ['engine', 'fuel', 'coolant', 'air filter', 'spn']),
+    ('brake', ['brake', 'pedal']),
+    ('transmission', ['transmission', 'solenoid']),
+    ('sensor', ['speed sensor', 'sensor']),
+    ('lubrication', ['lubrication', 'lube']),
+    ('safety', ['fire', 'e-stop', 'emergency']),
+    ('electrical', ['warning', 'lamp', 'fuse', 'circuit']),
+    ('control', ['display', 'service', 'calibrat']),
+]
+SEVERITY_KEYWORDS = [
+    ('critical', ['fire', 'e-stop', 'emergency', 'critical']),
+    ('warning', ['warning', 'high', 'low', 'pressure', 'temperature']),
+    ('info', ['service', 'calibrat', 'info']),
+    ('maintenance', ['filter', 'lubrication', 'maintenance']),
+]
+ALARM_TYPE_KEYWORDS = {
+    'is_temperature_alarm': ['temperature', 'coolant', 'hot'],
+    'is_pressure_alarm': ['pressure', 'spn'],
+    'is_filter_alarm': ['filter', 'blocked'],
+    'is_sensor_alarm': ['sensor', 'signal'],
+    'is_electrical_alarm': ['circuit', 'voltage', 'fuse', 'lamp'],
+    'is_safety_alarm': ['fire', 'e-stop', 'emergency'],
+    'is_maintenance_alarm': ['lubrication', 'service', 'maintenance'],
+}
+
+def keyword_regex(words):
+    """One alternation regex matching any of the keywords as a substring"""
+    return re.compile('|'.join(re.escape(word) for word in words))
+
+COMPONENT_PATTERNS = [(label, keyword_regex(words)) for label, words in COMPONENT_KEYWORDS]
+SEVERITY_PATTERNS = [(label, keyword_regex(words)) for label, words in SEVERITY_KEYWORDS]
+ALARM_TYPE_PATTERNS = {feature: keyword_regex(words) for feature, words in ALARM_TYPE_KEYWORDS.items()}
+# Every label the rules can produce, for categorical columns
+COMPONENT_LABELS = [label for label, _ in COMPONENT_KEYWORDS] + ['other']
+SEVERITY_LABELS = [label for label, _ in SEVERITY_KEYWORDS]
+
+class DescriptionScanner:
+    """A Description column lowercased and joined into one newline-separated string.
+    
+    contains() runs a keyword regex over the whole column in a single scan and
+    maps each match back to its row through the row start offsets. No keyword
+    contains a newline, so a match never spans two rows. Missing values are
+    treated as empty descriptions.
+    """
+    
+    def __init__(self, descriptions):
+        values = descriptions.fillna('').astype(str).str.lower().tolist()
+        lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+        self.starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1])).astype(np.int64)
+        self.text = '\n'.join(values)
+        self.size = len(values)
+    
+    def contains(self, pattern):
+        """Boolean mask of the rows with at least one match of pattern"""
+        positions = np.fromiter((match.start() for match in pattern.finditer(self.text)), dtype=np.int64)
+        mask = np.zeros(self.size, dtype=bool)
+        mask[np.searchsorted(self.starts, positions, side='right') - 1] = True
+        return mask
+    
+    def first_match(self, patterns, default):
+        """Label of the first rule in patterns that matches each row"""
+        conditions = [self.contains(pattern) for _, pattern in patterns]
+        return np.select(conditions, [label for label, _ in patterns], default=default).astype(object)
+
+def failure_window_mask(times, is_critical, window=timedelta(hours=24)):
+    """Rows whose time falls within window after (or at) any critical alarm.
+    
+    A row at time t is in a failure window when the latest critical alarm at
+    or before t is at most window earlier. One searchsorted over the sorted
+    critical times answers that for every row at once.
+    """
+    times = np.asarray(times, dtype='datetime64[ns]')
+    critical_times = np.sort(times[np.asarray(is_critical, dtype=bool)])
+    latest = np.searchsorted(critical_times, times, side='right') - 1
+    in_window = latest >= 0
+    in_window[in_window] = times[in_window] - critical_times[latest[in_window]] <= np.timedelta64(window)
+    return in_window
+
+def window_start_positions(groups, times, widths):
+    """First row of each row's (t - width, t] window per width, for rows sorted by (group, time).
+    
+    Each row's (group, time) becomes one int64 key, group * (rows + 1) + the
+    row's rank in a stable sort of all times. The keys sort like the rows,
+    so a single searchsorted over them finds the window starts of every
+    group at once. Times are int64 nanoseconds, so the window boundaries are
+    exact. Returns {width: starts}.
+    """
+    # Stable, so tied times keep the row order; the rows are already sorted
+    # within each group, which this sort merges
+    by_time = np.argsort(times, kind='stable')
+    sorted_times = times[by_time]
+    ranks = np.empty(len(times), dtype=np.int64)
+    ranks[by_time] = np.arange(len(times))
+    stride = len(times) + 1
+    keys = groups * stride + ranks
+    starts = {}
+    for width in widths:
+        # Rank of the last time at or before t - width (-1 if none)
+        cutoff_ranks = np.empty_like(ranks)
+        cutoff_ranks[by_time] = np.searchsorted(sorted_times, sorted_times - width, side='right') - 1
+        starts[width] = np.searchsorted(keys, groups * stride + cutoff_ranks, side='right')
+    return starts
+
+def machine_time_order(machines, times):
+    """Row order sorting alarms by (machine, time), and the machine codes in that order.
+    
+    Missing machine ids share DEFAULT_MACHINE_ID. lexsort is stable, so
+    alarms with the same machine and time keep their arrival order. Returns
+    (order, sorted int64 machine codes, sorted int64 nanosecond times).
+    """
+    machine_codes, _ = pd.factorize(pd.Series(machines).fillna(DEFAULT_MACHINE_ID).astype(str))
+    times = np.asarray(times, dtype='datetime64[ns]').astype(np.int64)
+    order = np.lexsort((times, machine_codes))
+    return order, machine_codes[order].astype(np.int64), times[order]
+
+def time_since_last_alarm(machines, times):
+    """Minutes since the same machine's previous alarm, 0.0 for its first one.
+    
+    Matches MachineState in the live service. Rows must be in arrival order;
+    results are returned in that order.
+    """
+    order, groups, times = machine_time_order(machines, times)
+    minutes = np.zeros(len(times))
+    minutes[1:] = np.diff(times) / (60 * 10**9)
+    minutes[1:][np.diff(groups) != 0] = 0.0
+    result = np.empty_like(minutes)
+    result[order] = minutes
+    return result
+
+def time_window_counts(machines, times, components):
+    """Alarm count features over time windows, as the live service computes them.
+    
+    Per machine, alarms_last_1h/6h/24h count the alarms in (t - W, t] and
+    {component}_alarms_24h the alarms of that component, including the alarm
+    itself but not later alarms with the same timestamp (the service has not
+    seen them yet). Rows must be in arrival order; results are returned in
+    that order.
+    """
+    component_codes, component_names = pd.factorize(pd.Series(components))
+    
+    # Work in (machine, time) order
+    order, groups, times = machine_time_order(machines, times)
+    component_codes = component_codes[order]
+    positions = np.arange(len(times))
+    
+    seconds = set(ALARM_WINDOWS.values()) | {COMPONENT_WINDOW}
+    starts = window_start_positions(groups, times, [width * 10**9 for width in seconds])
+    counts = {name: positions - starts[width * 10**9] + 1 for name, width in ALARM_WINDOWS.items()}
+    component_index = {name: code for code, name in enumerate(component_names)}
+    for component in COMPONENTS:
+        # Component alarms in the window, from a running count of that component
+        seen = np.concatenate([[0], np.cumsum(component_codes == component_index.get(component, len(component_names)))])
+        counts[f'{component}_alarms_24h'] = seen[positions + 1] - seen[starts[COMPONENT_WINDOW * 10**9]]
+    
+    arrival = np.empty_like(order)
+    arrival[order] = positions
+    return {name: values[arrival] for name, values in counts.items()}
+
+class DayBuckets:
+    """Rows spilled to disk in one file per calendar day of their datetime.
+    
+    add() appends each day's rows of a chunk to that day's file in arrival
+    order, so reading the days back in date order and sorting each one
+    stably gives the rows in the order of a stable sort of the whole file.
+    """
+    
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.days = set()
+    
+    def _path(self, day):
+        return self.directory / f"{day:%Y%m%d}.pkl"
+    
+    def add(self, chunk):
+        for day, rows in chunk.groupby(chunk['datetime'].dt.floor('D'), sort=False):
+            with open(self._path(day), 'ab') as f:
+                pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self.days.add(day)
+    
+    def read(self, day):
+        frames = []
+        with open(self._path(day), 'rb') as f:
+            while True:
+                try:
+                    frames.append(pickle.load(f))
+                except EOFError:
+                    break
+        return pd.concat(frames, ignore_index=True)
+
+# Categorical columns given a *_encoded integer feature
+CATEGORICAL_FEATURES = ['component_category', 'severity_level', 'Location']
+
 class AlarmDataPreprocessor:
-    def __init__(self, csv_path):
+    def __init__(self, csv_path, chunk_bytes=CHUNK_BYTES, quarantine_path=None):
         self.csv_path = csv_path
+        self.chunk_bytes = chunk_bytes
+        # Lines that cannot be parsed are kept next to the CSV for inspection
+        self.quarantine_path = quarantine_path or Path(csv_path).with_suffix('.bad_lines.csv')
+        self.reader = None
         self.df = None
         self.label_encoders = {}
         self.scaler = StandardScaler()
-        
+    
+    def iter_clean_chunks(self):
+        """Yield the CSV in chunks with parsed datetimes and numeric columns"""
+        self.reader = CsvChunkReader(self.csv_path, self.chunk_bytes, self.quarantine_path, ALARM_DTYPES)
+        for chunk in self.reader:
+            # Convert Date and Time to datetime, dropping rows where that fails
+            chunk['datetime'] = pd.to_datetime(chunk['Date'] + ' ' + chunk['Time'],
+                                               format=DATETIME_FORMAT, errors='coerce')
+            yield chunk.dropna(subset=['datetime'])
+    
+    def iter_feature_chunks(self):
+        """Yield clean chunks with their per-row features and without Description.
+        
+        Everything that depends only on the row itself is computed here, so
+        the raw description text is dropped chunk by chunk.
+        """
+        for chunk in self.iter_clean_chunks():
+            chunk = self.add_description_features(chunk)
+            self.fill_missing_values(chunk)
+            yield chunk.drop(columns=['Description'])
+    
+    def _report_loaded(self, rows):
+        if self.reader.bad_lines:
+            print(f"Quarantined {self.reader.bad_lines} malformed lines to {self.quarantine_path}")
+        print(f"Loaded {rows} alarm records")
+    
     def load_data(self):
-        """Load and clean the CSV data"""
+        """Load and clean the whole CSV into memory, sorted by datetime and keeping every column"""
         print("Loading alarm logs data...")
-        
-        # Read CSV with proper handling of commas in Description field
-        try:
-            # Try with python engine which is more flexible
-            self.df = pd.read_csv(self.csv_path, engine='python')
-        except:
-            try:
-                # If that fails, try with QUOTE_NONE
-                self.df = pd.read_csv(self.csv_path, quoting=3)
-            except:
-                # If that fails, try with custom parsing
-                self.df = pd.read_csv(self.csv_path, engine='python', on_bad_lines='skip')
-        
-        # Clean column names
-        self.df.columns = [col.strip() for col in self.df.columns]
-        
-        # Convert Date and Time to datetime
-        self.df['datetime'] = pd.to_datetime(self.df['Date'] + ' ' + self.df['Time'], 
-                                           format='%d/%m/%Y %H:%M:%S', errors='coerce')
-        
-        # Drop rows with invalid datetime
-        self.df = self.df.dropna(subset=['datetime'])
-        
-        # Sort by datetime
-        self.df = self.df.sort_values('datetime').reset_index(drop=True)
-        
-        print(f"Loaded {len(self.df)} alarm records")
+        chunks = list(self.iter_clean_chunks())
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=['datetime'])
+        self.df = df.sort_values('datetime', kind='stable').reset_index(drop=True)
+        self._report_loaded(len(self.df))
         return self.df
     
+    def iter_training_chunks(self, spill_dir=None):
+        """Yield (X, y) for the whole CSV in time order, one day of alarms at a time.
+        
+        The exports are not sorted by time, and the window features and
+        failure labels look back 24 hours. The per-row feature chunks are
+        first spilled to disk by day (DayBuckets); each day is then read back
+        with the previous day's context: the alarms of the 24 hours before it
+        and the last alarm of every machine. Memory is bounded by a day of
+        alarms, not by the file. The label encoders are fitted on the
+        distinct values seen while spilling, so every day is encoded alike.
+        Gives the same rows as load_data() followed by the in-memory pipeline.
+        """
+        print("Loading alarm logs data...")
+        categories = {feature: set() for feature in CATEGORICAL_FEATURES}
+        with tempfile.TemporaryDirectory(dir=spill_dir) as tmp:
+            buckets = DayBuckets(tmp)
+            rows = 0
+            for chunk in self.iter_feature_chunks():
+                for feature, values in categories.items():
+                    values.update(chunk[feature].astype(str).unique())
+                buckets.add(chunk)
+                rows += len(chunk)
+            self._report_loaded(rows)
+            for feature, values in categories.items():
+                self.label_encoders[feature] = LabelEncoder().fit(sorted(values))
+            
+            context = None
+            days = sorted(buckets.days)
+            for day, next_day in zip(days, days[1:] + [None]):
+                day_rows = buckets.read(day).sort_values('datetime', kind='stable')
+                frame = pd.concat([context, day_rows], ignore_index=True) if context is not None else \
+                    day_rows.reset_index(drop=True)
+                self.df = frame
+                self.create_temporal_features()
+                self.create_rolling_features()
+                self.create_failure_labels()
+                self.encode_categorical_features(fit=False)
+                X, y = self.prepare_training_data(verbose=False)
+                start = len(frame) - len(day_rows)
+                yield X.iloc[start:], y.iloc[start:]
+                
+                if next_day is not None:
+                    # What the next day's windows and time since last alarm can reach
+                    keep = (frame['datetime'] >= next_day - pd.Timedelta(hours=24)) | \
+                        ~self.machine_ids().duplicated(keep='last')
+                    context = frame.loc[keep, day_rows.columns]
+            self.df = None
+    
     def extract_component_categories(self, description):
-        """Extract component category from alarm description"""
+        """Extract component category from a single alarm description"""
         description = str(description).lower()
-        
-        if any(word in description for word in ['engine', 'fuel', 'coolant', 'air filter', 'spn']):
-            return 'engine'
-        elif any(word in description for word in ['brake', 'pedal']):
-            return 'brake'
-        elif any(word in description for word in ['transmission', 'solenoid']):
-            return 'transmission'
-        elif any(word in description for word in ['speed sensor', 'sensor']):
-            return 'sensor'
-        elif any(word in description for word in ['lubrication', 'lube']):
-            return 'lubrication'
-        elif any(word in description for word in ['fire', 'e-stop', 'emergency']):
-            return 'safety'
-        elif any(word in description for word in ['warning', 'lamp', 'fuse', 'circuit']):
-            return 'electrical'
-        elif any(word in description for word in ['display', 'service', 'calibrat']):
-            return 'control'
-        else:
-            return 'other'
+        for label, words in COMPONENT_KEYWORDS:
+            if any(word in description for word in words):
+                return label
+        return 'other'
     
     def extract_severity_level(self, description):
-        """Extract severity level from alarm description"""
+        """Extract severity level from a single alarm description"""
         description = str(description).lower()
-        
-        if any(word in description for word in ['fire', 'e-stop', 'emergency', 'critical']):
-            return 'critical'
-        elif any(word in description for word in ['warning', 'high', 'low', 'pressure', 'temperature']):
-            return 'warning'
-        elif any(word in description for word in ['service', 'calibrat', 'info']):
-            return 'info'
-        elif any(word in description for word in ['filter', 'lubrication', 'maintenance']):
-            return 'maintenance'
-        else:
-            return 'info'
+        for label, words in SEVERITY_KEYWORDS:
+            if any(word in description for word in words):
+                return label
+        return 'info'
     
     def extract_alarm_type_features(self, description):
-        """Extract specific alarm type features"""
+        """Extract specific alarm type features from a single alarm description"""
         description = str(description).lower()
-        
         return {
-            'is_temperature_alarm': any(word in description for word in ['temperature', 'coolant', 'hot']),
-            'is_pressure_alarm': any(word in description for word in ['pressure', 'spn']),
-            'is_filter_alarm': any(word in description for word in ['filter', 'blocked']),
-            'is_sensor_alarm': any(word in description for word in ['sensor', 'signal']),
-            'is_electrical_alarm': any(word in description for word in ['circuit', 'voltage', 'fuse', 'lamp']),
-            'is_safety_alarm': any(word in description for word in ['fire', 'e-stop', 'emergency']),
-            'is_maintenance_alarm': any(word in description for word in ['lubrication', 'service', 'maintenance'])
+            feature: any(word in description for word in words)
+            for feature, words in ALARM_TYPE_KEYWORDS.items()
         }
     
+    def classify_descriptions(self, descriptions):
+        """Component, severity and alarm-type features for a whole Description column.
+        
+        Same results as the per-row extract_* methods, but each keyword rule is
+        one compiled alternation regex run over the column at once. The column
+        is factorized first with the service's factorize_strings, so every
+        distinct description is classified once and the results are broadcast
+        back to the rows by code.
+        """
+        # Every missing value is None, so they all share one code
+        values = descriptions.astype(object).where(descriptions.notna(), None)
+        codes, uniques = factorize_strings(values.tolist())
+        scanner = DescriptionScanner(pd.Series(uniques, dtype=object))
+        features = pd.DataFrame({
+            'component_category': pd.Categorical(scanner.first_match(COMPONENT_PATTERNS, 'other'),
+                                                 categories=COMPONENT_LABELS),
+            'severity_level': pd.Categorical(scanner.first_match(SEVERITY_PATTERNS, 'info'),
+                                             categories=SEVERITY_LABELS),
+        })
+        for feature, pattern in ALARM_TYPE_PATTERNS.items():
+            features[feature] = scanner.contains(pattern).astype(int)
+        return features.iloc[codes].set_axis(descriptions.index)
+    
+    def add_description_features(self, df):
+        """Add the description classifiers and the critical alarm flag to df"""
+        description_features = self.classify_descriptions(df['Description'])
+        for feature in description_features.columns:
+            df[feature] = description_features[feature]
+        
+        # Mark critical alarms as potential failure indicators
+        df['is_critical_alarm'] = df['Description'].str.lower().str.contains(
+            '|'.join(CRITICAL_ALARMS), na=False
+        ).astype(int)
+        return df
+    
+    def fill_missing_values(self, df):
+        """Fill missing Count, Code and Location values"""
+        df['Count'] = df['Count'].fillna(1)
+        df['Code'] = df['Code'].fillna(0)
+        location = df['Location']
+        if isinstance(location.dtype, pd.CategoricalDtype) and 'unknown' not in location.cat.categories:
+            location = location.cat.add_categories('unknown')
+        df['Location'] = location.fillna('unknown')
+    
+    def machine_ids(self):
+        """Machine of each alarm; alarms without a machine_id share one, like in the live service"""
+        if MACHINE_ID_COLUMN in self.df.columns:
+            return self.df[MACHINE_ID_COLUMN]
+        return pd.Series(DEFAULT_MACHINE_ID, index=self.df.index)
+    
     def create_temporal_features(self):
         """Create temporal features from datetime"""
         self.df['hour_of_day'] = self.df['datetime'].dt.hour
@@ -108,55 +538,21 @@ class AlarmDataPreprocessor:
         self.df['is_weekend'] = self.df['day_of_week'].isin([5, 6]).astype(int)
         self.df['is_night_shift'] = ((self.df['hour_of_day'] >= 22) | (self.df['hour_of_day'] <= 6)).astype(int)
         
-        # Time since last alarm (in minutes)
-        self.df['time_since_last_alarm'] = self.df['datetime'].diff().dt.total_seconds() / 60
-        self.df['time_since_last_alarm'] = self.df['time_since_last_alarm'].fillna(0)
+        # Time since the same machine's last alarm (in minutes)
+        self.df['time_since_last_alarm'] = time_since_last_alarm(self.machine_ids(), self.df['datetime'])
     
     def create_rolling_features(self):
-        """Create rolling window features"""
-        # For time-based rolling, we need to use a different approach
-        # Since we have limited data, let's use simple rolling windows
-        
-        # Alarms in last N records (approximating time windows)
-        for window in [1, 6, 24]:
-            self.df[f'alarms_last_{window}h'] = self.df['datetime'].rolling(
-                window=window, min_periods=1
-            ).count()
-        
-        # Component-specific rolling features
-        for component in ['engine', 'brake', 'transmission', 'sensor', 'electrical']:
-            mask = self.df['component_category'] == component
-            if mask.sum() > 0:  # Only if component exists in data
-                # Count component alarms in last 24 records
-                self.df[f'{component}_alarms_24h'] = self.df[mask]['datetime'].rolling(
-                    window=24, min_periods=1
-                ).count().fillna(0)
-            else:
-                self.df[f'{component}_alarms_24h'] = 0
+        """Create the time-window alarm counts per machine and component"""
+        counts = time_window_counts(self.machine_ids(), self.df['datetime'], self.df['component_category'])
+        for feature, values in counts.items():
+            self.df[feature] = values
     
     def create_failure_labels(self):
-        """Create failure labels based on critical alarms and patterns"""
-        # Define failure indicators
-        critical_alarms = [
-            'fire detected', 'e-stop activated', 'emergency stop',
-            'engine failure', 'transmission failure', 'brake failure'
-        ]
-        
-        # Mark critical alarms as potential failure indicators
-        self.df['is_critical_alarm'] = self.df['Description'].str.lower().str.contains(
-            '|'.join(critical_alarms), na=False
-        ).astype(int)
-        
+        """Create failure labels from the critical alarms"""
         # Create failure window (24 hours after critical alarm)
-        self.df['failure_window'] = 0
-        
-        for idx, row in self.df[self.df['is_critical_alarm'] == 1].iterrows():
-            failure_start = row['datetime']
-            failure_end = failure_start + timedelta(hours=24)
-            
-            # Mark all alarms in the failure window
-            mask = (self.df['datetime'] >= failure_start) & (self.df['datetime'] <= failure_end)
-            self.df.loc[mask, 'failure_window'] = 1
+        self.df['failure_window'] = failure_window_mask(
+            self.df['datetime'], self.df['is_critical_alarm'] == 1
+        ).astype(int)
         
         # Create binary failure target
         self.df['failure_occurred'] = self.df['failure_window'].astype(int)
@@ -173,22 +569,11 @@ class AlarmDataPreprocessor:
         print("Engineering features...")
         
         try:
-            # Extract component categories
-            print("  - Extracting component categories...")
-            self.df['component_category'] = self.df['Description'].apply(self.extract_component_categories)
-            
-            # Extract severity levels
-            print("  - Extracting severity levels...")
-            self.df['severity_level'] = self.df['Description'].apply(self.extract_severity_level)
-            
-            # Extract alarm type features
-            print("  - Extracting alarm type features...")
-            alarm_features = self.df['Description'].apply(self.extract_alarm_type_features)
-            # Convert the series of dictionaries to separate columns
-            for feature in ['is_temperature_alarm', 'is_pressure_alarm', 'is_filter_alarm',
-                           'is_sensor_alarm', 'is_electrical_alarm', 'is_safety_alarm',
-                           'is_maintenance_alarm']:
-                self.df[feature] = alarm_features.apply(lambda x: x[feature]).astype(int)
+            # Extract component categories, severity levels, alarm type features
+            # and critical alarms, unless the rows already carry them
+            if 'component_category' not in self.df.columns:
+                print("  - Classifying alarm descriptions...")
+                self.add_description_features(self.df)
             
             # Create temporal features
             print("  - Creating temporal features...")
@@ -204,9 +589,7 @@ class AlarmDataPreprocessor:
             
             # Fill missing values
             print("  - Filling missing values...")
-            self.df['Count'] = self.df['Count'].fillna(1)
-            self.df['Code'] = self.df['Code'].fillna(0)
-            self.df['Location'] = self.df['Location'].fillna('unknown')
+            self.fill_missing_values(self.df)
             
             print("Feature engineering completed!")
             
@@ -216,19 +599,16 @@ class AlarmDataPreprocessor:
             print(f"DataFrame columns: {list(self.df.columns)}")
             raise
     
-    def encode_categorical_features(self):
-        """Encode categorical features"""
-        print("Encoding categorical features...")
+    def encode_categorical_features(self, fit=True):
+        """Encode categorical features; with fit=False the fitted label_encoders are reused"""
+        if fit:
+            print("Encoding categorical features...")
         
-        categorical_features = [
-            'component_category', 'severity_level', 'Location'
-        ]
-        
-        for feature in categorical_features:
+        for feature in CATEGORICAL_FEATURES:
             if feature in self.df.columns:
-                le = LabelEncoder()
-                self.df[f'{feature}_encoded'] = le.fit_transform(self.df[feature].astype(str))
-                self.label_encoders[feature] = le
+                if fit:
+                    self.label_encoders[feature] = LabelEncoder().fit(self.df[feature].astype(str))
+                self.df[f'{feature}_encoded'] = self.label_encoders[feature].transform(self.df[feature].astype(str))
     
     def select_features(self):
         """Select final features for model training"""
@@ -256,9 +636,10 @@ class AlarmDataPreprocessor:
         
         return self.df[available_features]
     
-    def prepare_training_data(self):
+    def prepare_training_data(self, verbose=True):
         """Prepare final training dataset"""
-        print("Preparing training data...")
+        if verbose:
+            print("Preparing training data...")
         
         # Select features
         X = self.select_features()
@@ -270,53 +651,81 @@ class AlarmDataPreprocessor:
         
         y = self.df[available_targets]
         
-        # Debug: Check for missing values
-        print(f"Original X shape: {X.shape}")
-        print(f"Missing values in X: {X.isnull().sum().sum()}")
-        print(f"Missing values in y: {y.isnull().sum().sum()}")
-        
-        # Check which columns have missing values
-        missing_cols = X.columns[X.isnull().any()].tolist()
-        if missing_cols:
-            print(f"Columns with missing values: {missing_cols}")
-            for col in missing_cols:
-                print(f"  {col}: {X[col].isnull().sum()} missing values")
+        if verbose:
+            # Debug: Check for missing values
+            print(f"Original X shape: {X.shape}")
+            print(f"Missing values in X: {X.isnull().sum().sum()}")
+            print(f"Missing values in y: {y.isnull().sum().sum()}")
+            
+            # Check which columns have missing values
+            missing_cols = X.columns[X.isnull().any()].tolist()
+            if missing_cols:
+                print(f"Columns with missing values: {missing_cols}")
+                for col in missing_cols:
+                    print(f"  {col}: {X[col].isnull().sum()} missing values")
         
         # Fill missing values instead of removing rows
         X = X.fillna(0)  # Fill numeric features with 0
         y = y.fillna(0)  # Fill target variables with 0
         
-        print(f"Final dataset shape: {X.shape}")
-        print(f"Target variables: {list(y.columns)}")
+        if verbose:
+            print(f"Final dataset shape: {X.shape}")
+            print(f"Target variables: {list(y.columns)}")
         
         return X, y
     
-    def save_preprocessed_data(self, X, y, output_dir='./'):
-        """Save preprocessed data and encoders"""
-        print("Saving preprocessed data...")
+    def save_preprocessed_data(self, chunks, output_dir='./'):
+        """Append (X, y) chunks to features.csv and targets.csv and save the encoders.
         
-        # Save features and targets
-        X.to_csv(f'{output_dir}features.csv', index=False)
-        y.to_csv(f'{output_dir}targets.csv', index=False)
+        Returns a summary of the data written: the row and feature counts,
+        the failure rate and each feature's correlation with failure_occurred,
+        accumulated from running sums so no chunk is kept.
+        """
+        print("Saving preprocessed data...")
+        samples, failures, columns = 0, 0.0, None
+        for X, y in chunks:
+            # Save features and targets
+            header = columns is None
+            X.to_csv(f'{output_dir}features.csv', index=False, header=header, mode='w' if header else 'a')
+            y.to_csv(f'{output_dir}targets.csv', index=False, header=header, mode='w' if header else 'a')
+            
+            x = X.to_numpy(dtype=np.float64)
+            target = y['failure_occurred'].to_numpy(dtype=np.float64)
+            if header:
+                columns = list(X.columns)
+                sums = dict(x=np.zeros(x.shape[1]), xx=np.zeros(x.shape[1]), xy=np.zeros(x.shape[1]), yy=0.0)
+            samples += len(x)
+            failures += target.sum()
+            sums['x'] += x.sum(axis=0)
+            sums['xx'] += (x * x).sum(axis=0)
+            sums['xy'] += x.T @ target
+            sums['yy'] += target @ target
         
         # Save encoders
         joblib.dump(self.label_encoders, f'{output_dir}label_encoders.pkl')
         
         # Save feature names
-        feature_names = list(X.columns)
+        feature_names = columns or []
         joblib.dump(feature_names, f'{output_dir}feature_names.pkl')
         
         print(f"Data saved to {output_dir}")
+        correlations = {}
+        if samples:
+            mean_x, mean_y = sums['x'] / samples, failures / samples
+            cov = sums['xy'] / samples - mean_x * mean_y
+            with np.errstate(divide='ignore', invalid='ignore'):
+                corr = cov / np.sqrt((sums['xx'] / samples - mean_x ** 2) * (sums['yy'] / samples - mean_y ** 2))
+            correlations = dict(zip(feature_names, corr.tolist()))
+        return {
+            'features': len(feature_names),
+            'samples': samples,
+            'failure_rate': failures / samples if samples else 0.0,
+            'correlations': correlations,
+        }
     
-    def run_preprocessing(self):
-        """Run complete preprocessing pipeline"""
-        self.load_data()
-        self.engineer_features()
-        self.encode_categorical_features()
-        X, y = self.prepare_training_data()
-        self.save_preprocessed_data(X, y)
-        
-        return X, y
+    def run_preprocessing(self, output_dir='./'):
+        """Run complete preprocessing pipeline, streaming the CSV to the output files"""
+        return self.save_preprocessed_data(self.iter_training_chunks(), output_dir)
 
 def main():
     """Main execution function"""
@@ -324,19 +733,19 @@ def main():
     preprocessor = AlarmDataPreprocessor('alarm_logs.csv')
     
     # Run preprocessing
-    X, y = preprocessor.run_preprocessing()
+    summary = preprocessor.run_preprocessing()
     
     # Print summary statistics
     print("\n=== PREPROCESSING SUMMARY ===")
-    print(f"Total features: {X.shape[1]}")
-    print(f"Total samples: {X.shape[0]}")
-    print(f"Failure rate: {y['failure_occurred'].mean():.2%}")
+    print(f"Total features: {summary['features']}")
+    print(f"Total samples: {summary['samples']}")
+    print(f"Failure rate: {summary['failure_rate']:.2%}")
     
     print("\n=== FEATURE IMPORTANCE PREVIEW ===")
     feature_importance = {}
-    for feature in X.columns:
-        if y['failure_occurred'].corr(X[feature]) > 0.1:
-            feature_importance[feature] = abs(y['failure_occurred'].corr(X[feature]))
+    for feature, corr in summary['correlations'].items():
+        if corr > 0.1:
+            feature_importance[feature] = abs(corr)
     
     # Sort by importance
     sorted_features = sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test the NDJSON alarm stream scorer
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from core.streaming import read_ndjson, score_alarm_stream
+
+ALARM = {
+    "alarm_type": "engine_temperature_high", "spn": 110, "fmi": 3, "count": 5,
+    "hours": 1250.5, "component": "engine", "severity": "high"
+}
+
+async def chunked(payload: bytes, size: int):
+    """Deliver a body in fixed-size pieces that split lines"""
+    for start in range(0, len(payload), size):
+        await asyncio.sleep(0)
+        yield payload[start:start + size]
+
+def test_read_ndjson_splits_lines_across_chunks():
+    """Records are reassembled across chunk boundaries; bad lines become errors"""
+    print("\n=== TESTING NDJSON READER ===")
+    payload = b"\n".join([
+        json.dumps(ALARM).encode(), b"", b"{not json", b"x" * 400, json.dumps({"a": 1}).encode()
+    ])
+
+    async def read(size):
+        return [record async for record in read_ndjson(chunked(payload, size), max_line_bytes=200)]
+
+    # Long lines are caught whether they straddle chunks or arrive whole inside one
+    for size in (7, len(payload)):
+        records = asyncio.run(read(size))
+        assert [index for index, _, _ in records] == [0, 1, 2, 3]
+        assert records[0][1] == ALARM and records[0][2] is None
+        assert records[1][1] is None and "Invalid JSON" in records[1][2]
+        assert records[2][1] is None and "exceeds" in records[2][2]
+        assert records[3][1] == {"a": 1}
+    print(f"✅ {len(records)} records read from 7-byte and whole-body chunks")
+
+def test_stream_scores_every_record_in_order():
+    """Every input record gets exactly one output line with its stream index"""
+    print("\n=== TESTING ALARM STREAM SCORING ===")
+    lines = [json.dumps({**ALARM, "spn": 100 + i}) for i in range(50)]
+    lines.insert(10, "{broken")
+    payload = ("\n".join(lines) + "\n").encode()
+
+    async def run():
+        output = []
+        stream = score_alarm_stream(chunked(payload, 64), batch_size=8, window_ms=5, queue_size=4)
+        async for text in stream:
+            output.extend(json.loads(line) for line in text.splitlines())
+        return output
+
+    results = asyncio.run(run())
+    assert sorted(result['index'] for result in results) == list(range(len(lines)))
+    errors = [result for result in results if 'error' in result]
+    assert [result['index'] for result in errors] == [10]
+    assert all(result['overall_risk']['risk_level'] != 'error' for result in results if 'error' not in result)
+    print(f"✅ {len(results)} stream records scored ({len(errors)} invalid)")
+
+if __name__ == "__main__":
+    test_read_ndjson_splits_lines_across_chunks()
+    test_stream_scores_every_record_in_order()
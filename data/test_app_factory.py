@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test that the app imports without its heavy dependencies and loads them at startup
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+
+from benchmark_import_time import HEAVY_MODULES
+
+def run_backend(code):
+    return subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR,
+                          capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1]
+
+def test_import_main_is_light():
+    """Importing the app loads no models and none of the heavy libraries"""
+    print("\n=== TESTING APP IMPORT ===")
+    output = run_backend(
+        "import sys, main; "
+        f"print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules), main.predictor.registry.current)"
+    )
+    assert output == "[] None", output
+    print("✅ `import main` loaded no models and no heavy libraries")
+
+def test_routes_import_without_main():
+    """Route modules take their dependencies from dependencies.py, not from main"""
+    output = run_backend("import sys, routes.predict, routes.logs, routes.explain; print('main' in sys.modules)")
+    assert output == "False", output
+
+def test_factory_app_loads_models_on_startup():
+    output = run_backend(
+        "import main\n"
+        "from fastapi.testclient import TestClient\n"
+        "app = main.create_app()\n"
+        "with TestClient(app) as client:\n"
+        "    assert client.get('/metrics').status_code == 200\n"
+        "    loaded = len(main.predictor.registry.current.models)\n"
+        "print(loaded)\n"
+    )
+    assert output == "4", output
+    print("✅ Models loaded by the startup handler")
+
+if __name__ == "__main__":
+    test_import_main_is_light()
+    test_routes_import_without_main()
+    test_factory_app_loads_models_on_startup()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test chunked batch scoring and background batch jobs
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+import core.jobs as jobs
+from config import config
+from core.executor import InferenceQueueFull
+from core.jobs import BatchJob, BatchJobStore, score_alarm_chunks
+from core.model import predictor
+from core.state import MachineStateStore, machine_state
+from test_feature_builder import create_parity_alarms
+from utils.preprocessing import validate_alarm_data
+
+def create_raw_alarms():
+    """Alarm payloads as clients send them, plus one invalid entry"""
+    alarms = [
+        {key: alarm[key] for key in ('alarm_type', 'spn', 'fmi', 'count', 'hours', 'component', 'severity', 'location', 'timestamp')}
+        for alarm in create_parity_alarms()
+    ]
+    alarms.insert(3, {"alarm_type": "broken", "spn": "not-a-number"})
+    return alarms
+
+async def collect_chunks(raw_alarms, chunk_size):
+    chunks = []
+    async for results in score_alarm_chunks(raw_alarms, chunk_size=chunk_size):
+        chunks.append(results)
+    return chunks
+
+def test_chunked_scoring_matches_direct_predictions():
+    """Chunks keep input order, isolate invalid items and match the predictor"""
+    print("\n=== TESTING CHUNKED BATCH SCORING ===")
+    raw_alarms = create_raw_alarms()
+    machine_state.clear()
+    chunks = asyncio.run(collect_chunks(raw_alarms, chunk_size=4))
+
+    assert [len(chunk) for chunk in chunks][:-1] == [4] * (len(chunks) - 1)
+    results = [result for chunk in chunks for result in chunk]
+    assert [result['index'] for result in results] == list(range(len(raw_alarms)))
+    assert 'error' in results[3] and results[3]['overall_risk']['risk_level'] == 'error'
+
+    # Same history the endpoint attached, replayed through a fresh store
+    history = MachineStateStore()
+    valid = history.annotate_many([validate_alarm_data(dict(alarm)) for i, alarm in enumerate(raw_alarms) if i != 3])
+    expected = predictor.predict_failure_batch(valid)
+    scored = [result for i, result in enumerate(results) if i != 3]
+    for result, reference in zip(scored, expected):
+        for failure_type, prediction in reference['predictions'].items():
+            assert abs(result['predictions'][failure_type]['probability'] - prediction['probability']) < 1e-9
+    print(f"✅ {len(results)} alarms scored in {len(chunks)} chunks")
+
+def test_batch_job_runs_in_background():
+    """A submitted job finishes with every result and an error count"""
+    print("\n=== TESTING BATCH JOBS ===")
+    raw_alarms = create_raw_alarms()
+
+    async def run_job():
+        store = BatchJobStore(max_jobs=2)
+        job = store.submit(raw_alarms)
+        assert store.get(job.id) is job
+        await job.task
+        return job
+
+    job = asyncio.run(run_job())
+    assert job.status == 'completed', job.error
+    assert job.processed == job.total == len(raw_alarms)
+    assert job.errors == 1
+    assert len(job.results) == len(raw_alarms)
+    print(f"✅ Job {job.id} processed {job.processed} alarms ({job.errors} invalid)")
+
+def test_full_executor_fails_the_chunk_after_timeout(monkeypatch):
+    """A chunk that never gets executor capacity ends with per-alarm errors instead of waiting forever"""
+    async def always_full(alarms):
+        raise InferenceQueueFull("Inference queue is full")
+
+    monkeypatch.setattr(jobs.inference_executor, "predict_batch", always_full)
+    monkeypatch.setattr(config, "BATCH_RETRY_TIMEOUT", 0.05)
+    raw_alarms = create_raw_alarms()
+    machine_state.clear()
+    results = [result for chunk in asyncio.run(collect_chunks(raw_alarms, chunk_size=4)) for result in chunk]
+    assert [result['index'] for result in results] == list(range(len(raw_alarms)))
+    assert all('error' in result for result in results)
+    assert "gave up" in results[0]['error']
+    assert machine_state.stats()['machines'] == 0
+
+def test_job_keeps_a_bounded_window_of_results():
+    """Only the latest results stay in memory; older pages are left to MongoDB"""
+    job = BatchJob(total=10, result_window=4)
+    for start in range(0, 10, 3):
+        job.add_results([{"index": i} for i in range(start, min(start + 3, 10))])
+    assert job.processed == 10 and len(job.results) == 4
+    assert [result["index"] for result in job.result_page(6, 3)] == [6, 7, 8]
+    assert job.result_page(9, 100) == [{"index": 9}]
+    assert job.result_page(5, 2) is None
+
+if __name__ == "__main__":
+    test_chunked_scoring_matches_direct_predictions()
+    test_batch_job_runs_in_background()
+    test_job_keeps_a_bounded_window_of_results()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Test the prediction micro-batcher
+Concurrent submissions should be grouped and match single-alarm predictions
+"""
+import os
+import subprocess
+import sys
+import asyncio
+from pathlib import Path
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+import core.executor as executor_module
+from core.model import predictor
+from core.batching import BATCH_REJECTED, BATCH_SIZE, MicroBatcher
+from core.metrics import metrics
+from core.executor import InferenceExecutor, InferenceQueueFull
+from test_feature_builder import create_parity_alarms
+
+def test_concurrent_requests_are_batched():
+    """Concurrent callers share batches and each gets its own prediction"""
+    print("\n=== TESTING MICRO-BATCHING ===")
+    alarms = create_parity_alarms()
+    calls = []
+
+    def predict_batch(batch):
+        calls.append(len(batch))
+        return predictor.predict_failure_batch(batch)
+
+    async def run():
+        batcher = MicroBatcher(predict_batch, max_batch_size=16, max_wait_ms=20)
+        try:
+            return await asyncio.gather(*(batcher.submit(alarm) for alarm in alarms)), batcher.stats()
+        finally:
+            await batcher.stop()
+
+    results, stats = asyncio.run(run())
+
+    assert sum(calls) == len(alarms)
+    assert max(calls) == 16 and len(calls) < len(alarms)
+    assert stats['batch_size']['count'] == len(calls)
+    assert stats['queue_wait_ms']['count'] == len(alarms)
+
+    for alarm, result in zip(alarms, results):
+        expected = predictor.predict_failure(alarm)
+        assert result['component'] == alarm['component']
+        for failure_type, pred in expected['predictions'].items():
+            assert result['predictions'][failure_type] == pred, failure_type
+
+    print(f"✅ {len(alarms)} requests scored in {len(calls)} batches: {calls}")
+
+def test_executor_scores_off_the_event_loop():
+    """Thread and process executors return the same predictions as the predictor"""
+    print("\n=== TESTING INFERENCE EXECUTOR ===")
+    alarms = create_parity_alarms()[:8]
+    expected = [predictor.predict_failure(alarm)['predictions'] for alarm in alarms]
+
+    for mode in ("thread", "process"):
+        executor = InferenceExecutor(mode=mode, workers=2, max_queue=64)
+        try:
+            results = asyncio.run(executor.predict_batch(alarms))
+        finally:
+            executor.shutdown()
+        assert [r['predictions'] for r in results] == expected, mode
+        assert executor.pending == 0
+        print(f"✅ {mode} executor matches")
+
+def test_executor_rejects_when_queue_is_full():
+    """Requests beyond max_queue pending alarms are rejected, not queued"""
+    alarms = create_parity_alarms()[:4]
+    executor = InferenceExecutor(mode="thread", workers=1, max_queue=6)
+
+    async def run():
+        first = asyncio.ensure_future(executor.predict_batch(alarms))
+        await asyncio.sleep(0)
+        try:
+            await executor.predict_batch(alarms)
+            rejected = False
+        except InferenceQueueFull:
+            rejected = True
+        await first
+        # Capacity is released once the first batch completes
+        await executor.predict_batch(alarms)
+        return rejected
+
+    try:
+        assert asyncio.run(run())
+    finally:
+        executor.shutdown()
+    assert executor.stats()['rejected'] == len(alarms)
+
+    # An idle executor still refuses a single batch above the limit
+    try:
+        asyncio.run(executor.predict_batch(create_parity_alarms()[:7]))
+        assert False, "oversized batch was accepted"
+    except InferenceQueueFull:
+        pass
+    assert executor.stats()['rejected'] == len(alarms) + 7
+    print("✅ Queue depth limit enforced")
+
+def test_batcher_queue_is_bounded():
+    """Submissions beyond max_queue waiting alarms are rejected and exported to /metrics"""
+    alarms = create_parity_alarms()[:3]
+    batches_before, rejected_before = BATCH_SIZE.count(), BATCH_REJECTED.value()
+
+    async def run():
+        batcher = MicroBatcher(predictor.predict_failure_batch, max_batch_size=16, max_wait_ms=5, max_queue=2)
+        try:
+            # All three are queued before the worker first runs
+            return await asyncio.gather(*(batcher.submit(alarm) for alarm in alarms),
+                                        return_exceptions=True), batcher.stats()
+        finally:
+            await batcher.stop()
+
+    results, stats = asyncio.run(run())
+    assert isinstance(results[2], InferenceQueueFull)
+    assert all('predictions' in result for result in results[:2])
+    assert stats['rejected'] == 1 and stats['max_queue'] == 2
+    assert BATCH_REJECTED.value() == rejected_before + 1
+    assert BATCH_SIZE.count() == batches_before + 1
+    rendered = metrics.render()
+    for name in ("lh410_batch_size_count", "lh410_batch_queue_wait_seconds_count",
+                 "lh410_batch_rejected_total", "lh410_batch_queue_depth"):
+        assert name in rendered, name
+    print("✅ Batcher queue bounded and exported")
+
+def test_restart_fails_orphaned_requests():
+    """Requests left in a dead worker's queue fail instead of waiting forever"""
+    alarms = create_parity_alarms()[:2]
+
+    async def run():
+        batcher = MicroBatcher(predictor.predict_failure_batch, max_batch_size=16, max_wait_ms=1)
+        try:
+            orphan = asyncio.ensure_future(batcher.submit(alarms[0]))
+            await asyncio.sleep(0)
+            # The worker dies before it collects the queued alarm
+            batcher._worker.cancel()
+            await asyncio.sleep(0)
+            result = await batcher.submit(alarms[1])
+            try:
+                await asyncio.wait_for(orphan, 1)
+                return result, None
+            except RuntimeError as e:
+                return result, e
+        finally:
+            await batcher.stop()
+
+    result, error = asyncio.run(run())
+    assert 'predictions' in result
+    assert error is not None and "restarted" in str(error)
+    print("✅ Orphaned requests failed on restart")
+
+def test_batch_size_is_clamped_to_the_executor_queue():
+    """A micro-batch never exceeds what the executor accepts, whatever BATCH_MAX_SIZE says"""
+    code = ("from core.batching import batcher; from core.executor import inference_executor; "
+            "print(batcher.max_batch_size, inference_executor.max_queue)")
+    env = dict(os.environ, BATCH_MAX_SIZE="64", INFERENCE_MAX_QUEUE="16")
+    output = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent.parent / "backend", env=env,
+                            capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1]
+    assert output == "16 16", output
+
+def test_process_workers_follow_the_parent_version():
+    """Workers load once without a watcher and reload only when the parent's version changes"""
+    loads = []
+    load = predictor.registry.load
+
+    def counting_load():
+        loads.append(1)
+        return load()
+
+    alarms = create_parity_alarms()[:2]
+    predictor.registry.load = counting_load
+    try:
+        # What a worker process runs, called in this process
+        executor_module._load_worker_models()
+        assert not predictor.registry.stats()['watching']
+        executor_module._predict_in_worker(alarms, 0, predictor.model_version)
+        assert loads == []
+        executor_module._predict_in_worker(alarms, 0, "swapped-by-parent")
+        executor_module._predict_in_worker(alarms, 0, "swapped-by-parent")
+        assert len(loads) == 1
+    finally:
+        del predictor.registry.load
+        executor_module._worker_model_version = None
+    print("✅ Workers follow the parent's model version")
+
+if __name__ == "__main__":
+    test_concurrent_requests_are_batched()
+    test_executor_scores_off_the_event_loop()
+    test_executor_rejects_when_queue_is_full()
+    test_batcher_queue_is_bounded()
+    test_restart_fails_orphaned_requests()
+    test_batch_size_is_clamped_to_the_executor_queue()
+    test_process_workers_follow_the_parent_version()
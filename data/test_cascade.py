@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test the early-exit cascade
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from config import config
+from core.features import build_feature_matrix
+from core.model import OptimizedPredictor
+from test_feature_builder import create_parity_alarms
+
+def test_cascade_skips_low_risk_rows():
+    """Component models only run above the threshold; the rest are marked skipped"""
+    print("\n=== TESTING CASCADE ===")
+    predictor = OptimizedPredictor()
+    alarms = create_parity_alarms()
+    features = build_feature_matrix(alarms)
+
+    full = predictor.score_matrix(features, cascade=False)
+    threshold = float(np.median(full['failure_occurred']))
+    original = config.CASCADE_THRESHOLD
+    config.CASCADE_THRESHOLD = threshold
+    try:
+        gated = predictor.score_matrix(features, cascade=True)
+    finally:
+        config.CASCADE_THRESHOLD = original
+
+    run = full['failure_occurred'] >= threshold
+    assert run.any() and not run.all()
+    np.testing.assert_array_equal(gated['failure_occurred'], full['failure_occurred'])
+    for failure_type in ['engine_failure', 'brake_failure', 'transmission_failure']:
+        assert np.isnan(gated[failure_type][~run]).all()
+        np.testing.assert_allclose(gated[failure_type][run], full[failure_type][run], atol=1e-12)
+
+    skipped_row = int(np.flatnonzero(~run)[0])
+    result = predictor._format_result(alarms[skipped_row], {t: p[skipped_row] for t, p in gated.items()})
+    assert result['predictions']['engine_failure'] == {'probability': None, 'risk_level': 'skipped', 'skipped': True}
+    assert result['overall_risk']['probability'] == full['failure_occurred'][skipped_row]
+    print(f"✅ Skipped component models for {(~run).sum()} of {len(alarms)} alarms")
+
+if __name__ == "__main__":
+    test_cascade_skips_low_risk_rows()
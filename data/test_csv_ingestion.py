@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test the chunked C-engine CSV reader and its bad-line quarantine
+"""
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from preprocess_alarm_data import AlarmDataPreprocessor, CsvChunkReader
+
+DATA_DIR = Path(__file__).parent
+
+SAMPLE_CSV = (
+    "Date,Time,Count,Description,Location,Code\n"
+    "18/06/2025,01:13:30,1,Engine coolant temperature high,Front,45\n"
+    "18/06/2025,01:13:36,1,Speed sensor signals missing (XDO1/6, XDO3/7),Middle,189\n"
+    '18/06/2025,01:13:37,2,"Brake pressure low, rear",Rear,23\n'
+    '17/08/2025,22:27:54,3,Speed sensor signals missing (XDO/16 "X0"7T),Middle,190\n'
+    "18/06/2025,01:14:00,,Lubrication service due\n"
+    "\n"
+    "not a date,01:15:00,1,Fire detected,Front,5\n"
+    "18/06/2025,01:16:00,1,Fire detected,Front,5,extra,fields\n"
+    "19/06/2025,02:00:00,1,Fuse blown,Rear,60"
+)
+
+def test_chunked_reader_matches_python_engine():
+    """Same rows as the python engine skipping bad lines, at every chunk size"""
+    print("\n=== TESTING CHUNKED CSV INGESTION ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "alarms.csv"
+        path.write_text(SAMPLE_CSV)
+        expected = pd.read_csv(path, engine='python', on_bad_lines='skip', dtype=str)
+        for chunk_bytes in (1, 64, 1 << 20):
+            quarantine = Path(tmp) / f"bad_{chunk_bytes}.csv"
+            reader = CsvChunkReader(path, chunk_bytes, quarantine)
+            actual = pd.concat(list(reader), ignore_index=True)
+            pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+            lines = quarantine.read_text().splitlines()
+            assert lines[0].startswith("Date,Time") and len(lines) == 3, lines
+            assert "XDO1/6, XDO3/7" in lines[1] and "extra,fields" in lines[2]
+            assert reader.bad_lines == 2 and reader.rows == len(expected)
+        print(f"✅ {len(expected)} rows read, 2 malformed lines quarantined")
+
+def test_quoted_records_may_span_lines():
+    """A quoted newline stays inside its record wherever the block boundaries fall"""
+    text = (
+        "Date,Time,Count,Description,Location,Code\n"
+        '18/06/2025,01:13:30,1,"Engine coolant\ntemperature high",Front,45\n'
+        '18/06/2025,01:13:37,2,"Brake pressure low,\n""rear""\n",Rear,23\n'
+        "19/06/2025,02:00:00,1,Fuse blown,Rear,60\n"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "alarms.csv"
+        path.write_text(text)
+        expected = pd.read_csv(path, engine='python', dtype=str)
+        assert len(expected) == 3
+        for chunk_bytes in (1, 16, 1 << 20):
+            quarantine = Path(tmp) / "bad.csv"
+            reader = CsvChunkReader(path, chunk_bytes, quarantine)
+            actual = pd.concat(list(reader), ignore_index=True)
+            pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+            # Nothing was set aside, so no quarantine file is left behind
+            assert reader.bad_lines == 0 and not quarantine.exists()
+
+        # A quote left open at the end of the file is quarantined, not parsed
+        path.write_text(text + '20/06/2025,03:00:00,1,"Unterminated\nrecord\n')
+        reader = CsvChunkReader(path, 64, Path(tmp) / "bad.csv")
+        assert sum(len(chunk) for chunk in reader) == 3 and reader.bad_lines == 1
+        assert "Unterminated" in (Path(tmp) / "bad.csv").read_text()
+    print("✅ Multi-line quoted records are kept whole")
+
+def test_columns_have_explicit_dtypes():
+    """Numeric and categorical columns are parsed as such; text in a numeric column becomes NaN"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "alarms.csv"
+        path.write_text(SAMPLE_CSV.replace(",Rear,23", ",Rear,n/a"))
+        preprocessor = AlarmDataPreprocessor(path, chunk_bytes=64, quarantine_path=Path(tmp) / "bad.csv")
+        chunks = list(preprocessor.iter_clean_chunks())
+        assert all(chunk['Count'].dtype == np.float64 and chunk['Code'].dtype == np.float64 for chunk in chunks)
+        assert all(isinstance(chunk['Location'].dtype, pd.CategoricalDtype) for chunk in chunks)
+        codes = pd.concat(chunks, ignore_index=True)['Code']
+        assert codes.isna().sum() == 2 and codes.max() == 190
+
+def full_training_data(csv_path, quarantine_path):
+    preprocessor = AlarmDataPreprocessor(csv_path, quarantine_path=quarantine_path)
+    preprocessor.load_data()
+    preprocessor.engineer_features()
+    preprocessor.encode_categorical_features()
+    return preprocessor.prepare_training_data()
+
+def unsorted_fleet_csv(path, n=3000, seed=5):
+    """Alarms of four machines over three weeks, in random order, with critical alarms near midnight"""
+    rng = np.random.default_rng(seed)
+    times = pd.Timestamp("2025-03-01") + pd.to_timedelta(rng.integers(0, 21 * 24 * 60, n), unit="min")
+    descriptions = np.array(["Engine coolant temperature high", "Brake pressure low", "Fire detected",
+                             "Transmission solenoid fault", "Fuse blown", "Speed sensor signal lost"])
+    df = pd.DataFrame({
+        "Date": times.strftime("%d/%m/%Y"), "Time": times.strftime("%H:%M:%S"),
+        "Count": rng.integers(1, 4, n), "Description": descriptions[rng.integers(len(descriptions), size=n)],
+        "Location": rng.choice(["Front", "Rear", ""], n), "Code": rng.integers(0, 200, n),
+        "machine_id": rng.choice(["LH410-1", "LH410-2", "LH410-3", ""], n),
+    })
+    df.to_csv(path, index=False)
+
+def test_streaming_pipeline_matches_full_load():
+    """Streaming the training data day by day gives what the whole file held in memory gives"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        unsorted_fleet_csv(tmp / "fleet.csv")
+        for csv_path, chunk_bytes in [(DATA_DIR / 'alarm_logs.csv', 512), (tmp / "fleet.csv", 4096)]:
+            expected = full_training_data(csv_path, tmp / 'bad_lines.csv')
+            preprocessor = AlarmDataPreprocessor(csv_path, chunk_bytes=chunk_bytes,
+                                                 quarantine_path=tmp / 'bad_lines.csv')
+            chunks = list(preprocessor.iter_training_chunks(spill_dir=tmp))
+            assert len(chunks) > 1
+            for full, streamed in zip(expected, zip(*chunks)):
+                pd.testing.assert_frame_equal(pd.concat(streamed).reset_index(drop=True), full)
+        assert preprocessor.reader.bad_lines == 0
+
+        # The same rows reach the output files
+        summary = preprocessor.run_preprocessing(output_dir=f"{tmp}/")
+        written = pd.read_csv(tmp / "features.csv")
+        pd.testing.assert_frame_equal(written, expected[0], check_dtype=False)
+        assert summary['samples'] == len(written) and summary['features'] == written.shape[1]
+        assert abs(summary['failure_rate'] - expected[1]['failure_occurred'].mean()) < 1e-12
+        for feature, corr in summary['correlations'].items():
+            reference = expected[1]['failure_occurred'].corr(expected[0][feature])
+            assert np.isnan(corr) if np.isnan(reference) else abs(corr - reference) < 1e-9
+    print("✅ Day-by-day feature pipeline matches the full load")
+
+if __name__ == "__main__":
+    test_chunked_reader_matches_python_engine()
+    test_quoted_records_may_span_lines()
+    test_columns_have_explicit_dtypes()
+    test_streaming_pipeline_matches_full_load()
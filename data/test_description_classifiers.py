@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test the vectorized alarm description classifiers against the per-row ones
+"""
+import itertools
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from preprocess_alarm_data import (
+    ALARM_TYPE_KEYWORDS, COMPONENT_KEYWORDS, COMPONENT_LABELS, SEVERITY_KEYWORDS, SEVERITY_LABELS,
+    AlarmDataPreprocessor
+)
+
+DATA_DIR = Path(__file__).parent
+
+def per_row_features(preprocessor, descriptions):
+    """The original Series.apply implementation, with the labels as categoricals"""
+    features = pd.DataFrame({
+        'component_category': pd.Categorical(descriptions.apply(preprocessor.extract_component_categories),
+                                             categories=COMPONENT_LABELS),
+        'severity_level': pd.Categorical(descriptions.apply(preprocessor.extract_severity_level),
+                                         categories=SEVERITY_LABELS),
+    }, index=descriptions.index)
+    alarm_features = descriptions.apply(preprocessor.extract_alarm_type_features)
+    for feature in ALARM_TYPE_KEYWORDS:
+        features[feature] = alarm_features.apply(lambda x: x[feature]).astype(int)
+    return features
+
+def edge_case_descriptions():
+    """Every keyword alone, in pairs across rules, upper-cased, and missing values"""
+    keywords = sorted({word for _, words in COMPONENT_KEYWORDS + SEVERITY_KEYWORDS for word in words}
+                      | {word for words in ALARM_TYPE_KEYWORDS.values() for word in words})
+    descriptions = [f"{word} alarm" for word in keywords]
+    descriptions += [f"{a} / {b}" for a, b in itertools.permutations(keywords[:12], 2)]
+    descriptions += [word.upper() for word in keywords]
+    descriptions += ["E-Stop activated", "Fire Detected", "Brake pedal (SPN 521)", "coolant\nlow level",
+                     "", "unknown", np.nan, None]
+    return pd.Series(descriptions, dtype=object)
+
+def test_vectorized_matches_per_row():
+    """classify_descriptions gives exactly the per-row results"""
+    print("\n=== TESTING DESCRIPTION CLASSIFIERS ===")
+    preprocessor = AlarmDataPreprocessor(DATA_DIR / 'alarm_logs.csv')
+    logged = preprocessor.load_data()['Description']
+    for name, descriptions in [('alarm_logs.csv', logged), ('edge cases', edge_case_descriptions())]:
+        expected = per_row_features(preprocessor, descriptions)
+        actual = preprocessor.classify_descriptions(descriptions)
+        assert list(actual.columns) == list(expected.columns)
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+        print(f"✅ {len(descriptions)} descriptions from {name} classified identically")
+
+def test_vectorized_speedup():
+    """The vectorized classifiers beat Series.apply on a large column"""
+    preprocessor = AlarmDataPreprocessor(DATA_DIR / 'alarm_logs.csv')
+    descriptions = pd.concat([edge_case_descriptions()] * 200, ignore_index=True)
+
+    started = time.perf_counter()
+    per_row_features(preprocessor, descriptions)
+    per_row_s = time.perf_counter() - started
+    started = time.perf_counter()
+    preprocessor.classify_descriptions(descriptions)
+    vectorized_s = time.perf_counter() - started
+
+    print(f"✅ {len(descriptions)} rows: apply {per_row_s * 1000:.0f} ms, "
+          f"vectorized {vectorized_s * 1000:.0f} ms ({per_row_s / vectorized_s:.1f}x)")
+    assert vectorized_s < per_row_s
+
+if __name__ == "__main__":
+    test_vectorized_matches_per_row()
+    test_vectorized_speedup()
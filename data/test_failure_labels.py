@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test the searchsorted failure-window labelling against the iterrows version
+"""
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from preprocess_alarm_data import AlarmDataPreprocessor, failure_window_mask
+
+DATA_DIR = Path(__file__).parent
+
+def iterrows_failure_window(df):
+    """The original labelling: one full-length mask per critical alarm"""
+    failure_window = pd.Series(0, index=df.index)
+    for idx, row in df[df['is_critical_alarm'] == 1].iterrows():
+        failure_start = row['datetime']
+        failure_end = failure_start + timedelta(hours=24)
+        mask = (df['datetime'] >= failure_start) & (df['datetime'] <= failure_end)
+        failure_window[mask] = 1
+    return failure_window.to_numpy()
+
+def synthetic_alarms(n, critical_rate, seed):
+    """Sorted alarms with duplicate timestamps and alarms exactly 24h after a critical one"""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2024-01-01")
+    minutes = np.sort(rng.integers(0, 60 * 24 * 60, n))
+    times = start + pd.to_timedelta(minutes, unit='min')
+    critical = (rng.random(n) < critical_rate).astype(int)
+    df = pd.DataFrame({'datetime': times, 'is_critical_alarm': critical})
+    # Boundary rows exactly at critical + 24h
+    edges = df.loc[df['is_critical_alarm'] == 1, 'datetime'].head(5) + pd.Timedelta(hours=24)
+    edge_rows = pd.DataFrame({'datetime': edges, 'is_critical_alarm': 0})
+    return pd.concat([df, edge_rows]).sort_values('datetime', kind='stable').reset_index(drop=True)
+
+def test_failure_window_matches_iterrows():
+    """Identical failure_window labels on alarm_logs.csv and synthetic data"""
+    print("\n=== TESTING FAILURE WINDOW LABELLING ===")
+    preprocessor = AlarmDataPreprocessor(DATA_DIR / 'alarm_logs.csv')
+    preprocessor.load_data()
+    preprocessor.engineer_features()
+    logged = preprocessor.df
+    assert (logged['failure_window'].to_numpy() == iterrows_failure_window(logged)).all()
+    assert (logged['failure_occurred'] == logged['failure_window']).all()
+    print(f"✅ alarm_logs.csv: {int(logged['failure_window'].sum())} of {len(logged)} rows in a failure window")
+
+    for n, rate, seed in [(2000, 0.01, 0), (2000, 0.2, 1), (500, 0.0, 2), (500, 1.0, 3)]:
+        df = synthetic_alarms(n, rate, seed)
+        expected = iterrows_failure_window(df)
+        actual = failure_window_mask(df['datetime'], df['is_critical_alarm'] == 1).astype(int)
+        assert (actual == expected).all(), f"mismatch for n={n} rate={rate}"
+    print("✅ Synthetic alarms labelled identically")
+
+def test_failure_window_speedup():
+    """The sweep beats the per-critical-alarm masks"""
+    df = synthetic_alarms(20000, 0.02, 4)
+    started = time.perf_counter()
+    iterrows_failure_window(df)
+    iterrows_s = time.perf_counter() - started
+    started = time.perf_counter()
+    failure_window_mask(df['datetime'], df['is_critical_alarm'] == 1)
+    sweep_s = time.perf_counter() - started
+    print(f"✅ {len(df)} rows, {int(df['is_critical_alarm'].sum())} critical: iterrows {iterrows_s * 1000:.0f} ms, "
+          f"searchsorted {sweep_s * 1000:.1f} ms")
+    assert sweep_s < iterrows_s
+
+if __name__ == "__main__":
+    test_failure_window_matches_iterrows()
+    test_failure_window_speedup()
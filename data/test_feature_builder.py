@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Parity test for the vectorized feature builder
+Checks build_feature_matrix against the DataFrame output of preprocess_new_data
+"""
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from core.model import OptimizedPredictor
+from core.features import build_feature_matrix, compile_feature_plan, FEATURE_COLUMNS, FEATURE_INDEX, ZERO_COLUMN
+from utils.preprocessing import validate_alarm_data
+from utils.string_cache import UniqueStringCache, factorize_strings
+
+def create_parity_alarms():
+    """Alarms covering every keyword, mapping and default in the feature pipeline"""
+    now = datetime(2024, 3, 9, 23, 15)
+    alarm_types = [
+        "engine_temperature_high", "brake_pressure_low", "transmission_filter_blocked",
+        "speed_sensor_signal", "electrical_voltage_low", "safety_e-stop",
+        "maintenance_due", "CRITICAL_OVERHEAT", "unknown alarm"
+    ]
+    components = ["engine", "brake", "transmission", "sensor", "electrical", "Engine", "hydraulics"]
+    severities = ["low", "medium", "high", "critical", "HIGH", "bogus"]
+    locations = ["front", "rear", "left", "right", "cab"]
+
+    alarms = []
+    for i in range(60):
+        alarms.append(validate_alarm_data({
+            "alarm_type": alarm_types[i % len(alarm_types)],
+            "component": components[i % len(components)],
+            "severity": severities[i % len(severities)],
+            "location": locations[i % len(locations)],
+            "spn": 100 + i,
+            "fmi": i % 32,
+            "count": 1 + i % 7,
+            "hours": 1000.5 + 17.25 * i,
+            "timestamp": (now - timedelta(hours=7 * i)).isoformat()
+        }))
+    return alarms
+
+def test_feature_builder_parity():
+    """Every builder row must equal the legacy DataFrame row"""
+    print("\n=== TESTING FEATURE BUILDER PARITY ===")
+
+    predictor = OptimizedPredictor()
+    alarms = create_parity_alarms()
+    matrix = build_feature_matrix(alarms)
+
+    assert matrix.dtype == np.float32
+    assert matrix.shape == (len(alarms), len(FEATURE_COLUMNS) + 1)
+    assert not matrix[:, ZERO_COLUMN].any()
+
+    for i, alarm in enumerate(alarms):
+        legacy = predictor.preprocess_new_data(alarm)
+        assert list(legacy.columns) == FEATURE_COLUMNS, f"column layout differs for alarm {i}"
+        expected = legacy.iloc[0].to_numpy(dtype=np.float32)
+        np.testing.assert_array_equal(matrix[i, :ZERO_COLUMN], expected, err_msg=f"alarm {i}: {alarm}")
+
+        # The single-alarm call goes through the same code path
+        np.testing.assert_array_equal(build_feature_matrix([alarm])[0], matrix[i])
+
+    print(f"✅ {len(alarms)} alarms match across {len(FEATURE_COLUMNS)} features")
+
+def test_feature_builder_missing_fields():
+    """Unvalidated payloads fall back to the same defaults as the DataFrame path"""
+    predictor = OptimizedPredictor()
+    alarm = {"alarm_type": "", "component": "", "timestamp": "2024-01-06T08:00:00"}
+
+    legacy = predictor.preprocess_new_data(alarm)
+    row = build_feature_matrix([alarm])[0]
+    for feature in legacy.columns:
+        assert row[FEATURE_INDEX[feature]] == np.float32(legacy[feature].iloc[0]), feature
+    for feature in set(FEATURE_COLUMNS) - set(legacy.columns):
+        assert row[FEATURE_INDEX[feature]] == 0, feature
+
+    assert build_feature_matrix([]).shape == (0, len(FEATURE_COLUMNS) + 1)
+    print("✅ Missing fields handled")
+
+def test_feature_plans_match_legacy_fill():
+    """Gathering with a compiled plan equals the old feature-by-feature fill"""
+    predictor = OptimizedPredictor()
+    alarms = create_parity_alarms()
+    matrix = build_feature_matrix(alarms)
+
+    feature_sets = list(predictor.feature_names.values()) + [["hours", "not_a_feature", "spn"]]
+    for expected_features in feature_sets:
+        plan = compile_feature_plan(expected_features)
+        gathered = matrix[:, plan]
+        for i, alarm in enumerate(alarms):
+            legacy = predictor.preprocess_new_data(alarm)
+            filled = [legacy[f].iloc[0] if f in legacy.columns else 0 for f in expected_features]
+            np.testing.assert_array_equal(gathered[i], np.array(filled, dtype=np.float32))
+
+    print(f"✅ {len(feature_sets)} feature plans match the legacy fill loop")
+
+def test_unique_string_cache():
+    """Distinct strings are parsed once; the cache stays within max_size"""
+    codes, uniques = factorize_strings(["b", "a", "b", "c", "a"])
+    assert uniques == ["b", "a", "c"] and codes.tolist() == [0, 1, 0, 2, 1]
+
+    parsed = []
+    cache = UniqueStringCache(lambda value: parsed.append(value) or value.upper(), max_size=2)
+    assert cache.get_many(["x", "y", "x", "x"]) == ["X", "Y", "X", "X"]
+    assert parsed == ["x", "y"] and cache.stats()['hits'] == 2
+    cache.get("z")  # evicts "x", the oldest entry
+    assert cache.stats()['size'] == 2
+    cache.get("x")
+    assert parsed == ["x", "y", "z", "x"]
+    print("✅ Unique string cache parses each distinct value once")
+
+def main():
+    test_feature_builder_parity()
+    test_feature_builder_missing_fields()
+    test_feature_plans_match_legacy_fill()
+    test_unique_string_cache()
+    print("\n🎉 Feature builder matches the DataFrame pipeline.")
+
+if __name__ == "__main__":
+    main()
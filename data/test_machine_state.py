@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test the per-machine online alarm history
+"""
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from core.features import COMPONENTS, FEATURE_INDEX, HISTORY_FEATURES, ROLLING_FEATURES, build_feature_matrix
+from core.state import ALARM_WINDOWS, COMPONENT_WINDOW, MachineStateStore
+
+def create_alarm_sequence(n=400, seed=7):
+    """Alarms for three machines with bursts and long gaps, in time order"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 3, 1)
+    gaps = rng.choice([5, 120, 1800, 3 * 3600, 20 * 3600], size=n)
+    times = start + np.cumsum(gaps) * timedelta(seconds=1)
+    components = COMPONENTS + ['hydraulics']
+    return [{
+        "machine_id": f"LH410-{rng.integers(3)}",
+        "component": components[rng.integers(len(components))],
+        "timestamp": ts.isoformat()
+    } for ts in times]
+
+def brute_force_history(alarms, i):
+    """History features recomputed from scratch over everything before alarm i"""
+    current = alarms[i]
+    t = datetime.fromisoformat(current['timestamp'])
+    previous = [a for a in alarms[:i + 1] if a['machine_id'] == current['machine_id']]
+    times = [datetime.fromisoformat(a['timestamp']) for a in previous]
+
+    def in_window(ts, width):
+        return t - timedelta(seconds=width) < ts <= t
+
+    history = {
+        'time_since_last_alarm': (t - times[-2]).total_seconds() / 60 if len(times) > 1 else 0.0
+    }
+    for name, width in ALARM_WINDOWS.items():
+        history[name] = sum(in_window(ts, width) for ts in times)
+    for component in COMPONENTS:
+        history[f'{component}_alarms_24h'] = sum(
+            in_window(ts, COMPONENT_WINDOW) for ts, a in zip(times, previous) if a['component'] == component
+        )
+    return history
+
+def test_history_matches_brute_force_windows():
+    """Incremental counters equal a full recount of every window"""
+    print("\n=== TESTING MACHINE STATE WINDOWS ===")
+    alarms = create_alarm_sequence()
+    store = MachineStateStore()
+    for i, alarm in enumerate(alarms):
+        history = store.observe(alarm)
+        expected = brute_force_history(alarms, i)
+        assert set(history) == set(HISTORY_FEATURES + ROLLING_FEATURES)
+        for name, value in expected.items():
+            assert abs(history[name] - value) < 1e-9, (i, name, history[name], value)
+    assert store.stats()['machines'] == 3
+    print(f"✅ {len(alarms)} alarms match the brute-force windows")
+
+def test_window_boundaries_and_late_alarms():
+    """An alarm exactly one window old drops out; late alarms count at the last time"""
+    print("\n=== TESTING WINDOW BOUNDARIES ===")
+    store = MachineStateStore()
+    start = datetime(2024, 3, 1, 8)
+    first = store.observe({"machine_id": "m", "component": "engine", "timestamp": start.isoformat()})
+    assert first['time_since_last_alarm'] == 0 and first['alarms_last_1h'] == 1
+
+    edge = store.observe({"machine_id": "m", "component": "engine",
+                          "timestamp": (start + timedelta(hours=1)).isoformat()})
+    assert edge['alarms_last_1h'] == 1 and edge['alarms_last_6h'] == 2
+    assert edge['time_since_last_alarm'] == 60 and edge['engine_alarms_24h'] == 2
+
+    late = store.observe({"machine_id": "m", "component": "brake", "timestamp": start.isoformat()})
+    assert late['time_since_last_alarm'] == 0 and late['alarms_last_1h'] == 2
+    print("✅ Window edges and out-of-order alarms handled")
+
+def test_least_recent_machine_is_evicted():
+    """The store holds at most max_machines"""
+    store = MachineStateStore(max_machines=2)
+    for machine_id in ["a", "b", "a", "c"]:
+        store.observe({"machine_id": machine_id, "component": "engine", "timestamp": "2024-03-01T08:00:00"})
+    assert store.get("b") is None and store.get("a") is not None
+    assert store.stats()['evictions'] == 1
+
+def test_feature_builder_uses_attached_history():
+    """History attached to an alarm replaces the simplified defaults"""
+    store = MachineStateStore()
+    alarms = store.annotate_many([dict(alarm, alarm_type="engine_temperature_high")
+                                  for alarm in create_alarm_sequence(50)])
+    X = build_feature_matrix(alarms)
+    for row, alarm in zip(X, alarms):
+        for name in HISTORY_FEATURES + ROLLING_FEATURES:
+            assert row[FEATURE_INDEX[name]] == np.float32(alarm['history'][name])
+        assert row[FEATURE_INDEX['engine_brake_interaction']] == np.float32(
+            alarm['history']['engine_alarms_24h'] * alarm['history']['brake_alarms_24h'])
+
+def test_annotate_records_nothing_until_commit():
+    """Alarms only enter the history once committed, so failed predictions leave it unchanged"""
+    alarms = create_alarm_sequence(40)
+    recorded, previewed = MachineStateStore(), MachineStateStore()
+    expected = [recorded.observe(alarm) for alarm in alarms]
+
+    annotated = previewed.annotate_many([dict(alarm) for alarm in alarms[:20]])
+    assert previewed.stats()['machines'] == 0
+    # Alarms that were never committed (a rejected or failed prediction) are not counted
+    previewed.annotate_many([dict(alarm) for alarm in alarms[:20]])
+    previewed.commit(annotated)
+    annotated += previewed.annotate_many([dict(alarm) for alarm in alarms[20:]])
+    for alarm, history in zip(annotated, expected):
+        assert alarm['history'] == history
+    assert previewed.stats()['observed'] == 20
+
+    disabled = MachineStateStore(enabled=False)
+    disabled.commit(disabled.annotate_many([dict(alarm) for alarm in alarms]))
+    assert disabled.stats()['machines'] == 0 and 'history' not in disabled.annotate(dict(alarms[0]))
+
+def test_preview_reads_live_windows_in_place():
+    """Previews match recorded histories without popping or copying the live windows"""
+    alarms = create_alarm_sequence(400)
+    recorded, previewed = MachineStateStore(), MachineStateStore()
+    expected = [recorded.observe(alarm) for alarm in alarms]
+    # One request per alarm, and the whole stream as one batch on an empty store
+    assert [alarm['history'] for alarm in MachineStateStore().annotate_many([dict(a) for a in alarms])] == expected
+
+    for alarm, history in zip(alarms, expected):
+        live = previewed.get(alarm['machine_id'])
+        before = [len(window.times) for _, window in live.windows()] if live else None
+        annotated = previewed.annotate(dict(alarm))
+        if live:
+            assert [len(window.times) for _, window in live.windows()] == before
+        assert annotated['history'] == history
+        previewed.commit([annotated])
+    print("✅ Previews leave the live windows untouched")
+
+if __name__ == "__main__":
+    test_history_matches_brute_force_windows()
+    test_window_boundaries_and_late_alarms()
+    test_least_recent_machine_is_evicted()
+    test_feature_builder_uses_attached_history()
+    test_annotate_records_nothing_until_commit()
+    test_preview_reads_live_windows_in_place()
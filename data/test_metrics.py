@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test the Prometheus metrics registry and stage timers
+"""
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+
+# Add the backend directory to the path
+sys.path.append(str(BACKEND_DIR))
+
+from core.metrics import STAGE_ERRORS, STAGE_SECONDS, MetricsRegistry, stage_timer
+
+def test_histogram_buckets_are_cumulative():
+    """Each observation lands in its bucket and every larger one"""
+    print("\n=== TESTING METRICS ===")
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Test latency", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, stage="a")
+
+    text = registry.render()
+    assert "# TYPE test_seconds histogram" in text
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 2' in text
+    assert 'test_seconds_bucket{stage="a",le="1.0"} 3' in text
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 4' in text
+    assert 'test_seconds_count{stage="a"} 4' in text
+    assert re.search(r'test_seconds_sum\{stage="a"\} 3\.65', text)
+    print("✅ Histogram rendered with cumulative buckets")
+
+def test_render_escapes_labels_and_runs_collectors():
+    registry = MetricsRegistry()
+    registry.counter("test_total", "Test counter", ["name"]).inc(2, name='say "hi"\\now')
+    registry.register_collector(lambda: [("test_cache_hits_total", "counter", "Hits", [("test_cache_hits_total", {}, 7)])])
+
+    text = registry.render()
+    assert 'test_total{name="say \\"hi\\"\\\\now"} 2.0' in text
+    assert "test_cache_hits_total 7" in text
+    try:
+        registry.histogram("test_total", "Clash")
+        assert False, "a counter name was reused for a histogram"
+    except ValueError:
+        pass
+
+def test_stage_timer_counts_errors():
+    """Failed stages are timed and counted, then the exception propagates"""
+    before = STAGE_SECONDS.count(route="test", stage="fail")
+    with stage_timer("test", "ok"):
+        pass
+    try:
+        with stage_timer("test", "fail"):
+            raise ValueError("boom")
+        assert False, "exception was swallowed"
+    except ValueError:
+        pass
+
+    assert STAGE_SECONDS.count(route="test", stage="fail") == before + 1
+    assert STAGE_ERRORS.value(route="test", stage="fail") >= 1
+    assert STAGE_ERRORS.value(route="test", stage="ok") == 0
+    print("✅ Stage timer recorded the failure")
+
+def test_mongodb_metrics_are_exported_when_importable_as_a_package():
+    """db.mongodb records on the registry /metrics renders, even with the repo root on the path"""
+    # A fresh interpreter, so the import order is the service's and this process is left alone
+    code = "\n".join([
+        "import asyncio, sys",
+        "sys.path.append('..')",
+        "import db.mongodb as mongodb",
+        "from core.metrics import metrics",
+        "class Logs:",
+        "    name = 'logs'",
+        "    async def insert_one(self, document): return None",
+        "asyncio.run(mongodb.safe_insert_one(Logs(), {}))",
+        "print('lh410_mongodb_seconds_count{operation=\"insert_one\",collection=\"logs\"} 1' in metrics.render())",
+    ])
+    output = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1]
+    assert output == "True", output
+
+if __name__ == "__main__":
+    test_histogram_buckets_are_cumulative()
+    test_render_escapes_labels_and_runs_collectors()
+    test_stage_timer_counts_errors()
+    test_mongodb_metrics_are_exported_when_importable_as_a_package()
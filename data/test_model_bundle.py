@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test the NumPy-only model bundle against the pickled models
+"""
+import subprocess
+import sys
+import tempfile
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from core.bundle import BUNDLE_FILENAME, BundleError, read_bundle
+from core.features import build_feature_matrix
+from core.model import OptimizedPredictor
+from core.registry import ModelSet
+from core.warmup import synthetic_alarms
+from export_model_bundle import export_bundle
+
+DATA_DIR = Path(__file__).parent
+
+def test_bundle_predictions_match_pickles():
+    """A predictor serving the bundle returns the same probabilities as the pickles"""
+    print("\n=== TESTING MODEL BUNDLE ===")
+    warnings.filterwarnings("ignore")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        size = export_bundle(DATA_DIR, tmp / BUNDLE_FILENAME)
+        bundled = OptimizedPredictor(tmp)
+        reference = ModelSet.load(DATA_DIR, model_format="pickle")
+
+        assert bundled.model_set.model_format == "bundle"
+        assert bundled.feature_names == reference.feature_names
+        assert set(bundled.model_set.encoders) == {'component_category', 'severity_level', 'Location'}
+        np.testing.assert_allclose(bundled.scaler.center_, reference.scaler.center_)
+
+        alarms = synthetic_alarms(600)
+        features = build_feature_matrix(alarms)
+        expected = bundled.score_matrix(features, reference, use_compiled=False)
+        actual = bundled.score_matrix(features)
+        for failure_type, probabilities in expected.items():
+            np.testing.assert_allclose(actual[failure_type], probabilities, rtol=0, atol=1e-12)
+
+        result = bundled.predict_failure(dict(alarms[0]))
+        assert result['model_version'] == bundled.model_version != reference.version
+
+        # The traversal table is built when the bundle is read, not per call
+        for ensemble in read_bundle(tmp / BUNDLE_FILENAME).models.values():
+            np.testing.assert_array_equal(ensemble.children[0::2], ensemble.right)
+            np.testing.assert_array_equal(ensemble.children[1::2], ensemble.left)
+    print(f"✅ {size} byte bundle matches the pickled models on {len(alarms)} alarms")
+
+def test_corrupt_bundle_is_rejected():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / BUNDLE_FILENAME
+        export_bundle(DATA_DIR, path)
+        data = bytearray(path.read_bytes())
+        data[-100] ^= 0xFF
+        path.write_bytes(bytes(data))
+        try:
+            read_bundle(path)
+            assert False, "corrupt bundle was accepted"
+        except BundleError as e:
+            assert "checksum" in str(e)
+
+def test_bundle_loads_without_sklearn():
+    """Reading a bundle must not import joblib, sklearn or xgboost"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / BUNDLE_FILENAME
+        export_bundle(DATA_DIR, path)
+        code = (
+            "import sys; sys.path.insert(0, sys.argv[1]); "
+            "from core.bundle import read_bundle; bundle = read_bundle(sys.argv[2]); "
+            "print(len(bundle.models), sorted(m for m in ('joblib', 'sklearn', 'xgboost') if m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code, str(DATA_DIR.parent / "backend"), str(path)],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    assert output == "4 []", output
+    print("✅ Bundle loaded with NumPy only")
+
+if __name__ == "__main__":
+    test_bundle_predictions_match_pickles()
+    test_corrupt_bundle_is_rejected()
+    test_bundle_loads_without_sklearn()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test hot reloading of versioned model artifacts
+"""
+import sys
+import shutil
+import tempfile
+import warnings
+from pathlib import Path
+
+import joblib
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from core.model import OptimizedPredictor
+from core.registry import ModelSet, FAILURE_TYPES
+
+DATA_DIR = Path(__file__).parent
+
+def copy_artifacts(target: Path):
+    for failure_type in FAILURE_TYPES:
+        for prefix in ("best_model", "feature_names"):
+            shutil.copy(DATA_DIR / f"{prefix}_{failure_type}.pkl", target)
+    shutil.copy(DATA_DIR / "robust_scaler.pkl", target)
+
+def test_registry_swaps_new_artifacts():
+    """New artifacts get a new version hash and are swapped in; bad ones are ignored"""
+    print("\n=== TESTING MODEL REGISTRY ===")
+    warnings.filterwarnings("ignore")
+    alarm = {"alarm_type": "brake_pressure_low", "component": "brake", "severity": "critical",
+             "location": "rear", "spn": 121, "fmi": 1, "count": 3, "hours": 980.2,
+             "timestamp": "2024-05-01T03:00:00"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        copy_artifacts(tmp)
+        predictor = OptimizedPredictor(tmp)
+        first_version = predictor.model_version
+        first = predictor.predict_failure(alarm)
+        assert first['model_version'] == first_version
+        assert len(first_version) == 12
+
+        # Same bytes, same version
+        assert ModelSet.load(tmp).version == first_version
+        assert not predictor.registry.check_for_update()
+
+        # Promote the XGBoost candidate for brake failures
+        pinned = predictor.model_set
+        candidates = joblib.load(DATA_DIR / "all_models_brake_failure.pkl")
+        joblib.dump(candidates['xgboost'], tmp / "best_model_brake_failure.pkl")
+        assert predictor.registry.check_for_update()
+
+        second = predictor.predict_failure(alarm)
+        assert predictor.model_version != first_version
+        assert second['model_version'] == predictor.model_version
+        assert type(predictor.models['brake_failure']).__name__ == 'XGBClassifier'
+        # Requests holding the previous set are unaffected by the swap
+        assert type(pinned.models['brake_failure']).__name__ == 'RandomForestClassifier'
+        print(f"✅ Swapped {first_version} -> {predictor.model_version}")
+
+        # A broken artifact keeps the active version serving
+        (tmp / "best_model_engine_failure.pkl").write_bytes(b"not a pickle")
+        assert not predictor.registry.check_for_update()
+        assert predictor.registry.stats()['last_error']
+        assert predictor.predict_failure(alarm)['model_version'] == second['model_version']
+        print("✅ Broken artifacts rejected")
+
+        # Failed predictions still say which models they were attempted with
+        failed = predictor.predict_failure({**alarm, "hours": "not a number"})
+        assert 'error' in failed and failed['model_version'] == second['model_version']
+
+def test_model_version_never_loads():
+    """Asking for the version of a lazy predictor does not load the models"""
+    predictor = OptimizedPredictor(DATA_DIR, lazy=True)
+    assert predictor.model_version is None and predictor.registry.current is None
+    predictor.predict_failure({"alarm_type": "brake_pressure_low", "component": "brake", "spn": 121, "fmi": 1})
+    assert predictor.model_version == predictor.registry.current.version
+
+if __name__ == "__main__":
+    test_registry_swaps_new_artifacts()
+    test_model_version_never_loads()
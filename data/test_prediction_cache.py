@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test the LRU+TTL prediction cache
+"""
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+
+# Add the backend directory to the path
+sys.path.append(str(BACKEND_DIR))
+
+from core.cache import PredictionCache
+from core.model import OptimizedPredictor
+from core.state import MachineStateStore
+from test_feature_builder import create_parity_alarms
+
+def test_cache_eviction_and_expiry():
+    """Least recently used entries go first; stale and old-version entries miss"""
+    print("\n=== TESTING PREDICTION CACHE ===")
+    cache = PredictionCache(max_size=2, ttl_seconds=0.05)
+    keys = [PredictionCache.key_for(np.array([i], dtype=np.float32)) for i in range(3)]
+
+    cache.put(keys[0], "v1", {"failure_occurred": 0.1})
+    cache.put(keys[1], "v1", {"failure_occurred": 0.2})
+    assert cache.get(keys[0], "v1") == {"failure_occurred": 0.1}
+    cache.put(keys[2], "v1", {"failure_occurred": 0.3})
+    assert cache.get(keys[1], "v1") is None
+    assert cache.stats()['evictions'] == 1
+
+    # A new model version invalidates everything
+    assert cache.get(keys[2], "v2") is None
+    assert cache.stats()['size'] == 0
+
+    cache.put(keys[0], "v2", {"failure_occurred": 0.4})
+    time.sleep(0.06)
+    assert cache.get(keys[0], "v2") is None
+    print("✅ LRU, TTL and version invalidation work")
+
+def test_repeated_alarms_hit_the_cache():
+    """Repeats are served from the cache with identical predictions"""
+    predictor = OptimizedPredictor()
+    predictor.cache = PredictionCache(max_size=1000, ttl_seconds=60)
+    alarms = create_parity_alarms()[:10]
+
+    first = predictor.predict_failure_batch(alarms)
+    misses = predictor.cache.misses
+    second = predictor.predict_failure_batch(alarms)
+
+    assert predictor.cache.misses == misses
+    assert predictor.cache.hits >= len(alarms)
+    assert [r['predictions'] for r in first] == [r['predictions'] for r in second]
+    print(f"✅ Cache stats: {predictor.cache.stats()}")
+
+def test_alarms_with_history_bypass_the_cache():
+    """Models that read the history features are never served a cached prediction for an alarm with history"""
+    predictor = OptimizedPredictor()
+    predictor.cache = PredictionCache(max_size=1000, ttl_seconds=60)
+    assert predictor.model_set.reads_history
+    alarms = MachineStateStore().annotate_many([dict(alarm, machine_id="m") for alarm in create_parity_alarms()[:10]])
+
+    first = predictor.predict_failure_batch(alarms)
+    second = predictor.predict_failure_batch(alarms)
+    stats = predictor.cache.stats()
+    assert stats['hits'] == stats['misses'] == stats['size'] == 0
+    assert stats['bypassed'] == 2 * len(alarms)
+    assert [r['predictions'] for r in first] == [r['predictions'] for r in second]
+    print(f"✅ {stats['bypassed']} alarms with history scored without the cache")
+
+def test_cache_is_off_by_default_with_machine_history():
+    """The default configuration only turns the cache on when alarms carry no history"""
+    def default_cache_size(**env):
+        environ = {k: v for k, v in os.environ.items() if k not in ("PREDICTION_CACHE_SIZE", "MACHINE_STATE_ENABLED")}
+        return subprocess.run([sys.executable, "-c", "from config import config; print(config.PREDICTION_CACHE_SIZE)"],
+                              cwd=BACKEND_DIR, env={**environ, **env}, capture_output=True, text=True,
+                              check=True).stdout.strip().splitlines()[-1]
+
+    assert default_cache_size() == "0"
+    assert default_cache_size(MACHINE_STATE_ENABLED="0") == "10000"
+    assert default_cache_size(PREDICTION_CACHE_SIZE="500") == "500"
+
+if __name__ == "__main__":
+    test_cache_eviction_and_expiry()
+    test_repeated_alarms_hit_the_cache()
+    test_alarms_with_history_bypass_the_cache()
+    test_cache_is_off_by_default_with_machine_history()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test the incremental rolling mean/std against the pandas rolling used for training
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from core.features import ROLLING_BASE_FEATURES
+from core.rolling import RollingWindowStats
+from core.state import MachineStateStore
+from test_machine_state import create_alarm_sequence
+
+def test_rolling_stats_match_pandas():
+    """Same values as Series.rolling(window, min_periods=1), including NaN std for one value"""
+    print("\n=== TESTING ROLLING STATISTICS ===")
+    rng = np.random.default_rng(3)
+    # Small alarm counts with long constant runs, like the 24h count features
+    series = pd.Series(np.repeat(rng.integers(0, 25, 300), rng.integers(1, 6, 300)).astype(float))
+    for window in (2, 3, 5):
+        stats = RollingWindowStats(window)
+        mean, std = map(np.array, zip(*(stats.push(x) for x in series)))
+        rolling = series.rolling(window=window, min_periods=1)
+        # The first row has no std in either
+        assert np.isnan(std[0]) and np.isnan(rolling.std().iloc[0])
+        np.testing.assert_allclose(mean, rolling.mean().values, rtol=0, atol=1e-12)
+        np.testing.assert_array_equal(np.isnan(std), rolling.std().isna().values)
+        np.testing.assert_allclose(std, rolling.std().values, rtol=0, atol=1e-12)
+    print(f"✅ {len(series)} values match pandas for windows 2, 3 and 5")
+
+def test_constant_window_has_exact_zero_std():
+    """Rounding from removals does not leak into windows of equal values"""
+    stats = RollingWindowStats(3)
+    for x in [17, 3, 11, 9, 9, 9]:
+        mean, std = stats.push(x)
+    assert mean == 9.0 and std == 0.0
+
+def test_online_rolling_matches_per_machine_batch():
+    """Per-machine online rolling features equal a grouped pandas rolling with NaN std filled with 0"""
+    alarms = create_alarm_sequence()
+    store = MachineStateStore()
+    histories = pd.DataFrame([store.observe(alarm) for alarm in alarms])
+    histories['machine_id'] = [alarm['machine_id'] for alarm in alarms]
+
+    for feature in ROLLING_BASE_FEATURES:
+        grouped = histories.groupby('machine_id')[feature].rolling(3, min_periods=1)
+        expected_mean = grouped.mean().reset_index(level=0, drop=True).sort_index()
+        expected_std = grouped.std().reset_index(level=0, drop=True).sort_index().fillna(0)
+        np.testing.assert_allclose(histories[f'{feature}_rolling_mean'], expected_mean, atol=1e-12)
+        np.testing.assert_allclose(histories[f'{feature}_rolling_std'], expected_std, atol=1e-12)
+        # Each machine's first alarm: pandas has no std, the live feature is 0
+        first = ~histories['machine_id'].duplicated()
+        assert grouped.std().reset_index(level=0, drop=True).sort_index()[first].isna().all()
+        assert (histories.loc[first, f'{feature}_rolling_std'] == 0).all()
+    print(f"✅ Online rolling features match pandas for {len(alarms)} alarms")
+
+if __name__ == "__main__":
+    test_rolling_stats_match_pandas()
+    test_constant_window_has_exact_zero_std()
+    test_online_rolling_matches_per_machine_batch()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test background shadow scoring with the alternate models
+"""
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+import joblib
+
+from core.model import predictor
+from core.shadow import ShadowScorer
+from core.warmup import synthetic_alarms
+
+DATA_DIR = Path(__file__).parent
+
+def test_shadow_scoring_records_agreement_and_latency():
+    """Every candidate in all_models_*.pkl is compared against what was served"""
+    print("\n=== TESTING SHADOW SCORING ===")
+    alarms = synthetic_alarms(40)
+    results = predictor.predict_failure_batch(alarms)
+    scorer = ShadowScorer(DATA_DIR, sample_rate=1.0, batch_size=16)
+    scorer.start()
+    try:
+        scorer.offer(alarms, results)
+        deadline = time.time() + 60
+        while scorer.scored < len(alarms) and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        scorer.stop()
+
+    stats = scorer.stats()
+    assert stats['scored'] == len(alarms) and stats['dropped'] == 0, stats
+    assert stats['last_error'] is None, stats['last_error']
+    assert stats['served_version'] == predictor.model_version
+    for failure_type in predictor.models:
+        candidates = set(joblib.load(DATA_DIR / f"all_models_{failure_type}.pkl"))
+        by_name = stats['models'][failure_type]
+        assert set(by_name) == candidates | {'served'}
+        for name, summary in by_name.items():
+            assert summary['rows'] == len(alarms) and summary['errors'] == 0
+            assert 0 <= summary['decision_agreement'] <= 1
+            assert summary['latency_ms_per_row']['count'] > 0
+        # The served model re-scored in the background must match the response
+        assert by_name['served']['max_abs_diff'] < 1e-9
+        assert by_name['served']['decision_agreement'] == 1.0
+        print(f"✅ {failure_type}: " + ", ".join(
+            f"{name} {summary['decision_agreement']:.0%}" for name, summary in by_name.items()))
+
+def test_offer_never_blocks():
+    """A disabled or saturated shadow scorer drops alarms instead of waiting"""
+    alarms = synthetic_alarms(10)
+    results = predictor.predict_failure_batch(alarms)
+
+    disabled = ShadowScorer(DATA_DIR, sample_rate=0.0)
+    disabled.start()
+    disabled.offer(alarms, results)
+    assert disabled.stats()['sampled'] == 0 and not disabled.stats()['running']
+
+    # A worker that never drains a queue of 4 alarms
+    full = ShadowScorer(DATA_DIR, sample_rate=1.0, queue_size=4)
+    full._worker = threading.Thread(target=lambda: None)
+    full.offer(alarms, results)
+    stats = full.stats()
+    assert stats['sampled'] == 10 and stats['queue_depth'] == 4 and stats['dropped'] == 6
+    print("✅ Overflowing alarms were dropped")
+
+def test_offer_enqueues_copies():
+    """Callers may keep adding fields to the results after offering them"""
+    alarms = synthetic_alarms(3)
+    results = predictor.predict_failure_batch(alarms)
+    scorer = ShadowScorer(DATA_DIR, sample_rate=1.0)
+    scorer._worker = threading.Thread(target=lambda: None)
+    scorer._queue = queue.Queue()
+    scorer.offer(alarms, results)
+    for index, (alarm_data, result) in enumerate(zip(alarms, results)):
+        result["predicted_at"], result["index"] = "2024-01-01T00:00:00", index
+        alarm_data["_id"] = index
+    for alarm_data, result in zip(alarms, results):
+        queued_alarm, queued_result = scorer._queue.get_nowait()
+        assert queued_result == {'predictions': result['predictions']} and "_id" not in queued_alarm
+
+if __name__ == "__main__":
+    test_shadow_scoring_records_agreement_and_latency()
+    test_offer_never_blocks()
+    test_offer_enqueues_copies()
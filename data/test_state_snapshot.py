@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test machine state snapshots and log replay
+"""
+import asyncio
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from bson import ObjectId
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+import db.mongodb as mongodb
+import core.snapshot as snapshot
+from core.snapshot import SnapshotError, StateSnapshotter, read_snapshot
+from core.state import MachineStateStore
+from test_machine_state import create_alarm_sequence
+
+def test_snapshot_round_trip_continues_identically():
+    """A restored store produces the same features as the one that was saved"""
+    print("\n=== TESTING STATE SNAPSHOT ROUND TRIP ===")
+    alarms = create_alarm_sequence(600)
+    original = MachineStateStore()
+    for alarm in alarms[:400]:
+        original.observe(alarm)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "machine_state.snap"
+        StateSnapshotter(original, path).save()
+        restored = MachineStateStore()
+        metadata = StateSnapshotter(restored, path).restore()
+        assert metadata is not None and metadata['machines'] == 3
+        size = path.stat().st_size
+
+    # Rolling statistics are recomputed from the saved window values, so they
+    # may differ from the running sums in the last bits
+    for alarm in alarms[400:]:
+        expected, actual = original.observe(alarm), restored.observe(alarm)
+        assert expected.keys() == actual.keys()
+        for name, value in expected.items():
+            assert abs(actual[name] - value) < 1e-9, name
+    print(f"✅ {metadata['machines']} machines restored from a {size} byte snapshot")
+
+def test_corrupt_snapshot_is_rejected():
+    """Flipped bytes fail the checksum and the snapshot is ignored"""
+    store = MachineStateStore()
+    for alarm in create_alarm_sequence(50):
+        store.observe(alarm)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "machine_state.snap"
+        StateSnapshotter(store, path).save()
+        data = bytearray(path.read_bytes())
+        data[len(data) // 2] ^= 0xFF
+        path.write_bytes(bytes(data))
+
+        try:
+            read_snapshot(path)
+            assert False, "corrupt snapshot was accepted"
+        except SnapshotError as e:
+            assert "checksum" in str(e)
+        snapshotter = StateSnapshotter(MachineStateStore(), path)
+        assert snapshotter.restore() is None and snapshotter.last_error
+
+def test_only_one_snapshotter_writes_a_path():
+    """A second process on the same path restores but does not save"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "machine_state.snap"
+        first, second = StateSnapshotter(MachineStateStore(), path), StateSnapshotter(MachineStateStore(), path)
+        assert first.acquire_writer()
+        if snapshot.fcntl is not None:
+            assert not second.acquire_writer()
+            asyncio.run(second.stop())
+            assert not path.exists()
+        first.release_writer()
+        asyncio.run(first.stop())
+        assert first.stats()['writer'] is None
+
+def fake_log_collection(monkeypatch, logs):
+    """Serve logs through safe_find, honouring the _id filter, sort and limit"""
+    queries = []
+
+    async def fake_find(collection, filter_dict=None, sort_list=None, limit_count=None):
+        queries.append(filter_dict)
+        condition, committed = filter_dict["_id"], filter_dict["committed_at"]
+        matching = [
+            log for log in sorted(logs, key=lambda log: ObjectId(log["_id"]))
+            if ("$gte" not in condition or ObjectId(log["_id"]) >= condition["$gte"])
+            and ("$gt" not in condition or ObjectId(log["_id"]) > condition["$gt"])
+            and "committed_at" in log and ("$gt" not in committed or log["committed_at"] > committed["$gt"])
+        ]
+        return matching[:limit_count] if limit_count else matching
+
+    monkeypatch.setattr(mongodb, "safe_find", fake_find)
+    return queries
+
+def test_replay_only_adds_logs_missing_from_snapshot(monkeypatch):
+    """Only logs committed after the snapshot are replayed; failed predictions never are"""
+    print("\n=== TESTING LOG REPLAY ===")
+    store = MachineStateStore()
+    seen = {"machine_id": "m1", "component": "engine", "timestamp": "2024-03-01T11:59:00"}
+    committed_before = store.commit([seen])
+    _, snapshot_ts = store.export_columns()
+    snapshot_time = datetime.fromtimestamp(snapshot_ts, timezone.utc)
+
+    def log(created, **fields):
+        return {"_id": str(ObjectId.from_datetime(created)), **fields}
+
+    logs = [
+        # Committed before the snapshot but stored a second later: already in it
+        log(snapshot_time + timedelta(seconds=1), committed_at=committed_before, **seen),
+        log(snapshot_time + timedelta(seconds=5), committed_at=snapshot_ts + 5,
+            machine_id="m1", component="brake", timestamp="2024-03-01T12:00:05"),
+        log(snapshot_time + timedelta(seconds=6), committed_at=snapshot_ts + 6,
+            machine_id="m2", component="engine", timestamp="2024-03-01T12:00:06"),
+        # The prediction failed, so the alarm never entered the history
+        log(snapshot_time + timedelta(seconds=7), machine_id="m3", component="engine", timestamp="2024-03-01T12:00:07"),
+    ]
+
+    fake_log_collection(monkeypatch, logs)
+    replayed = asyncio.run(StateSnapshotter(store, Path("unused")).replay_logs(snapshot_ts))
+    assert replayed == 2 and store.get("m3") is None
+    assert store.get("m1").alarm_windows['alarms_last_24h'].count(store.get("m1").last_seen) == 2
+    assert store.get("m2") is not None
+    print(f"✅ Replayed {replayed} of {len(logs)} logs")
+
+def test_replay_reads_logs_in_batches(monkeypatch):
+    """Replay pages through the logs on _id instead of loading them all at once"""
+    start = datetime(2024, 3, 1, 12, 0, 0, tzinfo=timezone.utc)
+    logs = [
+        {"_id": str(ObjectId.from_datetime(start + timedelta(seconds=i))), "machine_id": f"m{i % 3}",
+         "component": "engine", "timestamp": (start + timedelta(seconds=i)).isoformat(),
+         "committed_at": (start + timedelta(seconds=i)).timestamp()}
+        for i in range(25)
+    ]
+    queries = fake_log_collection(monkeypatch, logs)
+    monkeypatch.setattr(snapshot, "REPLAY_BATCH_SIZE", 10)
+    store = MachineStateStore()
+    replayed = asyncio.run(StateSnapshotter(store, Path("unused")).replay_logs(start.timestamp() - 1))
+    assert replayed == 25 and len(queries) == 3
+    assert "$gt" in queries[-1]["_id"]
+    assert sum(store.get(f"m{i}").alarm_windows['alarms_last_24h'].count(store.get(f"m{i}").last_seen)
+               for i in range(3)) == 25
+
+if __name__ == "__main__":
+    test_snapshot_round_trip_continues_identically()
+    test_corrupt_snapshot_is_rejected()
+    test_only_one_snapshotter_writes_a_path()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test the training time-window alarm counts against the live machine state
+"""
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from core.features import COMPONENTS
+from core.state import ALARM_WINDOWS, MachineStateStore
+from preprocess_alarm_data import time_since_last_alarm, time_window_counts
+
+COUNT_FEATURES = list(ALARM_WINDOWS) + [f'{component}_alarms_24h' for component in COMPONENTS]
+
+def synthetic_alarms(n, machines, seed):
+    """Time-ordered alarms across machines with tied timestamps and exact window boundaries"""
+    rng = np.random.default_rng(seed)
+    seconds = np.sort(rng.integers(0, 3 * 24 * 3600, n))
+    # Force ties and alarms exactly 1h/6h/24h apart
+    seconds[1::7] = seconds[0::7][:len(seconds[1::7])]
+    seconds = np.sort(np.concatenate([seconds, seconds[:20] + 3600, seconds[:20] + 6 * 3600, seconds[:20] + 24 * 3600]))
+    n = len(seconds)
+    return pd.DataFrame({
+        'datetime': pd.Timestamp("2024-05-01") + pd.to_timedelta(seconds, unit='s'),
+        'machine_id': rng.choice([f"LH410-{i}" for i in range(machines)] + [None], n),
+        'component_category': rng.choice(COMPONENTS + ['other', 'safety'], n),
+    })
+
+def online_counts(df):
+    """Replay the alarms through the live MachineStateStore in arrival order"""
+    store = MachineStateStore()
+    rows = [
+        store.observe({'machine_id': machine_id, 'timestamp': ts.isoformat(), 'component': component})
+        for machine_id, ts, component in zip(df['machine_id'], df['datetime'], df['component_category'])
+    ]
+    return {feature: np.array([row[feature] for row in rows]) for feature in COUNT_FEATURES}
+
+def test_time_windows_match_online_state():
+    """Every count feature equals what the service computes for the same alarm stream"""
+    print("\n=== TESTING TIME-WINDOW ALARM COUNTS ===")
+    for n, machines, seed in [(1500, 1, 0), (3000, 4, 1), (200, 30, 2)]:
+        df = synthetic_alarms(n, machines, seed)
+        expected = online_counts(df)
+        actual = time_window_counts(df['machine_id'], df['datetime'], df['component_category'])
+        assert set(actual) == set(COUNT_FEATURES)
+        for feature in COUNT_FEATURES:
+            mismatches = np.flatnonzero(actual[feature] != expected[feature])
+            assert len(mismatches) == 0, f"{feature} differs at rows {mismatches[:5]}"
+        print(f"✅ {len(df)} alarms on {machines} machine(s) match the online windows")
+
+def test_time_since_last_alarm_is_per_machine():
+    """Gaps are measured to the same machine's previous alarm, as the service does"""
+    for n, machines, seed in [(1500, 1, 0), (3000, 4, 1)]:
+        df = synthetic_alarms(n, machines, seed)
+        store = MachineStateStore()
+        expected = np.array([
+            store.observe({'machine_id': machine_id, 'timestamp': ts.isoformat(), 'component': component})
+            ['time_since_last_alarm']
+            for machine_id, ts, component in zip(df['machine_id'], df['datetime'], df['component_category'])
+        ])
+        actual = time_since_last_alarm(df['machine_id'], df['datetime'])
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9)
+    print("✅ time_since_last_alarm matches the online state")
+
+def test_time_windows_scale():
+    """A million alarms are counted in well under a few seconds"""
+    rng = np.random.default_rng(3)
+    n = 1_000_000
+    times = pd.Timestamp("2024-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 365 * 24 * 3600, n)), unit='s')
+    machines = rng.choice([f"LH410-{i}" for i in range(200)], n)
+    components = rng.choice(COMPONENTS + ['other'], n)
+    started = time.perf_counter()
+    counts = time_window_counts(machines, times, components)
+    elapsed = time.perf_counter() - started
+    assert (counts['alarms_last_24h'] >= counts['alarms_last_1h']).all()
+    print(f"✅ {n} alarms counted in {elapsed:.2f} s")
+    assert elapsed < 10
+
+def test_pipeline_needs_no_backend_dependencies():
+    """The window definitions come from core.windows, not the backend config and its dotenv"""
+    code = ("import sys, preprocess_alarm_data; "
+            "print(sorted(m for m in ('config', 'dotenv', 'core.state', 'core.features') if m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent,
+                            capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1]
+    assert output == "[]", output
+
+if __name__ == "__main__":
+    test_time_windows_match_online_state()
+    test_time_since_last_alarm_is_per_machine()
+    test_time_windows_scale()
+    test_pipeline_needs_no_backend_dependencies()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Parity test for the flattened tree-ensemble evaluator
+Compiled ensembles must match predict_proba of the original models
+"""
+import sys
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from core.trees import compile_ensemble
+
+DATA_DIR = Path(__file__).parent
+FAILURE_TYPES = ['failure_occurred', 'engine_failure', 'brake_failure', 'transmission_failure']
+
+def load_evaluation_rows(extra_rows=2000, seed=0):
+    """Historical feature rows plus perturbed copies that reach other leaves"""
+    X = pd.read_csv(DATA_DIR / 'features_optimized.csv').to_numpy(dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    noisy = X[rng.integers(0, len(X), extra_rows)] + rng.normal(0, 1, (extra_rows, X.shape[1])).astype(np.float32)
+    return np.vstack([X, noisy])
+
+def test_best_models_match_predict_proba():
+    """Every served best_model_* compiles and matches predict_proba"""
+    print("\n=== TESTING COMPILED BEST MODELS ===")
+    warnings.filterwarnings("ignore")
+    X = load_evaluation_rows()
+
+    for failure_type in FAILURE_TYPES:
+        model = joblib.load(DATA_DIR / f'best_model_{failure_type}.pkl')
+        compiled = compile_ensemble(model)
+        expected = model.predict_proba(X)
+        actual = compiled.predict_proba(X)
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12)
+
+        # Single rows take the same path as batches
+        np.testing.assert_allclose(compiled.predict_proba(X[:1]), expected[:1], rtol=0, atol=1e-12)
+        print(f"✅ {failure_type}: {compiled.n_trees} trees, {compiled.n_nodes} nodes match")
+
+def test_alternate_models_match_predict_proba():
+    """Random forest and XGBoost candidates compile; others are rejected"""
+    print("\n=== TESTING COMPILED CANDIDATE MODELS ===")
+    warnings.filterwarnings("ignore")
+    X = load_evaluation_rows()
+    X_missing = X.copy()
+    X_missing[np.random.default_rng(1).random(X.shape) < 0.1] = np.nan
+
+    for failure_type in FAILURE_TYPES:
+        for name, model in joblib.load(DATA_DIR / f'all_models_{failure_type}.pkl').items():
+            if name == 'svm':
+                try:
+                    compile_ensemble(model)
+                    raise AssertionError("SVMs are not tree ensembles")
+                except ValueError:
+                    continue
+
+            compiled = compile_ensemble(model)
+            # XGBoost sums leaves in float32
+            atol = 1e-6 if name == 'xgboost' else 1e-12
+            np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), rtol=0, atol=atol)
+            if name == 'xgboost':
+                np.testing.assert_allclose(
+                    compiled.predict_proba(X_missing), model.predict_proba(X_missing), rtol=0, atol=atol
+                )
+            print(f"✅ {failure_type}/{name} matches")
+
+if __name__ == "__main__":
+    test_best_models_match_predict_proba()
+    test_alternate_models_match_predict_proba()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test startup warm-up and readiness
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+import core.executor as executor_module
+from core.cache import PredictionCache
+from core.executor import InferenceExecutor
+from core.model import predictor
+from core.state import machine_state
+from core.warmup import Readiness, run_warmup
+from test_feature_builder import create_parity_alarms
+
+def test_warmup_marks_ready_with_model_latency():
+    """Warm-up times every model, leaves no trace in the cache or machine state"""
+    print("\n=== TESTING STARTUP WARM-UP ===")
+    readiness = Readiness()
+    assert not readiness.ready and readiness.report()['status'] == 'starting'
+    machines_before = machine_state.stats()['machines']
+    executor = InferenceExecutor(mode="thread", workers=2)
+    try:
+        asyncio.run(run_warmup(readiness, predictor, executor, rounds=3))
+    finally:
+        executor.shutdown()
+
+    report = readiness.report()
+    assert report['ready'] and report['status'] == 'ready', report['error']
+    assert report['model_version'] == predictor.model_version
+    assert set(report['model_latency_ms']) == set(predictor.models)
+    for failure_type, latency in report['model_latency_ms'].items():
+        assert latency['direct']['p50_ms'] > 0
+        assert latency['compiled'] is None or latency['compiled']['p50_ms'] > 0
+    assert report['pipeline_latency_ms']['single_alarm']['max_ms'] > 0
+    assert report['pipeline_latency_ms']['micro_batch']['ms'] > 0
+    assert predictor.cache.stats()['size'] == 0
+    assert machine_state.stats()['machines'] == machines_before
+    print(f"✅ Ready after {report['duration_ms']:.0f} ms")
+
+def test_failed_warmup_stays_not_ready():
+    """An error during warm-up is reported and readiness never flips"""
+    class BrokenExecutor:
+        workers = 1
+        max_queue = 64
+
+        async def predict_batch(self, alarms):
+            raise RuntimeError("executor unavailable")
+
+    readiness = Readiness()
+    asyncio.run(run_warmup(readiness, predictor, BrokenExecutor(), rounds=1))
+    assert not readiness.ready and readiness.status == 'failed'
+    assert "executor unavailable" in readiness.error
+
+def test_process_workers_clear_their_caches():
+    """Inference processes drop their cached predictions after clear_caches()"""
+    executor = InferenceExecutor(mode="process", workers=1)
+    alarms = create_parity_alarms()[:5]
+    default_cache, predictor.cache = predictor.cache, PredictionCache(max_size=1000, ttl_seconds=60)
+    # What a worker process runs, called in this process
+    executor_module._predict_in_worker(alarms, executor._cache_generation)
+    assert predictor.cache.stats()['size'] == len(alarms)
+    executor.clear_caches()
+    predictor.cache.put(b"stale", predictor.model_version, {"failure_occurred": 0.5})
+    executor_module._predict_in_worker(alarms[:1], executor._cache_generation)
+    assert predictor.cache.get(b"stale", predictor.model_version) is None
+    assert predictor.cache.stats()['size'] == 1
+    predictor.cache = default_cache
+
+if __name__ == "__main__":
+    test_warmup_marks_ready_with_model_latency()
+    test_failed_warmup_stays_not_ready()
+    test_process_workers_clear_their_caches()